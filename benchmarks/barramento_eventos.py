@@ -0,0 +1,87 @@
+"""
+Mede quantas vezes a thread da interface é acordada durante uma inundação de eventos.
+
+Uso: python benchmarks/barramento_eventos.py [--threads 4] [--linhas 5000] [--progressos 2000] [--atraso-tk 0.002]
+
+Várias threads publicam linhas de log, saída de comandos (algumas de percentual, com chave)
+e progressos no BarramentoEventos, e uma thread faz o papel do laço do Tk: executa as
+funções agendadas pelo ConsumidorInterface, gastando 'atraso-tk' segundos em cada uma.
+A referência é o desenho anterior, com um root.after por linha de log e por progresso e a
+varredura da fila a cada 100 ms.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import limpezadowindows as lw  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--linhas", type=int, default=5000)
+    parser.add_argument("--progressos", type=int, default=2000)
+    parser.add_argument("--atraso-tk", type=float, default=0.002)
+    args = parser.parse_args()
+
+    chamadas = queue.Queue()
+    recebidos = []
+    maximo_pendente = 0
+
+    def laco_tk():
+        while True:
+            funcao = chamadas.get()
+            if funcao is None:
+                return
+            time.sleep(args.atraso_tk)
+            funcao()
+
+    def tratar_eventos(eventos):
+        nonlocal maximo_pendente
+        maximo_pendente = max(maximo_pendente, len(eventos))
+        recebidos.extend(eventos)
+
+    barramento = lw.BarramentoEventos()
+    interface = barramento.adicionar_consumidor(lw.ConsumidorInterface(lambda atraso, funcao: chamadas.put(funcao), tratar_eventos))
+    barramento.iniciar()
+    tk = threading.Thread(target=laco_tk)
+    tk.start()
+
+    def trabalhador(numero):
+        for i in range(args.linhas):
+            barramento.publicar(lw.EVENTO_LOG, linha=f"[x] [INFO] item {i}\n", tag="INFO", tarefa="temp", registro={})
+            percentual = i % 3 == 0
+            barramento.publicar(lw.EVENTO_LOG, chave=("linha_progresso", numero) if percentual else None,
+                                linha=f"{i % 100}%\n" if percentual else "saida\n", tag="CMD", tarefa=numero)
+            if i < args.progressos:
+                barramento.publicar(lw.EVENTO_PROGRESSO, chave=(lw.EVENTO_PROGRESSO, numero), tarefa=numero,
+                                    percentual=i / args.progressos * 100)
+            if i % 50 == 0:
+                time.sleep(0.001)
+
+    inicio = time.perf_counter()
+    produtores = [threading.Thread(target=trabalhador, args=(n,)) for n in range(args.threads)]
+    for produtor in produtores:
+        produtor.start()
+    for produtor in produtores:
+        produtor.join()
+    duracao = time.perf_counter() - inicio
+    barramento.parar()
+    chamadas.put(None)
+    tk.join()
+
+    referencia = args.threads * (args.linhas + args.progressos) + int(duracao * 10)
+    print(f"Duração: {duracao:.2f} s; publicados {barramento.publicados}, entregues {len(recebidos)}, "
+          f"mesclados {barramento.mescladas}, descartados no barramento {barramento.descartadas} "
+          f"e na interface {interface.descartados}")
+    print(f"Thread da interface acordada: {interface.acordadas} vezes (referência ~{referencia}); "
+          f"lotes do despacho: {barramento.lotes}; maior entrega: {maximo_pendente} eventos "
+          f"(limite {interface.capacidade} + aviso)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Mede o custo de testar nomes contra as regras de exclusão à medida que a lista de regras cresce.
+
+Uso: python benchmarks/exclusoes.py [--nomes 20000] [--quantidades 1,10,100,1000,5000]
+
+Compara RegrasExclusao.avancar (árvore de prefixos, um nome por vez a partir do estado da
+pasta) com o teste ingênuo de cada caminho completo contra todas as regras via fnmatch.
+As regras misturam caminhos literais, globs de prefixo/sufixo e globs só de nome, como as
+que um usuário acumula ao longo do tempo.
+"""
+import argparse
+import fnmatch
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import limpezadowindows as lw  # noqa: E402
+
+RAIZ = os.path.join(os.sep, "dados", "cache")
+
+
+def gerar_regras(quantidade):
+    regras = []
+    for numero in range(quantidade):
+        tipo = numero % 4
+        if tipo == 0:
+            regras.append(os.path.join(RAIZ, f"app{numero}", "perfil", "config.json"))
+        elif tipo == 1:
+            regras.append(os.path.join(RAIZ, f"agente{numero}-*"))
+        elif tipo == 2:
+            regras.append(f"*.ext{numero}")
+        else:
+            regras.append(os.path.join(RAIZ, "**", f"manter{numero}"))
+    return regras
+
+
+def gerar_nomes(quantidade):
+    # Parte dos nomes casa alguma regra quando a lista é grande o bastante para alcançá-los
+    modelos = ("arquivo{}.tmp", "agente{}-log", "despejo.ext{}", "app{}") # Alinhados aos tipos de regra
+    return [modelos[numero % len(modelos)].format(numero) for numero in range(quantidade)]
+
+
+def medir(funcao, nomes):
+    inicio = time.perf_counter()
+    excluidos = sum(1 for nome in nomes if funcao(nome))
+    return (time.perf_counter() - inicio) / len(nomes) * 1e6, excluidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nomes", type=int, default=20000)
+    parser.add_argument("--quantidades", default="1,10,100,1000,5000")
+    args = parser.parse_args()
+    nomes = gerar_nomes(args.nomes)
+
+    print(f"{'regras':>7} {'compilar (ms)':>14} {'avancar (µs/nome)':>18} {'fnmatch (µs/nome)':>18}")
+    for quantidade in (int(q) for q in args.quantidades.split(",")):
+        regras = gerar_regras(quantidade)
+        inicio = time.perf_counter()
+        exclusoes = lw.RegrasExclusao(regras)
+        compilar = (time.perf_counter() - inicio) * 1000
+        estado = exclusoes.estado_de(RAIZ)
+
+        custo_arvore, excluidos_arvore = medir(lambda nome: exclusoes.avancar(estado, nome) is None, nomes)
+        normalizadas = [os.path.normcase(regra) for regra in regras]
+        def ingenuo(nome):
+            caminho = os.path.normcase(os.path.join(RAIZ, nome))
+            return any(fnmatch.fnmatch(caminho, regra) or fnmatch.fnmatch(nome, regra) for regra in normalizadas)
+        custo_ingenuo, _ = medir(ingenuo, nomes[:max(1, args.nomes // max(1, quantidade // 10))])
+        print(f"{quantidade:>7} {compilar:>14.1f} {custo_arvore:>18.2f} {custo_ingenuo:>18.2f}   ({excluidos_arvore} excluídos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compara o tempo de remoção de uma árvore de cache profunda com shutil.rmtree e com o MotorRemocao.
+
+Uso: python benchmarks/remocao.py [--profundidade 40] [--largura 3] [--arquivos 20] [--repeticoes 3]
+
+Medidos:
+- shutil.rmtree: remoção pura, sem contar bytes (referência);
+- os.walk + getsize + rmtree: o que a limpeza fazia antes (uma passada para medir, outra para remover);
+- MotorRemocao (dir_fd): uma passada, relativa a descritores de diretório (POSIX);
+- MotorRemocao (caminhos): a mesma passada por caminhos completos (o modo usado no Windows).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import limpezadowindows as lw  # noqa: E402
+
+
+def criar_arvore(raiz, profundidade, largura, arquivos, tamanho=100):
+    """Cria uma árvore estreita e profunda, como os caches de navegadores. Retorna o total de bytes."""
+    os.makedirs(raiz)
+    atual, total = raiz, 0
+    conteudo = b'x' * tamanho
+    for nivel in range(profundidade):
+        for ramo in range(largura):
+            pasta = os.path.join(atual, f"ramo{ramo}")
+            os.makedirs(pasta, exist_ok=True)
+            for numero in range(arquivos):
+                with open(os.path.join(pasta, f"f{numero}.tmp"), 'wb') as arquivo:
+                    arquivo.write(conteudo)
+                total += tamanho
+        atual = os.path.join(atual, f"Cache_Data_nivel_{nivel}")
+        os.makedirs(atual)
+    return total
+
+
+def medir_e_remover(caminho):
+    total = 0
+    for pasta, _, arquivos in os.walk(caminho):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(pasta, nome))
+            except OSError:
+                pass
+    shutil.rmtree(caminho)
+    return total
+
+
+def remover_com_motor(usa_dir_fd):
+    def remover(caminho):
+        anterior = lw.MotorRemocao.USA_DIR_FD
+        lw.MotorRemocao.USA_DIR_FD = usa_dir_fd
+        try:
+            return lw.MotorRemocao().remover(caminho)["bytes"]
+        finally:
+            lw.MotorRemocao.USA_DIR_FD = anterior
+    return remover
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profundidade", type=int, default=40)
+    parser.add_argument("--largura", type=int, default=3)
+    parser.add_argument("--arquivos", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    metodos = [("shutil.rmtree", lambda caminho: shutil.rmtree(caminho)),
+               ("os.walk + getsize + rmtree", medir_e_remover)]
+    if lw.MotorRemocao.USA_DIR_FD:
+        metodos.append(("MotorRemocao (dir_fd)", remover_com_motor(True)))
+    metodos.append(("MotorRemocao (caminhos)", remover_com_motor(False)))
+
+    with tempfile.TemporaryDirectory(prefix="bench_remocao_") as base:
+        raiz = os.path.join(base, "arvore")
+        esperado = criar_arvore(raiz, args.profundidade, args.largura, args.arquivos)
+        pastas = sum(len(d) for _, d, _ in os.walk(raiz)) + 1
+        arquivos = sum(len(a) for _, _, a in os.walk(raiz))
+        shutil.rmtree(raiz)
+        print(f"Árvore: {arquivos} arquivos, {pastas} pastas, {args.profundidade} níveis, {esperado} bytes")
+        for nome, remover in metodos:
+            tempos = []
+            for _ in range(args.repeticoes):
+                criar_arvore(raiz, args.profundidade, args.largura, args.arquivos)
+                inicio = time.perf_counter()
+                contado = remover(raiz)
+                tempos.append(time.perf_counter() - inicio)
+                if os.path.exists(raiz):
+                    raise SystemExit(f"{nome}: a árvore não foi removida por completo")
+                if contado is not None and contado != esperado:
+                    raise SystemExit(f"{nome}: contou {contado} bytes, esperado {esperado}")
+            print(f"{nome:<28} melhor {min(tempos) * 1000:7.1f} ms   média {sum(tempos) / len(tempos) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
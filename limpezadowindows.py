@@ -16,59 +16,3392 @@ import ctypes
 import shutil
 import threading
 import webbrowser
+import gzip
+import hashlib
+import fnmatch
+import time
+import multiprocessing
+import json
+import argparse
+import stat
+import codecs
+import asyncio
+import hmac
+import itertools
+import sqlite3
+import re
+import bisect
+import atexit
+import pathlib
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
 from queue import Queue, Empty
 
 # O encoding correto para comunicação com o CMD do Windows.
 CMD_ENCODING = 'cp850'
 
-# --- Bloco de Verificação/Instalação de Dependência ---
-# Verifica se a biblioteca 'ttkbootstrap' está instalada e, caso não esteja,
-# tenta instalá-la automaticamente via pip.
-try:
-    # A importação real para uso acontecerá somente depois da verificação de administrador.
-    import ttkbootstrap
-except ImportError:
-    print("Biblioteca 'ttkbootstrap' não encontrada. Tentando instalar automaticamente...")
+# --- Configuração da compactação de logs antigos ---
+# Diretórios onde os logs antigos são procurados (variáveis de ambiente são expandidas).
+LOGS_ANTIGOS_DIRETORIOS = [
+    os.path.join('%SystemRoot%', 'Logs'),
+    os.path.join('%SystemRoot%', 'System32', 'LogFiles'),
+]
+LOGS_ANTIGOS_PADROES = ('*.log', '*.txt') # Padrões de nome de arquivo considerados logs
+LOGS_ANTIGOS_IDADE_DIAS = 30 # Somente arquivos não modificados há mais de N dias
+LOGS_ANTIGOS_TAMANHO_MINIMO = 64 * 1024 # Arquivos menores não compensam a compactação
+LOGS_ANTIGOS_TAMANHO_BLOCO = 1024 * 1024 # Bloco de leitura (limita o uso de memória por processo)
+LOGS_ANTIGOS_ARQUIVOS_POR_PROCESSO = 2 # Arquivos enviados ao pool por processo de cada vez (o cancelamento não espera a fila toda)
+
+# --- Configuração da compactação (VACUUM) dos bancos de dados dos navegadores ---
+BANCOS_CHROMIUM = ('History', 'Favicons', 'Cookies', os.path.join('Network', 'Cookies'), 'Web Data') # Relativos à pasta do perfil
+BANCOS_FIREFOX = ('places.sqlite', 'favicons.sqlite', 'cookies.sqlite', 'formhistory.sqlite')
+BANCOS_NAVEGADORES_THREADS = 4 # Bancos compactados ao mesmo tempo (o VACUUM é limitado pelo disco)
+
+# --- Configuração do log estruturado (JSONL com rotação) ---
+LOG_TAMANHO_MAXIMO = 5 * 1024**2 # Tamanho máximo de cada arquivo de log antes da rotação
+LOG_QUANTIDADE_ARQUIVOS = 5 # Quantidade de arquivos de log mantidos
+
+# --- Configuração da fila de logs e da captura de saída dos comandos ---
+FILA_LOG_CAPACIDADE = 2000 # Linhas pendentes para a GUI antes de aplicar a política de descarte
+FILA_LOG_ESPERA_MAXIMA = 2.0 # Segundos que uma mensagem importante espera por espaço na fila
+BARRAMENTO_INTERVALO = 0.05 # Segundos que o barramento de eventos acumula eventos antes de entregar um lote
+INTERFACE_ESPERA_MAXIMA = 0.5 # Segundos que o despacho espera a interface consumir a entrega anterior antes de descartar
+SAIDA_COMANDO_LINHAS = 2000 # Linhas mantidas na memória (buffer circular) da saída de um comando
+SAIDAS_QUANTIDADE_MAXIMA = 20 # Arquivos de saída completa (compactados) mantidos em disco
+LOG_MEMORIA_LINHAS = 500000 # Linhas da sessão mantidas na memória para filtro e busca na área de log
+
+# Reconhece linhas de progresso ("Verification 45% complete.", "[=== 12.5% ===]", ...)
+_RE_LINHA_PROGRESSO = re.compile(r'\d{1,3}(?:[.,]\d+)?\s*%')
+
+# Padrões de progresso de cada ferramenta externa (pré-compilados; um grupo: o percentual)
+PADROES_PROGRESSO = {
+    # "Defragmentation: 12% complete..." / "Desfragmentação: 12% concluído..."
+    "defrag": re.compile(r'^\s*(?P<fase>[^:\d]*?)\s*:?\s*(?P<pct>\d{1,3})\s*%'),
+    # "Verification 45% complete." / "Verificação 45% concluída."
+    "sfc": re.compile(r'(?P<fase>Verifica\w*)\D*?(?P<pct>\d{1,3})\s*%', re.IGNORECASE),
+    # "[=====                      10.0%                          ]"
+    "dism": re.compile(r'\[[=\s]*(?P<pct>\d{1,3}(?:[.,]\d+)?)\s*%[=\s]*\]'),
+}
+PROGRESSO_INTERVALO_MINIMO = 0.5 # Segundos entre eventos de progresso enviados à interface
+
+# --- Configuração do inventário de unidades ---
+INVENTARIO_INTERVALO = 60 # Segundos entre as atualizações automáticas do inventário
+INVENTARIO_TEMPO_LIMITE = 2.0 # Tempo máximo de espera pela resposta de cada unidade
+
+# --- Configuração do modo serviço (manutenção automática quando o sistema está ocioso) ---
+SERVICO_INTERVALO_HORAS = 24 # Intervalo mínimo entre duas execuções automáticas
+SERVICO_CPU_MAXIMA = 20.0 # Uso de CPU (%) do restante do sistema abaixo do qual ele é considerado ocioso
+SERVICO_FILA_DISCO_MAXIMA = 1.0 # Fila média de disco abaixo da qual o disco é considerado ocioso
+SERVICO_OCIOSO_MINIMO = 300 # Segundos sem entrada de teclado/mouse para considerar o usuário ausente
+SERVICO_VERIFICACAO = 15 # Segundos entre as verificações de ociosidade
+
+# --- Configuração do limitador de I/O (0 = sem limite) ---
+LIMITE_IO_OPERACOES = 0 # Operações (exclusões, listagens, leituras de metadados) por segundo
+LIMITE_IO_BYTES = 0 # Bytes excluídos por segundo
+
+# --- Configuração do agente de controle remoto (JSON-RPC sobre HTTP) ---
+AGENTE_HOST = '127.0.0.1' # Por padrão, aceita conexões somente da própria máquina
+AGENTE_PORTA = 8765
+AGENTE_FILA_OBSERVADOR = 1000 # Eventos pendentes por observador antes de descartar os mais antigos
+AGENTE_TAMANHO_MAXIMO_CORPO = 1024 * 1024
+AGENTE_TEMPO_INICIO_TAREFA = 30 # Segundos para a interface iniciar uma tarefa pedida por um job
+AGENTE_TEMPO_LIMITE_TAREFA = 12 * 3600 # Segundos que um job espera o fim da tarefa (DISM e varreduras levam horas)
+
+# --- Configuração da quarentena ---
+QUARENTENA_NOME_PASTA = '$LimpezaQuarentena' # Criada na raiz de cada volume usado
+QUARENTENA_TAMANHO_MAXIMO = 10 * 1024**3 # Acima disso, as execuções mais antigas são descartadas
+QUARENTENA_IDADE_MAXIMA_DIAS = 14 # Execuções mais antigas que isso são descartadas
+
+# --- Configuração da estimativa de duração das tarefas de reparo ---
+ETA_AMOSTRAS = 20 # Execuções bem-sucedidas mais recentes usadas na previsão
+ETA_DECAIMENTO = 0.85 # Peso de cada execução em relação à seguinte (mais recente)
+ETA_PESO_MESMA_UNIDADE = 2.0 # Multiplicador do peso das execuções na mesma unidade
+
+# --- Configuração do diário de limpeza (retomada após uma interrupção) ---
+DIARIO_ARQUIVO = 'diario_limpeza.jsonl' # Na pasta de dados do aplicativo
+DIARIO_LOTE_ITENS = 256 # Itens concluídos agrupados em cada registro do diário
+DIARIO_INTERVALO_SINCRONIZACAO = 2.0 # Segundos mínimos entre dois fsync do diário
+
+# --- Configuração do percurso de diretórios (links simbólicos e junções) ---
+LINKS_NAO_SEGUIR = "nao_seguir" # Links e junções não são seguidos (padrão das varreduras e da remoção)
+LINKS_DENTRO_DA_RAIZ = "dentro_da_raiz" # Segue só os links cujo destino fica dentro da pasta percorrida
+LINKS_SEGUIR = "seguir" # Segue todos (ciclos e caminhos duplicados continuam barrados pelo inode)
+
+# --- Configuração das exclusões do usuário ---
+EXCLUSOES_ARQUIVO = 'exclusoes.txt' # Na pasta de dados do aplicativo; uma regra (caminho ou glob) por linha
+
+# --- Configuração da limpeza das pastas temporárias compartilhadas (/tmp e /var/tmp) ---
+TEMPORARIOS_IDADE_MINIMA = 24 * 3600 # Segundos sem modificação nem acesso antes que um item possa ser apagado
+
+# --- Backends de plataforma ---
+# Tudo o que depende do sistema operacional (lixeira, privilégios, pastas temporárias,
+# caches de navegadores, flags de processo) passa por aqui, para que o motor de limpeza
+# possa ser importado e executado também em Linux (agentes de build, CI).
+
+class BackendPlataforma(ABC):
+    """Interface comum dos backends de plataforma."""
+    nome = "generico"
+    flags_sem_janela = 0 # 'creationflags' para comandos sem janela de console
+    flags_nova_console = 0 # 'creationflags' para ferramentas que abrem a própria console
+    lixeira_por_api = False # True quando há uma API do sistema para esvaziar a lixeira (alternativa)
+
+    @abstractmethod
+    def eh_administrador(self):
+        """True se o processo tem privilégios de administrador (root, no Linux)."""
+
+    @abstractmethod
+    def solicitar_elevacao(self):
+        """Chamado quando não há privilégios de administrador; pode encerrar o processo."""
+
+    def mostrar_mensagem(self, texto, titulo, icone=0):
+        print(f"{titulo}: {texto}")
+
+    @abstractmethod
+    def perfil_usuario(self, usuario):
+        """Pasta pessoal da conta 'usuario'."""
+
+    @abstractmethod
+    def esvaziar_lixeira(self):
+        """Esvazia a lixeira pela API do sistema. Retorna True em caso de sucesso."""
+
+    def tamanho_lixeira(self):
+        """Bytes na lixeira segundo a API do sistema (0 se não for possível consultar)."""
+        return 0
+
+    def pastas_lixeira(self, perfil, volumes=()):
+        """Retorna [(nome, caminho)] das pastas da lixeira que o motor de limpeza esvazia."""
+        return []
+
+    def temporarios_usuario(self, perfil):
+        return []
+
+    def temporarios_sistema(self):
+        return []
+
+    def protecao_temporarios(self):
+        """
+        Filtro (ProtecaoTemporarios) aplicado aos itens das pastas temporárias do sistema, ou None.
+        Necessário onde elas são compartilhadas e o sistema não impede apagar arquivos em uso.
+        """
+        return None
+
+    def caches_navegadores(self, perfil):
+        """Retorna {navegador: pasta de cache} dos navegadores baseados no Chromium."""
+        return {}
+
+    def perfis_firefox(self, perfil):
+        """Retorna a pasta que contém os perfis do Firefox (cada um com 'cache2')."""
+        return None
+
+    def dados_navegadores(self, perfil):
+        """
+        Retorna [(navegador, família, pasta)] das pastas de dados dos navegadores, onde ficam os
+        bancos SQLite. Família 'chromium': a pasta 'User Data' (ou o próprio perfil); 'firefox':
+        a pasta que contém os perfis.
+        """
+        return []
+
+    def comando_limpeza_disco(self):
+        """Comando da ferramenta nativa de limpeza de disco, ou None se não houver."""
+        return None
+
+    def volumes_fixos(self, volumes):
+        """Filtra os volumes em discos locais (sem unidades de rede, ópticas ou removíveis)."""
+        return list(volumes)
+
+    def discos_dos_volumes(self, volumes):
+        """Retorna {volume: tupla dos discos físicos que ele ocupa}, ou None onde não for possível saber."""
+        return {volume: None for volume in volumes}
+
+    def exclusoes_padrao(self):
+        """Regras de exclusão sempre ativas nesta plataforma (somadas às do usuário)."""
+        return []
+
+class BackendWindows(BackendPlataforma):
+    nome = "windows"
+    flags_sem_janela = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+    flags_nova_console = getattr(subprocess, 'CREATE_NEW_CONSOLE', 0)
+    lixeira_por_api = True
+
+    def eh_administrador(self):
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+
+    def solicitar_elevacao(self):
+        # Exibe uma mensagem e tenta re-executar o script como administrador.
+        self.mostrar_mensagem("Este programa precisa de permissões de administrador para funcionar. Ele será reiniciado para solicitar a elevação.", "Permissões Necessárias", 0x30) # MB_OK | MB_ICONWARNING
+        try:
+            # Tenta re-lançar o script com o verbo "runas", que solicita elevação de privilégios (UAC).
+            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
+        except Exception as e:
+            # Caso a elevação falhe.
+            self.mostrar_mensagem(f"Não foi possível solicitar permissões de administrador automaticamente.\nPor favor, clique com o botão direito no arquivo e selecione 'Executar como administrador'.\n\nErro: {e}", "Erro de Elevação", 0x10) # MB_OK | MB_ICONERROR
+            sys.exit(1)
+        # Sai do processo atual, não-elevado.
+        sys.exit(0)
+
+    def mostrar_mensagem(self, texto, titulo, icone=0):
+        # Usa uma caixa de mensagem nativa do Windows.
+        ctypes.windll.user32.MessageBoxW(0, texto, titulo, icone)
+
+    def perfil_usuario(self, usuario):
+        return os.path.join(os.environ.get('SystemDrive', 'C:'), 'Users', usuario)
+
+    def esvaziar_lixeira(self):
+        # 7 = SHERB_NOCONFIRMATION | SHERB_NOPROGRESSUI | SHERB_NOSOUND
+        return ctypes.windll.shell32.SHEmptyRecycleBinW(None, None, 7) == 0
+
+    def tamanho_lixeira(self):
+        class SHQUERYRBINFO(ctypes.Structure):
+            _pack_ = 8 if ctypes.sizeof(ctypes.c_void_p) == 8 else 1 # Empacotamento do shellapi.h
+            _fields_ = [("cbSize", ctypes.c_ulong), ("i64Size", ctypes.c_longlong), ("i64NumItems", ctypes.c_longlong)]
+        info = SHQUERYRBINFO(cbSize=ctypes.sizeof(SHQUERYRBINFO))
+        if ctypes.windll.shell32.SHQueryRecycleBinW(None, ctypes.byref(info)) != 0:
+            return 0
+        return max(info.i64Size, 0)
+
+    @staticmethod
+    def _sid_do_usuario(usuario):
+        """Retorna o SID (texto 'S-1-5-...') da conta, ou None se ela não for encontrada."""
+        advapi32 = ctypes.windll.advapi32
+        tamanho_sid, tamanho_dominio, uso = ctypes.c_ulong(0), ctypes.c_ulong(0), ctypes.c_int(0)
+        # Primeira chamada só para descobrir o tamanho dos buffers
+        advapi32.LookupAccountNameW(None, usuario, None, ctypes.byref(tamanho_sid), None, ctypes.byref(tamanho_dominio), ctypes.byref(uso))
+        if not tamanho_sid.value:
+            return None
+        sid = ctypes.create_string_buffer(tamanho_sid.value)
+        dominio = ctypes.create_unicode_buffer(tamanho_dominio.value)
+        if not advapi32.LookupAccountNameW(None, usuario, sid, ctypes.byref(tamanho_sid), dominio, ctypes.byref(tamanho_dominio), ctypes.byref(uso)):
+            return None
+        texto = ctypes.c_wchar_p()
+        if not advapi32.ConvertSidToStringSidW(sid, ctypes.byref(texto)):
+            return None
+        try:
+            return texto.value
+        finally:
+            ctypes.windll.kernel32.LocalFree(texto)
+
+    def pastas_lixeira(self, perfil, volumes=()):
+        # Cada volume tem a sua '$Recycle.Bin', com uma pasta por SID de usuário
+        try:
+            sid = self._sid_do_usuario(os.path.basename(os.path.normpath(perfil)))
+        except Exception:
+            sid = None
+        if not sid:
+            return []
+        pastas = []
+        for volume in volumes:
+            caminho = os.path.join(volume + os.sep, '$Recycle.Bin', sid)
+            if os.path.isdir(caminho):
+                pastas.append((f"Lixeira ({volume})", caminho))
+        return pastas
+
+    def temporarios_usuario(self, perfil):
+        return [("Temp do Usuário", os.path.join(perfil, 'AppData', 'Local', 'Temp'))]
+
+    def temporarios_sistema(self):
+        windir = os.environ.get('windir', 'C:\\Windows')
+        return [("Windows Temp", os.path.join(windir, 'Temp')), ("Prefetch", os.path.join(windir, 'Prefetch'))]
+
+    def caches_navegadores(self, perfil):
+        dados_locais = os.path.join(perfil, 'AppData', 'Local')
+        return {
+            "Google Chrome": os.path.join(dados_locais, 'Google', 'Chrome', 'User Data', 'Default', 'Cache'),
+            "Microsoft Edge": os.path.join(dados_locais, 'Microsoft', 'Edge', 'User Data', 'Default', 'Cache'),
+        }
+
+    def perfis_firefox(self, perfil):
+        return os.path.join(perfil, 'AppData', 'Local', 'Mozilla', 'Firefox', 'Profiles')
+
+    def dados_navegadores(self, perfil):
+        dados_locais = os.path.join(perfil, 'AppData', 'Local')
+        dados_moveis = os.path.join(perfil, 'AppData', 'Roaming')
+        return [
+            ("Google Chrome", "chromium", os.path.join(dados_locais, 'Google', 'Chrome', 'User Data')),
+            ("Microsoft Edge", "chromium", os.path.join(dados_locais, 'Microsoft', 'Edge', 'User Data')),
+            ("Brave", "chromium", os.path.join(dados_locais, 'BraveSoftware', 'Brave-Browser', 'User Data')),
+            ("Opera GX", "chromium", os.path.join(dados_moveis, 'Opera Software', 'Opera GX Stable')),
+            ("Firefox", "firefox", os.path.join(dados_moveis, 'Mozilla', 'Firefox', 'Profiles')),
+        ]
+
+    def comando_limpeza_disco(self):
+        return ['cleanmgr.exe', '/sagerun:1']
+
+    def volumes_fixos(self, volumes):
+        # 3 = DRIVE_FIXED
+        return [volume for volume in volumes if ctypes.windll.kernel32.GetDriveTypeW(volume.rstrip('\\') + '\\') == 3]
+
+    def discos_dos_volumes(self, volumes):
+        from ctypes import wintypes
+        IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS = 0x00560000
+        class DISK_EXTENT(ctypes.Structure):
+            _fields_ = [("DiskNumber", wintypes.DWORD), ("StartingOffset", ctypes.c_longlong), ("ExtentLength", ctypes.c_longlong)]
+        class VOLUME_DISK_EXTENTS(ctypes.Structure):
+            # Volumes distribuídos (spanned/RAID de software) podem ocupar vários discos
+            _fields_ = [("NumberOfDiskExtents", wintypes.DWORD), ("Extents", DISK_EXTENT * 32)]
+        kernel32 = ctypes.windll.kernel32
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p,
+                                         wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        kernel32.DeviceIoControl.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD, ctypes.c_void_p,
+                                             wintypes.DWORD, ctypes.POINTER(wintypes.DWORD), ctypes.c_void_p]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        invalido = wintypes.HANDLE(-1).value
+        discos = {}
+        for volume in volumes:
+            # Acesso 0 (só consulta): não exige abrir o volume para leitura; 3 = compartilha leitura e escrita; 3 = OPEN_EXISTING
+            handle = kernel32.CreateFileW("\\\\.\\" + volume.rstrip("\\"), 0, 3, None, 3, 0, None)
+            if not handle or handle == invalido:
+                discos[volume] = None
+                continue
+            try:
+                extensoes, retornados = VOLUME_DISK_EXTENTS(), wintypes.DWORD()
+                if kernel32.DeviceIoControl(handle, IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS, None, 0, ctypes.byref(extensoes),
+                                            ctypes.sizeof(extensoes), ctypes.byref(retornados), None):
+                    quantidade = min(extensoes.NumberOfDiskExtents, len(extensoes.Extents))
+                    discos[volume] = tuple(sorted({extensoes.Extents[i].DiskNumber for i in range(quantidade)})) or None
+                else:
+                    discos[volume] = None
+            finally:
+                kernel32.CloseHandle(handle)
+        return discos
+
+    def exclusoes_padrao(self):
+        # O 'desktop.ini' de cada pasta da lixeira define como o Explorer a exibe
+        return ['**\\$Recycle.Bin\\*\\desktop.ini']
+
+class BackendLinux(BackendPlataforma):
+    nome = "linux"
+
+    def eh_administrador(self):
+        return os.geteuid() == 0
+
+    def solicitar_elevacao(self):
+        # Sem root, ainda dá para limpar o que pertence ao próprio usuário (ex.: agentes de build).
+        print("AVISO: Executando sem root. Itens de outros usuários em /tmp e /var/tmp serão ignorados.")
+
+    def perfil_usuario(self, usuario):
+        try:
+            import pwd
+            return pwd.getpwnam(usuario).pw_dir
+        except (ImportError, KeyError):
+            return os.path.join('/home', usuario)
+
+    def esvaziar_lixeira(self):
+        return False # Sem API: as pastas da lixeira XDG são limpas pelo motor (pastas_lixeira)
+
+    def pastas_lixeira(self, perfil, volumes=()):
+        # Lixeira XDG do usuário e as lixeiras por volume ('.Trash-<uid>' na raiz de cada montagem)
+        lixeiras = [os.path.join(perfil, '.local', 'share', 'Trash')]
+        try:
+            uid = os.stat(perfil).st_uid
+            with open('/proc/mounts', encoding='utf-8') as f:
+                montagens = [linha.split()[1].replace('\\040', ' ') for linha in f if linha.strip()]
+        except OSError:
+            montagens, uid = [], None
+        if uid is not None:
+            for montagem in montagens:
+                lixeiras.append(os.path.join(montagem, f'.Trash-{uid}'))
+                lixeiras.append(os.path.join(montagem, '.Trash', str(uid)))
+        pastas = []
+        for lixeira in lixeiras:
+            for sub in ('files', 'info', 'expunged'):
+                caminho = os.path.join(lixeira, sub)
+                if os.path.isdir(caminho):
+                    pastas.append((f"Lixeira ({caminho})", caminho))
+        return pastas
+
+    def temporarios_sistema(self):
+        return [("/tmp", "/tmp"), ("/var/tmp", "/var/tmp")]
+
+    def protecao_temporarios(self):
+        # No Linux, unlink funciona em arquivos abertos e sockets: sem o filtro, sockets do
+        # ssh-agent/tmux, arquivos de trava e rascunhos de builds em andamento seriam apagados
+        return ProtecaoTemporarios()
+
+    def caches_navegadores(self, perfil):
+        cache = os.path.join(perfil, '.cache')
+        return {
+            "Google Chrome": os.path.join(cache, 'google-chrome', 'Default', 'Cache'),
+            "Chromium": os.path.join(cache, 'chromium', 'Default', 'Cache'),
+            "Microsoft Edge": os.path.join(cache, 'microsoft-edge', 'Default', 'Cache'),
+        }
+
+    def perfis_firefox(self, perfil):
+        return os.path.join(perfil, '.cache', 'mozilla', 'firefox')
+
+    def dados_navegadores(self, perfil):
+        configuracao = os.path.join(perfil, '.config')
+        return [
+            ("Google Chrome", "chromium", os.path.join(configuracao, 'google-chrome')),
+            ("Chromium", "chromium", os.path.join(configuracao, 'chromium')),
+            ("Microsoft Edge", "chromium", os.path.join(configuracao, 'microsoft-edge')),
+            ("Brave", "chromium", os.path.join(configuracao, 'BraveSoftware', 'Brave-Browser')),
+            ("Firefox", "firefox", os.path.join(perfil, '.mozilla', 'firefox')),
+        ]
+
+    def discos_dos_volumes(self, volumes):
+        # O dispositivo do ponto de montagem leva, pelo /sys, ao disco (pai da partição) ou aos
+        # discos por trás de um LVM/RAID ('slaves')
+        discos = {}
+        for volume in volumes:
+            try:
+                dispositivo = os.stat(volume).st_dev
+                bloco = os.path.realpath(f"/sys/dev/block/{os.major(dispositivo)}:{os.minor(dispositivo)}")
+                discos[volume] = tuple(sorted(self._discos_do_bloco(bloco))) or None
+            except OSError:
+                discos[volume] = None
+        return discos
+
+    def _discos_do_bloco(self, bloco):
+        if not os.path.isdir(bloco):
+            return set() # Sistema de arquivos sem dispositivo de bloco (tmpfs, overlay, rede)
+        pasta_escravos = os.path.join(bloco, 'slaves')
+        escravos = os.listdir(pasta_escravos) if os.path.isdir(pasta_escravos) else []
+        if escravos:
+            return set().union(*(self._discos_do_bloco(os.path.realpath(os.path.join(pasta_escravos, nome))) for nome in escravos))
+        if os.path.exists(os.path.join(bloco, 'partition')):
+            bloco = os.path.dirname(bloco)
+        return {os.path.basename(bloco)}
+
+    def exclusoes_padrao(self):
+        # Sockets e pastas privadas de serviços em execução
+        return ['/tmp/.X11-unix', '/tmp/.ICE-unix', '/tmp/.XIM-unix', '/tmp/.font-unix', '/tmp/.Test-unix',
+                '/tmp/systemd-private-*', '/var/tmp/systemd-private-*', '/tmp/snap-private-tmp']
+
+def criar_backend_plataforma():
+    """Escolhe o backend do sistema operacional atual."""
+    if os.name == 'nt':
+        return BackendWindows()
+    return BackendLinux()
+
+PLATAFORMA = criar_backend_plataforma()
+
+# --- Verificação/Instalação de Dependência ---
+def garantir_ttkbootstrap():
+    """
+    Verifica se a biblioteca 'ttkbootstrap' está instalada e, caso não esteja,
+    tenta instalá-la automaticamente via pip.
+    """
+    try:
+        # A importação real para uso acontecerá somente depois da verificação de administrador.
+        import ttkbootstrap
+    except ImportError:
+        print("Biblioteca 'ttkbootstrap' não encontrada. Tentando instalar automaticamente...")
+        try:
+            # Garante que o pip do ambiente correto seja usado para a instalação.
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "ttkbootstrap"])
+            PLATAFORMA.mostrar_mensagem("A dependência 'ttkbootstrap' foi instalada com sucesso. Por favor, execute o programa novamente.", "Instalação Concluída", 0x40) # MB_OK | MB_ICONINFORMATION
+            sys.exit(0)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"ERRO CRÍTICO: Falha ao instalar 'ttkbootstrap' via pip. Detalhes: {e}")
+            PLATAFORMA.mostrar_mensagem("A biblioteca 'ttkbootstrap' não pôde ser instalada. Por favor, instale-a manualmente ('pip install ttkbootstrap') e tente novamente.", "Erro Crítico", 0x10) # MB_OK | MB_ICONERROR
+            sys.exit(1)
+
+
+# --- Função para encontrar o caminho dos arquivos (essencial para o PyInstaller) ---
+def resource_path(relative_path):
+    """ Retorna o caminho absoluto para o recurso, funciona para dev e para PyInstaller """
+    try:
+        # PyInstaller cria uma pasta temporária e armazena o caminho em _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# --- Funções de Inicialização ---
+
+def verificar_admin():
+    """
+    Verifica se o script está sendo executado com privilégios de administrador.
+
+    Returns:
+        bool: True se o usuário for administrador, False caso contrário.
+    """
+    try:
+        return PLATAFORMA.eh_administrador()
+    except Exception as e:
+        print(f"Não foi possível verificar o status de administrador. Erro: {e}")
+        return False
+
+# --- Motor de Limpeza (independente da interface gráfica) ---
+
+def _ler_em_blocos(arquivo, tamanho_bloco):
+    """Gera os blocos de um arquivo aberto, sem carregá-lo inteiro na memória."""
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            return
+        yield bloco
+
+_SINAIS_COMPACTACAO = None # (liberado, cancelado) nos processos do pool de compactação
+
+def _iniciar_processo_compactacao(liberado, cancelado):
+    """Inicializador dos processos do pool: recebe os sinais de pausa e cancelamento da limpeza."""
+    global _SINAIS_COMPACTACAO
+    _SINAIS_COMPACTACAO = (liberado, cancelado)
+
+def _aguardar_liberacao_compactacao():
+    """Entre dois blocos: espera enquanto a limpeza estiver pausada e desiste se ela for cancelada."""
+    if _SINAIS_COMPACTACAO is None:
+        return
+    liberado, cancelado = _SINAIS_COMPACTACAO
+    while not liberado.wait(0.5):
+        if cancelado.is_set():
+            break
+    if cancelado.is_set():
+        raise InterruptedError("compactação cancelada")
+
+def comprimir_arquivo_log(caminho, tamanho_bloco=LOGS_ANTIGOS_TAMANHO_BLOCO):
+    """
+    Compacta um arquivo em '<arquivo>.gz' por fluxo de blocos e substitui o original.
+
+    O original só é removido depois que a cópia compactada é descompactada e o seu
+    hash conferido com o do arquivo original. Executada em um processo separado, que
+    pausa entre dois blocos enquanto a limpeza estiver pausada.
+
+    Returns:
+        tuple: (caminho, bytes_originais, bytes_compactados, erro ou None)
+    """
+    destino = caminho + ".gz"
+    temporario = destino + ".tmp"
+    try:
+        if os.path.exists(destino):
+            return caminho, 0, 0, f"'{os.path.basename(destino)}' já existe"
+
+        estado_inicial = os.stat(caminho)
+        hash_original = hashlib.sha256()
+        with open(caminho, 'rb') as origem, gzip.open(temporario, 'wb', compresslevel=6) as saida:
+            for bloco in _ler_em_blocos(origem, tamanho_bloco):
+                _aguardar_liberacao_compactacao()
+                hash_original.update(bloco)
+                saida.write(bloco)
+
+        # Verificação: descompacta em fluxo e confere o conteúdo antes de tocar no original
+        hash_verificado = hashlib.sha256()
+        with gzip.open(temporario, 'rb') as verificacao:
+            for bloco in _ler_em_blocos(verificacao, tamanho_bloco):
+                _aguardar_liberacao_compactacao()
+                hash_verificado.update(bloco)
+        if hash_verificado.digest() != hash_original.digest():
+            os.remove(temporario)
+            return caminho, 0, 0, "a verificação da cópia compactada falhou"
+
+        # Se o aplicativo dono do log escreveu nele durante a compactação, desiste
+        estado_final = os.stat(caminho)
+        if (estado_final.st_size, estado_final.st_mtime) != (estado_inicial.st_size, estado_inicial.st_mtime):
+            os.remove(temporario)
+            return caminho, 0, 0, "o arquivo foi modificado durante a compactação"
+
+        shutil.copystat(caminho, temporario)
+        os.replace(temporario, destino)
+        try:
+            os.remove(caminho)
+        except OSError:
+            # Log aberto pelo aplicativo (comum no Windows): desfaz a publicação para não ficarem o original e o '.gz'
+            os.remove(destino)
+            raise
+        return caminho, estado_inicial.st_size, os.path.getsize(destino), None
+    except Exception as e:
+        try:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        except OSError:
+            pass
+        return caminho, 0, 0, str(e)
+
+def encontrar_bancos_navegadores(pastas_dados):
+    """
+    Gera (navegador, nome do perfil, caminho) de cada banco SQLite existente nos perfis dos navegadores.
+    'pastas_dados' vem de PLATAFORMA.dados_navegadores(). Nos navegadores Chromium, um perfil é
+    uma pasta com o arquivo 'Preferences' (a própria pasta de dados, no caso do Opera).
+    """
+    for navegador, familia, raiz in pastas_dados:
+        try:
+            subpastas = [e.path for e in os.scandir(raiz) if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+        if familia == "chromium":
+            perfis = [p for p in [raiz] + subpastas if os.path.isfile(os.path.join(p, 'Preferences'))]
+            nomes = BANCOS_CHROMIUM
+        else:
+            perfis, nomes = subpastas, BANCOS_FIREFOX
+        for pasta_perfil in perfis:
+            for nome in nomes:
+                caminho = os.path.join(pasta_perfil, nome)
+                if os.path.isfile(caminho):
+                    yield navegador, os.path.basename(pasta_perfil), caminho
+
+def _tamanho_banco(caminho):
+    """Tamanho do banco SQLite somado ao do seu arquivo de WAL (se houver)."""
+    total = 0
+    for arquivo in (caminho, caminho + "-wal"):
+        try:
+            total += os.path.getsize(arquivo)
+        except OSError:
+            pass
+    return total
+
+def compactar_banco_sqlite(caminho):
+    """
+    Verifica a integridade de um banco SQLite e o compacta (VACUUM), sem esperar por travas.
+
+    O banco é aberto com tempo de espera zero e travado com BEGIN EXCLUSIVE: se o navegador
+    estiver usando o banco, a trava falha na hora e o banco é só ignorado. Bancos que não
+    passam no 'integrity_check' não são tocados. Executada nas threads do pool.
+
+    Returns:
+        tuple: (caminho, estado, bytes_antes, bytes_depois, detalhes) com estado
+        'compactado', 'em_uso', 'corrompido' ou 'erro'.
+    """
+    antes = _tamanho_banco(caminho)
+    try:
+        conexao = sqlite3.connect(caminho, timeout=0, isolation_level=None)
+    except sqlite3.Error as e:
+        return caminho, "erro", antes, antes, str(e)
+    try:
+        conexao.execute("BEGIN EXCLUSIVE")
+        resultado = conexao.execute("PRAGMA integrity_check(1)").fetchone()[0]
+        conexao.execute("COMMIT")
+        if resultado != "ok":
+            return caminho, "corrompido", antes, antes, resultado
+        conexao.execute("VACUUM")
+        conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)") # Sem isso, no modo WAL a cópia compactada fica no '-wal'
+    except sqlite3.OperationalError as e:
+        mensagem = str(e).lower()
+        if "locked" in mensagem or "busy" in mensagem:
+            return caminho, "em_uso", antes, antes, str(e)
+        return caminho, "erro", antes, antes, str(e)
+    except sqlite3.Error as e:
+        return caminho, "erro", antes, antes, str(e)
+    finally:
+        conexao.close()
+    return caminho, "compactado", antes, _tamanho_banco(caminho), None
+
+def encontrar_logs_antigos(diretorios, padroes, idade_dias, tamanho_minimo, cancelado=lambda: False, limitador=None,
+                           exclusoes=None, politica_links=LINKS_NAO_SEGUIR):
+    """
+    Gera os caminhos dos arquivos de log que atendem aos padrões, idade e tamanho mínimo.
+    Um só PercursoSeguro cobre todos os diretórios: pastas alcançadas por mais de um caminho
+    (diretórios sobrepostos, junções, montagens) e links físicos de um mesmo arquivo aparecem uma vez.
+    """
+    limite_mtime = time.time() - idade_dias * 86400
+    percurso = PercursoSeguro(politica_links, exclusoes=exclusoes, cancelado=cancelado)
+    for diretorio in diretorios:
+        raiz = os.path.expandvars(diretorio)
+        if not os.path.isdir(raiz):
+            continue
+        volume = volume_de(raiz)
+        for pasta, estado, arquivos in percurso.percorrer(raiz):
+            for entrada in arquivos:
+                if not any(fnmatch.fnmatch(entrada.name.lower(), padrao) for padrao in padroes):
+                    continue
+                if limitador:
+                    limitador.aguardar(volume, cancelado=cancelado)
+                try:
+                    info = os.stat(entrada.path)
+                except OSError:
+                    continue
+                if info.st_mtime < limite_mtime and info.st_size >= tamanho_minimo and percurso.arquivo_novo(info):
+                    yield entrada.path
+
+def diretorio_dados_app():
+    """Retorna (e cria, se necessário) a pasta de dados locais do aplicativo."""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser("~"), ".local", "share")
+    caminho = os.path.join(base, "LimpezaDeSistema")
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+def raiz_do_volume(caminho):
+    """Retorna a raiz do volume (ex.: 'C:\\' ou o ponto de montagem) que contém o caminho."""
+    caminho = os.path.abspath(caminho)
+    unidade, _ = os.path.splitdrive(caminho)
+    if unidade:
+        return unidade + os.sep
+    while not os.path.ismount(caminho):
+        caminho = os.path.dirname(caminho)
+    return caminho
+
+class LogEstruturado:
+    """
+    Log em JSON Lines com rotação por tamanho e quantidade de arquivos.
+
+    Os arquivos são '<nome>.000001.jsonl', '<nome>.000002.jsonl', ... e um índice lateral
+    '<nome>.idx' guarda, para cada execução, o arquivo e o deslocamento do seu primeiro
+    registro nele, para consultar uma execução sem percorrer o log inteiro.
+    """
+    def __init__(self, pasta, nome="limpeza_log", tamanho_maximo=LOG_TAMANHO_MAXIMO, quantidade=LOG_QUANTIDADE_ARQUIVOS):
+        self.pasta = pasta
+        self.nome = nome
+        self.tamanho_maximo = tamanho_maximo
+        self.quantidade = quantidade
+        self.caminho_indice = os.path.join(pasta, f"{nome}.idx")
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._indice = {} # run_id -> [(segmento, deslocamento)]
+        segmentos = self._segmentos()
+        self._segmento = segmentos[-1] if segmentos else 1
+        self._carregar_indice()
+
+    def _caminho_segmento(self, numero):
+        return os.path.join(self.pasta, f"{self.nome}.{numero:06d}.jsonl")
+
+    def _segmentos(self):
+        """Retorna os números dos arquivos de log existentes, em ordem."""
+        prefixo, sufixo = f"{self.nome}.", ".jsonl"
+        numeros = []
+        try:
+            for nome in os.listdir(self.pasta):
+                meio = nome[len(prefixo):-len(sufixo)]
+                if nome.startswith(prefixo) and nome.endswith(sufixo) and meio.isdigit():
+                    numeros.append(int(meio))
+        except FileNotFoundError:
+            pass
+        return sorted(numeros)
+
+    def _carregar_indice(self):
+        try:
+            with open(self.caminho_indice, encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        entrada = json.loads(linha)
+                    except ValueError:
+                        continue # Linha truncada por uma interrupção
+                    self._indice.setdefault(entrada["run"], []).append((entrada["seg"], entrada["off"]))
+        except FileNotFoundError:
+            pass
+
+    def _regravar_indice(self):
+        """Reescreve o índice sem as entradas de arquivos que já foram descartados."""
+        existentes = set(self._segmentos())
+        self._indice = {run: [e for e in entradas if e[0] in existentes] for run, entradas in self._indice.items()}
+        self._indice = {run: entradas for run, entradas in self._indice.items() if entradas}
+        with open(self.caminho_indice, "w", encoding='utf-8') as f:
+            for run, entradas in self._indice.items():
+                for segmento, deslocamento in entradas:
+                    f.write(json.dumps({"run": run, "seg": segmento, "off": deslocamento}) + "\n")
+
+    def _rotacionar(self):
+        self._arquivo.close()
+        self._segmento += 1
+        self._arquivo = open(self._caminho_segmento(self._segmento), "ab")
+        for numero in self._segmentos()[:-self.quantidade]:
+            try:
+                os.remove(self._caminho_segmento(numero))
+            except OSError:
+                pass
+        self._regravar_indice()
+
+    def escrever(self, registro):
+        """Acrescenta um registro (dicionário com pelo menos a chave 'run') ao log."""
+        dados = (json.dumps(registro, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        with self._lock:
+            if self._arquivo is None:
+                os.makedirs(self.pasta, exist_ok=True)
+                self._arquivo = open(self._caminho_segmento(self._segmento), "ab")
+            if self._arquivo.tell() > 0 and self._arquivo.tell() + len(dados) > self.tamanho_maximo:
+                self._rotacionar()
+
+            run_id = registro.get("run")
+            entradas = self._indice.setdefault(run_id, [])
+            if not entradas or entradas[-1][0] != self._segmento:
+                entradas.append((self._segmento, self._arquivo.tell()))
+                with open(self.caminho_indice, "a", encoding='utf-8') as f:
+                    f.write(json.dumps({"run": run_id, "seg": self._segmento, "off": self._arquivo.tell()}) + "\n")
+
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+
+    def execucoes(self):
+        """Retorna os ids das execuções presentes no log, da mais antiga à mais nova."""
+        with self._lock:
+            return list(self._indice)
+
+    def consultar(self, run_id):
+        """Gera os registros de uma execução, indo direto aos deslocamentos do índice."""
+        with self._lock:
+            entradas = list(self._indice.get(run_id, []))
+        for segmento, deslocamento in entradas:
+            try:
+                with open(self._caminho_segmento(segmento), "rb") as f:
+                    f.seek(deslocamento)
+                    for linha in f:
+                        try:
+                            registro = json.loads(linha)
+                        except ValueError:
+                            continue
+                        if registro.get("run") == run_id:
+                            yield registro
+            except FileNotFoundError:
+                continue
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo:
+                self._arquivo.close()
+                self._arquivo = None
+
+# --- Eventos tipados entre as threads de trabalho e os consumidores (interface, arquivo, terminal, agente) ---
+EVENTO_LOG = "log" # Linha de log: linha formatada, tag, tarefa e (se houver) o registro estruturado
+EVENTO_PROGRESSO = "progresso" # Percentual de uma tarefa de reparo ou da rotina de limpeza
+EVENTO_METRICA = "metrica" # Valor numérico nomeado (resultado de categoria, estatísticas do barramento, ...)
+EVENTO_ESTADO_TAREFA = "estado_tarefa" # Tarefa de reparo em execução ou concluída
+
+Evento = namedtuple("Evento", "tipo momento dados")
+
+class BarramentoEventos:
+    """
+    Canal único, em lote, pelo qual as threads de trabalho publicam eventos tipados.
+
+    Os produtores apenas acrescentam o evento à lista pendente; só o primeiro evento de
+    um lote acorda a thread de despacho, que espera 'intervalo' segundos para acumular
+    os seguintes e entrega o lote inteiro, em ordem, a cada consumidor (receber_lote).
+
+    Política quando os consumidores ficam para trás:
+    - eventos com 'chave' substituem o pendente de mesma chave (um progresso só importa
+      pelo valor mais recente); linhas de log com chave só substituem a linha anterior
+      se ela for a última pendente, para não reordenar o log;
+    - com a fila cheia, linhas 'CMD' são descartadas (e contadas) sem bloquear o produtor;
+    - os demais eventos bloqueiam o produtor por até 'espera_maxima' segundos
+      (contrapressão) e, se ainda não houver espaço, substituem a linha 'CMD' mais antiga.
+    """
+    def __init__(self, capacidade=FILA_LOG_CAPACIDADE, espera_maxima=FILA_LOG_ESPERA_MAXIMA, intervalo=BARRAMENTO_INTERVALO):
+        self.capacidade = capacidade
+        self.espera_maxima = espera_maxima
+        self.intervalo = intervalo
+        self._pendentes = []
+        self._chaves = {} # chave -> posição do evento pendente com essa chave
+        self._condicao = threading.Condition()
+        self._consumidores = []
+        self._omitidas = 0 # Linhas descartadas desde o último lote (viram um aviso no lote seguinte)
+        self._thread = None
+        self._parar = False
+        # Estatísticas
+        self.publicados = 0
+        self.lotes = 0
+        self.mescladas = 0
+        self.descartadas = 0
+
+    def __len__(self):
+        return len(self._pendentes)
+
+    def adicionar_consumidor(self, consumidor):
+        """Registra um consumidor (objeto com receber_lote(eventos)) e o devolve."""
+        with self._condicao:
+            self._consumidores = self._consumidores + [consumidor]
+        return consumidor
+
+    def remover_consumidor(self, consumidor):
+        with self._condicao:
+            self._consumidores = [c for c in self._consumidores if c is not consumidor]
+
+    @staticmethod
+    def _eh_linha_comando(evento):
+        return evento.tipo == EVENTO_LOG and evento.dados.get("tag") == "CMD"
+
+    def publicar(self, tipo, chave=None, **dados):
+        """Publica um evento. Pode ser chamado de qualquer thread; não espera pelos consumidores."""
+        evento = Evento(tipo, time.time(), dados)
+        with self._condicao:
+            self.publicados += 1
+            if chave is not None:
+                posicao = self._chaves.get(chave)
+                if posicao is not None and (tipo != EVENTO_LOG or posicao == len(self._pendentes) - 1):
+                    self._pendentes[posicao] = evento
+                    self.mescladas += 1
+                    return
+
+            if len(self._pendentes) >= self.capacidade:
+                if self._eh_linha_comando(evento):
+                    self._omitidas += 1
+                    self.descartadas += 1
+                    return
+                self._condicao.wait_for(lambda: len(self._pendentes) < self.capacidade, timeout=self.espera_maxima)
+                if len(self._pendentes) >= self.capacidade:
+                    for posicao, antigo in enumerate(self._pendentes):
+                        if self._eh_linha_comando(antigo):
+                            del self._pendentes[posicao]
+                            break
+                    else:
+                        self._omitidas += 1
+                        self.descartadas += 1
+                        return
+                    self._omitidas += 1
+                    self.descartadas += 1
+                    self._chaves = {c: i - (i > posicao) for c, i in self._chaves.items() if i != posicao}
+
+            if chave is not None:
+                self._chaves[chave] = len(self._pendentes)
+            self._pendentes.append(evento)
+            if len(self._pendentes) == 1:
+                self._condicao.notify_all() # Só o primeiro evento do lote acorda o despacho
+
+    def iniciar(self):
+        if self._thread is None:
+            self._parar = False
+            self._thread = threading.Thread(target=self._despachar, daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self, tempo_limite=2.0):
+        """Entrega o que estiver pendente e encerra a thread de despacho."""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify_all()
+        if self._thread:
+            self._thread.join(tempo_limite)
+            self._thread = None
+
+    def _despachar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendentes or self._parar)
+                if self._parar and not self._pendentes:
+                    return
+            if not self._parar:
+                time.sleep(self.intervalo) # Acumula os eventos publicados logo em seguida no mesmo lote
+            with self._condicao:
+                lote, self._pendentes, self._chaves = self._pendentes, [], {}
+                omitidas, self._omitidas = self._omitidas, 0
+                consumidores = self._consumidores
+                self._condicao.notify_all() # Libera produtores bloqueados pela fila cheia
+            if omitidas:
+                lote.insert(0, Evento(EVENTO_LOG, time.time(), {
+                    "linha": f"[... {omitidas} linhas de saída omitidas para não sobrecarregar a interface ...]\n",
+                    "tag": "AVISO", "tarefa": None}))
+            self.lotes += 1
+            for consumidor in consumidores:
+                try:
+                    consumidor.receber_lote(lote)
+                except Exception as e:
+                    print(f"AVISO: Falha ao entregar eventos a '{type(consumidor).__name__}'. Detalhes: {e}")
+
+    def estatisticas(self):
+        return {"publicados": self.publicados, "lotes": self.lotes, "mescladas": self.mescladas, "descartadas": self.descartadas}
+
+class ConsumidorArquivoLog:
+    """Grava os eventos de log (e as métricas) no log estruturado e, se ativado, no log em texto, um lote por vez."""
+    def __init__(self, log_estruturado, caminho_texto=None, texto_ativo=False):
+        self.log_estruturado = log_estruturado
+        self.caminho_texto = caminho_texto
+        self.texto_ativo = texto_ativo
+
+    def receber_lote(self, eventos):
+        linhas = []
+        for evento in eventos:
+            if evento.tipo == EVENTO_LOG:
+                registro = evento.dados.get("registro")
+                if registro is None:
+                    continue # Saída de comandos: só vai para a tela
+                linhas.append(evento.dados["linha"])
+            elif evento.tipo == EVENTO_METRICA:
+                registro = dict(evento.dados, ts=datetime.fromtimestamp(evento.momento).isoformat(timespec='milliseconds'),
+                                tag="METRICA", msg=f"Métrica '{evento.dados.get('nome')}'")
+            else:
+                continue
+            try:
+                self.log_estruturado.escrever(registro)
+            except Exception as e:
+                print(f"ERRO: Não foi possível escrever no log estruturado em '{self.log_estruturado.pasta}'. Detalhes: {e}")
+        if self.texto_ativo and self.caminho_texto and linhas:
+            try:
+                with open(self.caminho_texto, "a", encoding='utf-8') as f:
+                    f.writelines(linhas)
+            except Exception as e:
+                print(f"ERRO: Não foi possível escrever no arquivo de log '{self.caminho_texto}'. Detalhes: {e}")
+
+class ConsumidorTerminal:
+    """Consumidor sem interface: escreve as linhas de log e os progressos na saída padrão (modo serviço/agente)."""
+    def __init__(self, saida=None):
+        self.saida = saida or sys.stdout
+
+    def receber_lote(self, eventos):
+        partes = []
+        for evento in eventos:
+            if evento.tipo == EVENTO_LOG:
+                partes.append(evento.dados["linha"])
+            elif evento.tipo == EVENTO_PROGRESSO:
+                partes.append(f"[progresso] {evento.dados.get('tarefa') or 'limpeza'}: {evento.dados['percentual']:.0f}%\n")
+        if partes:
+            self.saida.write("".join(partes))
+            self.saida.flush()
+
+class ConsumidorAgente:
+    """Repassa os eventos ao agente de controle remoto (que já distribui em lote aos observadores)."""
+    def __init__(self, agente):
+        self.agente = agente
+
+    def receber_lote(self, eventos):
+        for evento in eventos:
+            if evento.tipo == EVENTO_LOG:
+                registro = evento.dados.get("registro")
+                if registro is not None:
+                    self.agente.publicar(dict(registro, tipo="log"))
+            else:
+                self.agente.publicar(dict(evento.dados, tipo=evento.tipo))
+
+class ConsumidorInterface:
+    """
+    Entrega os lotes à thread da interface. Enquanto uma entrega estiver agendada, os lotes
+    seguintes só se juntam a ela, de modo que a thread principal é acordada no máximo uma
+    vez por lote (e nunca por evento).
+
+    Os eventos à espera da interface são limitados a 'capacidade'. Se ela estiver atrasada,
+    o despacho do barramento espera até 'espera_maxima' segundos pela entrega anterior (a
+    contrapressão chega assim aos produtores) e, se ainda faltar espaço, descarta primeiro
+    as linhas 'CMD', depois os progressos já superados e, por fim, os eventos mais antigos;
+    as mudanças de estado das tarefas nunca são descartadas. A entrega seguinte começa
+    com um aviso dos eventos omitidos.
+    """
+    def __init__(self, agendar, tratar_eventos, capacidade=FILA_LOG_CAPACIDADE, espera_maxima=INTERFACE_ESPERA_MAXIMA):
+        self.agendar = agendar # ex.: root.after
+        self.tratar_eventos = tratar_eventos
+        self.capacidade = capacidade
+        self.espera_maxima = espera_maxima
+        self._condicao = threading.Condition()
+        self._eventos = []
+        self._agendado = False
+        self._omitidos = 0
+        self.acordadas = 0
+        self.descartados = 0
+
+    def __len__(self):
+        return len(self._eventos)
+
+    def receber_lote(self, eventos):
+        with self._condicao:
+            if len(self._eventos) + len(eventos) > self.capacidade:
+                self._condicao.wait_for(lambda: not self._eventos or len(self._eventos) + len(eventos) <= self.capacidade,
+                                        timeout=self.espera_maxima)
+            self._eventos.extend(eventos)
+            if len(self._eventos) > self.capacidade:
+                self._reduzir(len(self._eventos) - self.capacidade)
+            if self._agendado:
+                return
+            self._agendado = True
+        self.acordadas += 1
+        self.agendar(0, self._entregar)
+
+    def _reduzir(self, excesso):
+        """Descarta 'excesso' eventos pendentes, do menos ao mais importante e do mais antigo ao mais novo."""
+        ultimos_progressos = {}
+        for evento in self._eventos:
+            if evento.tipo == EVENTO_PROGRESSO:
+                ultimos_progressos[evento.dados.get("tarefa")] = evento
+        criterios = (
+            lambda evento: evento.tipo == EVENTO_LOG and evento.dados.get("tag") == "CMD",
+            lambda evento: evento.tipo == EVENTO_PROGRESSO and ultimos_progressos[evento.dados.get("tarefa")] is not evento,
+            lambda evento: evento.tipo != EVENTO_ESTADO_TAREFA,
+        )
+        for descartavel in criterios:
+            if excesso <= 0:
+                break
+            mantidos = []
+            for evento in self._eventos:
+                if excesso > 0 and descartavel(evento):
+                    excesso -= 1
+                    self._omitidos += 1
+                    self.descartados += 1
+                else:
+                    mantidos.append(evento)
+            self._eventos = mantidos
+
+    def _entregar(self):
+        with self._condicao:
+            eventos, self._eventos = self._eventos, []
+            omitidos, self._omitidos = self._omitidos, 0
+            self._agendado = False
+            self._condicao.notify_all() # Libera o despacho que espera por espaço
+        if omitidos:
+            eventos.insert(0, Evento(EVENTO_LOG, eventos[0].momento if eventos else time.time(), {
+                "linha": f"[... {omitidos} eventos omitidos: a interface não acompanhou o ritmo ...]\n",
+                "tag": "AVISO", "tarefa": None}))
+        self.tratar_eventos(eventos)
+
+class ArmazemLog:
+    """
+    Linhas de log da sessão em memória, indexadas por tag, momento e tarefa.
+
+    As linhas ficam em listas paralelas, ordenadas pelo momento, e cada tag e cada tarefa
+    guarda a lista ordenada dos índices das suas linhas. Linhas de várias threads podem
+    chegar fora de ordem; uma linha mais antiga que a última é inserida na sua posição e os
+    índices seguintes são deslocados. Assim um período vira um intervalo de índices por
+    busca binária. Trocar de filtro, portanto, não percorre todas as linhas;
+    a busca por texto percorre só as linhas já filtradas e, quando o termo apenas ganhou
+    letras, só o resultado da busca anterior. Uma cópia do texto em minúsculas é guardada
+    para que a busca seja só uma comparação de substring por linha.
+    """
+    def __init__(self, capacidade=LOG_MEMORIA_LINHAS):
+        self.capacidade = capacidade
+        self.limpar()
+
+    def limpar(self):
+        self.textos, self.tags, self.momentos, self.tarefas = [], [], [], []
+        self._textos_busca = []
+        self.por_tag, self.por_tarefa = {}, {}
+        self.descartadas = 0 # Linhas antigas removidas por falta de capacidade
+        self._busca_anterior = None
+
+    def __len__(self):
+        return len(self.textos)
+
+    def adicionar(self, texto, tag, tarefa=None, momento=None):
+        """
+        Acrescenta uma linha na posição do seu momento e retorna o seu índice. Se ele não for
+        o último, as linhas a partir dele mudaram de índice (ver 'deslocar_indices').
+        """
+        if len(self.textos) >= self.capacidade:
+            self._descartar_antigas()
+        momento = momento if momento is not None else time.time()
+        if not self.momentos or momento >= self.momentos[-1]:
+            indice = len(self.textos)
+            self.textos.append(texto)
+            self._textos_busca.append(texto.casefold())
+            self.tags.append(tag)
+            self.momentos.append(momento)
+            self.tarefas.append(tarefa)
+            self.por_tag.setdefault(tag, []).append(indice)
+            if tarefa:
+                self.por_tarefa.setdefault(tarefa, []).append(indice)
+            return indice
+        # Chegou depois de uma linha mais nova (outra thread): entra na posição do seu momento
+        indice = bisect.bisect_right(self.momentos, momento)
+        self.textos.insert(indice, texto)
+        self._textos_busca.insert(indice, texto.casefold())
+        self.tags.insert(indice, tag)
+        self.momentos.insert(indice, momento)
+        self.tarefas.insert(indice, tarefa)
+        for lista in itertools.chain(self.por_tag.values(), self.por_tarefa.values()):
+            self.deslocar_indices(lista, indice)
+        bisect.insort(self.por_tag.setdefault(tag, []), indice)
+        if tarefa:
+            bisect.insort(self.por_tarefa.setdefault(tarefa, []), indice)
+        return indice
+
+    @staticmethod
+    def deslocar_indices(lista, indice):
+        """Soma 1 aos índices >= 'indice' de uma lista ordenada (linha inserida antes deles)."""
+        for posicao in range(bisect.bisect_left(lista, indice), len(lista)):
+            lista[posicao] += 1
+
+    def _descartar_antigas(self):
+        # Remove o quarto mais antigo de uma vez e reconstrói os índices (custo amortizado)
+        corte = max(1, self.capacidade // 4)
+        textos, tags, momentos, tarefas = self.textos[corte:], self.tags[corte:], self.momentos[corte:], self.tarefas[corte:]
+        descartadas = self.descartadas + corte
+        self.limpar()
+        self.descartadas = descartadas
+        for texto, tag, momento, tarefa in zip(textos, tags, momentos, tarefas):
+            self.adicionar(texto, tag, tarefa, momento)
+
+    def _candidatos(self, tags, tarefa, desde):
+        """Índices ordenados que atendem a tag, tarefa e período (sem a busca por texto)."""
+        inicio = bisect.bisect_left(self.momentos, desde) if desde is not None else 0
+        if tags is not None and set(tags) >= self.por_tag.keys():
+            tags = None # Todas as tags presentes: equivale a não filtrar
+        if tarefa is not None:
+            lista = self.por_tarefa.get(tarefa, [])
+            if tags is not None:
+                lista = [i for i in lista if self.tags[i] in tags]
+        elif tags is not None:
+            listas = [self.por_tag[t] for t in tags if t in self.por_tag]
+            # As listas já estão ordenadas: o timsort só as intercala
+            lista = listas[0] if len(listas) == 1 else sorted(itertools.chain.from_iterable(listas))
+        else:
+            return range(inicio, len(self.textos))
+        return lista[bisect.bisect_left(lista, inicio):] # Fatia: uma cópia que o chamador pode estender
+
+    def filtrar(self, tags=None, tarefa=None, texto=None, desde=None):
+        """
+        Retorna a sequência ordenada dos índices das linhas que atendem aos filtros.
+        'tags' é um conjunto de tags (None = todas) e 'texto' é procurado sem diferenciar maiúsculas.
+        """
+        tags = frozenset(tags) if tags is not None else None
+        candidatos = self._candidatos(tags, tarefa, desde)
+        termo = texto.casefold() if texto else None
+        if not termo:
+            return candidatos
+        chave = (tags, tarefa, desde, len(self.textos), self.descartadas)
+        anterior = self._busca_anterior
+        if anterior and anterior[0] == chave and termo.startswith(anterior[1]):
+            candidatos = anterior[2] # O termo só cresceu: refina o resultado anterior
+        textos = self._textos_busca
+        resultado = [i for i in candidatos if termo in textos[i]]
+        self._busca_anterior = (chave, termo, resultado)
+        return resultado
+
+    def atende(self, indice, tags=None, tarefa=None, texto=None, desde=None):
+        """True se a linha 'indice' atende aos filtros (para acrescentar linhas novas a uma visão)."""
+        return ((tags is None or self.tags[indice] in tags)
+                and (tarefa is None or self.tarefas[indice] == tarefa)
+                and (desde is None or self.momentos[indice] >= desde)
+                and (not texto or texto.casefold() in self._textos_busca[indice]))
+
+class BufferCircular:
+    """
+    Guarda as últimas N linhas da saída de um comando em memória de tamanho fixo.
+
+    Linhas de progresso consecutivas são mescladas. Opcionalmente, a saída completa é
+    despejada em um arquivo '.gz' para consulta posterior.
+    """
+    def __init__(self, capacidade=SAIDA_COMANDO_LINHAS, arquivo_despejo=None):
+        self._linhas = deque(maxlen=capacidade)
+        self._ultima_progresso = False
+        self.total_linhas = 0
+        self.arquivo_despejo = arquivo_despejo
+        self._despejo = gzip.open(arquivo_despejo, 'wt', encoding='utf-8') if arquivo_despejo else None
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def append(self, linha):
+        self.total_linhas += 1
+        if self._despejo:
+            self._despejo.write(linha)
+        progresso = _RE_LINHA_PROGRESSO.search(linha) is not None
+        if progresso and self._ultima_progresso and self._linhas:
+            self._linhas[-1] = linha
+        else:
+            self._linhas.append(linha)
+        self._ultima_progresso = progresso
+
+    def linhas(self):
+        return list(self._linhas)
+
+    def fechar(self):
+        if self._despejo:
+            self._despejo.close()
+            self._despejo = None
+
+def arquivo_despejo_saida(task_id):
+    """Retorna um caminho novo para a saída completa de um comando, descartando as mais antigas."""
+    pasta = os.path.join(diretorio_dados_app(), "saidas")
+    os.makedirs(pasta, exist_ok=True)
+    existentes = sorted(os.listdir(pasta))
+    for nome in existentes[:max(0, len(existentes) - SAIDAS_QUANTIDADE_MAXIMA + 1)]:
+        try:
+            os.remove(os.path.join(pasta, nome))
+        except OSError:
+            pass
+    return os.path.join(pasta, f"{datetime.now():%Y%m%d-%H%M%S}-{task_id}.log.gz")
+
+class AnalisadorProgresso:
+    """
+    Converte, linha a linha, a saída de uma ferramenta em eventos de progresso limitados
+    (no máximo um a cada 'intervalo_minimo' segundos), com taxa (%/s) e ETA.
+
+    Quando o percentual recomeça (ex.: o defrag passa da análise para a otimização),
+    uma nova fase é iniciada e a taxa é recalculada a partir dela.
+    """
+    def __init__(self, ferramenta, intervalo_minimo=PROGRESSO_INTERVALO_MINIMO):
+        self.ferramenta = ferramenta
+        self.padrao = PADROES_PROGRESSO[ferramenta]
+        self.intervalo_minimo = intervalo_minimo
+        self.percentual = 0.0
+        self.fase = ""
+        self._inicio_fase = None # (instante, percentual) no início da fase atual
+        self._ultimo_envio = 0.0
+
+    def alimentar(self, linha, agora=None):
+        """Processa uma linha; retorna um evento (dicionário) ou None."""
+        if '%' not in linha: # Filtro barato antes da expressão regular
+            return None
+        correspondencia = self.padrao.search(linha)
+        if not correspondencia:
+            return None
+        agora = time.monotonic() if agora is None else agora
+        percentual = min(float(correspondencia.group('pct').replace(',', '.')), 100.0)
+        fase = (correspondencia.groupdict().get('fase') or "").strip()
+
+        if self._inicio_fase is None or fase != self.fase or percentual < self.percentual:
+            self._inicio_fase = (agora, percentual)
+            self.fase = fase
+        self.percentual = percentual
+
+        if agora - self._ultimo_envio < self.intervalo_minimo and percentual < 100:
+            return None
+        self._ultimo_envio = agora
+
+        instante_inicial, percentual_inicial = self._inicio_fase
+        decorrido = agora - instante_inicial
+        taxa = (percentual - percentual_inicial) / decorrido if decorrido > 0 else 0.0
+        eta = (100 - percentual) / taxa if taxa > 0 else None
+        return {"ferramenta": self.ferramenta, "fase": fase, "percentual": percentual, "taxa": taxa, "eta": eta}
+
+def criar_analisador_progresso(command):
+    """Retorna o analisador de progresso adequado ao comando, ou None se não houver um."""
+    executavel = command[0] if isinstance(command, (list, tuple)) else command.split()[0]
+    ferramenta = os.path.splitext(os.path.basename(executavel))[0].lower()
+    return AnalisadorProgresso(ferramenta) if ferramenta in PADROES_PROGRESSO else None
+
+class InventarioUnidades:
+    """
+    Serviço em segundo plano que mantém em cache as unidades disponíveis e o seu espaço.
+
+    Cada unidade é sondada em uma thread própria com tempo limite, de modo que um
+    compartilhamento de rede desconectado ou um leitor de cartões vazio não trave
+    quem consulta o inventário. Uma sonda travada não é repetida até responder; enquanto
+    isso, a unidade mantém no inventário os últimos valores conhecidos.
+    """
+    def __init__(self, candidatos=None, intervalo=INVENTARIO_INTERVALO, tempo_limite=INVENTARIO_TEMPO_LIMITE, ao_atualizar=None):
+        self.candidatos = candidatos or [f"{letra}:" for letra in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ']
+        self.intervalo = intervalo
+        self.tempo_limite = tempo_limite
+        self.ao_atualizar = ao_atualizar # Chamado com o inventário a cada atualização
+        self._cache = {} # unidade -> (total, livre)
+        self._lock = threading.Lock()
+        self._lock_atualizacao = threading.Lock() # Uma atualização por vez (ciclo periódico e medições da limpeza)
+        self._sondas_pendentes = set()
+        self._parar = threading.Event()
+
+    def _sondar(self, unidade, resultados):
+        """Executada em uma thread própria: lê o espaço da unidade, se ela existir."""
+        try:
+            raiz = unidade + os.sep if unidade.endswith(':') else unidade
+            if os.path.exists(raiz):
+                uso = shutil.disk_usage(raiz)
+                resultados[unidade] = (uso.total, uso.free)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sondas_pendentes.discard(unidade)
+
+    def atualizar(self):
+        """Sonda todas as unidades (em paralelo, com tempo limite) e retorna o novo inventário."""
+        with self._lock_atualizacao:
+            return self._atualizar()
+
+    def _atualizar(self):
+        resultados = {}
+        threads = []
+        with self._lock:
+            pendentes = set(self._sondas_pendentes)
+        for unidade in self.candidatos:
+            if unidade in pendentes:
+                continue # A sonda anterior desta unidade ainda não respondeu
+            with self._lock:
+                self._sondas_pendentes.add(unidade)
+            thread = threading.Thread(target=self._sondar, args=(unidade, resultados), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        prazo = time.monotonic() + self.tempo_limite
+        for thread in threads:
+            thread.join(max(0.0, prazo - time.monotonic()))
+
+        with self._lock:
+            # Unidade sem resposta no prazo (ou com a sonda anterior ainda travada): fica com o último valor conhecido
+            sem_resposta = self._sondas_pendentes
+            self._cache = {unidade: resultados[unidade] if unidade in resultados else self._cache[unidade]
+                           for unidade in self.candidatos
+                           if unidade in resultados or (unidade in sem_resposta and unidade in self._cache)}
+            inventario = dict(self._cache)
+        if self.ao_atualizar:
+            self.ao_atualizar(inventario)
+        return inventario
+
+    def unidades(self):
+        """Retorna o inventário em cache: {unidade: (total, livre)}."""
+        with self._lock:
+            return dict(self._cache)
+
+    def iniciar(self):
+        """Inicia a atualização periódica em segundo plano."""
+        def ciclo():
+            while not self._parar.is_set():
+                self.atualizar()
+                self._parar.wait(self.intervalo)
+        threading.Thread(target=ciclo, daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+
+class MonitorOciosidade:
+    """
+    Mede a ociosidade do sistema: uso de CPU (descontando o próprio processo e os seus
+    descendentes, como o pool de compactação), fila de disco e tempo desde a última
+    entrada do usuário. Medidas indisponíveis retornam None
+    e não impedem o sistema de ser considerado ocioso.
+    """
+    class _FILETIME(ctypes.Structure):
+        _fields_ = [("baixo", ctypes.c_ulong), ("alto", ctypes.c_ulong)]
+
+    class _LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_ulong)]
+
+    class _PDH_FMT_COUNTERVALUE(ctypes.Structure):
+        _fields_ = [("CStatus", ctypes.c_ulong), ("doubleValue", ctypes.c_double)]
+
+    class _PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [("dwSize", ctypes.c_ulong), ("cntUsage", ctypes.c_ulong), ("th32ProcessID", ctypes.c_ulong),
+                    ("th32DefaultHeapID", ctypes.c_void_p), ("th32ModuleID", ctypes.c_ulong), ("cntThreads", ctypes.c_ulong),
+                    ("th32ParentProcessID", ctypes.c_ulong), ("pcPriClassBase", ctypes.c_long), ("dwFlags", ctypes.c_ulong),
+                    ("szExeFile", ctypes.c_wchar * 260)]
+
+    PDH_FMT_DOUBLE = 0x00000200
+
+    def __init__(self, cpu_maxima=SERVICO_CPU_MAXIMA, fila_disco_maxima=SERVICO_FILA_DISCO_MAXIMA, ocioso_minimo=SERVICO_OCIOSO_MINIMO):
+        self.cpu_maxima = cpu_maxima
+        self.fila_disco_maxima = fila_disco_maxima
+        self.ocioso_minimo = ocioso_minimo
+        self._amostra_cpu = None
+        self._cpu_descendentes = {} # pid -> CPU (s) na amostra anterior
+        self._consulta_disco = None
+        self._contador_disco = None
+        self._windows = os.name == 'nt'
+        if self._windows:
+            self._iniciar_contador_disco()
+        self.cpu_percentual() # Primeira amostra: referência para as próximas medições
+
+    def _iniciar_contador_disco(self):
+        try:
+            pdh = ctypes.windll.pdh
+            consulta, contador = ctypes.c_void_p(), ctypes.c_void_p()
+            if pdh.PdhOpenQueryW(None, None, ctypes.byref(consulta)) != 0:
+                return
+            caminho = "\\PhysicalDisk(_Total)\\Avg. Disk Queue Length"
+            if pdh.PdhAddEnglishCounterW(consulta, caminho, None, ctypes.byref(contador)) != 0:
+                pdh.PdhCloseQuery(consulta)
+                return
+            pdh.PdhCollectQueryData(consulta) # Primeira coleta: referência para as próximas
+            self._consulta_disco, self._contador_disco = consulta, contador
+        except Exception:
+            self._consulta_disco = None
+
+    def _tempos_sistema(self):
+        """Retorna (ocioso, total) em unidades de 100 ns, ou None."""
+        if self._windows:
+            ocioso, kernel, usuario = self._FILETIME(), self._FILETIME(), self._FILETIME()
+            if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(ocioso), ctypes.byref(kernel), ctypes.byref(usuario)):
+                return None
+            valor = lambda ft: (ft.alto << 32) | ft.baixo
+            return valor(ocioso), valor(kernel) + valor(usuario) # O tempo de kernel já inclui o ocioso
+        try:
+            with open("/proc/stat") as f:
+                campos = [int(v) for v in f.readline().split()[1:]]
+            return (campos[3] + campos[4]) * 100000, sum(campos) * 100000
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _cpu_processos_descendentes(self):
+        """Retorna {pid: CPU em segundos} dos processos descendentes deste, ou {} se não for possível medir."""
+        pais = {} # pid -> pid do pai
+        tempos = {}
+        if self._windows:
+            kernel32 = ctypes.windll.kernel32
+            kernel32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+            kernel32.OpenProcess.restype = ctypes.c_void_p
+            instantaneo = kernel32.CreateToolhelp32Snapshot(0x2, 0) # TH32CS_SNAPPROCESS
+            if not instantaneo or instantaneo == ctypes.c_void_p(-1).value:
+                return {}
+            try:
+                entrada = self._PROCESSENTRY32W(dwSize=ctypes.sizeof(self._PROCESSENTRY32W))
+                existe = kernel32.Process32FirstW(ctypes.c_void_p(instantaneo), ctypes.byref(entrada))
+                while existe:
+                    pais[entrada.th32ProcessID] = entrada.th32ParentProcessID
+                    existe = kernel32.Process32NextW(ctypes.c_void_p(instantaneo), ctypes.byref(entrada))
+            finally:
+                kernel32.CloseHandle(ctypes.c_void_p(instantaneo))
+        else:
+            try:
+                pids = [nome for nome in os.listdir("/proc") if nome.isdigit()]
+            except OSError:
+                return {}
+            por_segundo = os.sysconf('SC_CLK_TCK')
+            for nome in pids:
+                try:
+                    with open(f"/proc/{nome}/stat") as f:
+                        campos = f.read().rpartition(')')[2].split() # O nome do processo pode ter espaços
+                except OSError:
+                    continue # Processo encerrado durante a leitura
+                pais[int(nome)] = int(campos[1])
+                tempos[int(nome)] = (int(campos[11]) + int(campos[12])) / por_segundo # utime + stime
+
+        descendentes, pendentes = set(), [os.getpid()]
+        filhos = {}
+        for pid, pai in pais.items():
+            filhos.setdefault(pai, []).append(pid)
+        while pendentes:
+            for filho in filhos.get(pendentes.pop(), ()):
+                if filho not in descendentes:
+                    descendentes.add(filho)
+                    pendentes.append(filho)
+        if not self._windows:
+            return {pid: tempos[pid] for pid in descendentes}
+
+        resultado = {}
+        for pid in descendentes:
+            processo = kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+            if not processo:
+                continue
+            try:
+                criacao, saida, kernel, usuario = self._FILETIME(), self._FILETIME(), self._FILETIME(), self._FILETIME()
+                if kernel32.GetProcessTimes(ctypes.c_void_p(processo), ctypes.byref(criacao), ctypes.byref(saida),
+                                            ctypes.byref(kernel), ctypes.byref(usuario)):
+                    valor = lambda ft: (ft.alto << 32) | ft.baixo
+                    resultado[pid] = (valor(kernel) + valor(usuario)) / 1e7
+            finally:
+                kernel32.CloseHandle(ctypes.c_void_p(processo))
+        return resultado
+
+    def cpu_percentual(self):
+        """Uso de CPU (%) do sistema desde a última chamada, descontado o uso deste processo e dos seus descendentes."""
+        tempos = self._tempos_sistema()
+        if tempos is None:
+            return None
+        try:
+            descendentes = self._cpu_processos_descendentes()
+        except Exception:
+            descendentes = {}
+        # Só o que cada descendente usou desde a amostra anterior (os novos, desde que começaram)
+        delta_descendentes = sum(max(0.0, cpu - self._cpu_descendentes.get(pid, 0.0)) for pid, cpu in descendentes.items())
+        self._cpu_descendentes = descendentes
+        amostra = (tempos, time.process_time())
+        anterior, self._amostra_cpu = self._amostra_cpu, amostra
+        if anterior is None:
+            return None
+        (ocioso_ant, total_ant), proprio_ant = anterior
+        (ocioso, total), proprio = amostra
+        delta_total = total - total_ant
+        if delta_total <= 0:
+            return None
+        ocupado = (delta_total - (ocioso - ocioso_ant)) / delta_total * 100
+        proprio_pct = (proprio - proprio_ant + delta_descendentes) * 1e7 / delta_total * 100
+        return max(0.0, ocupado - proprio_pct)
+
+    def fila_disco(self):
+        """Fila média de disco desde a última coleta, ou None se indisponível."""
+        if not self._consulta_disco:
+            return None
+        try:
+            pdh = ctypes.windll.pdh
+            if pdh.PdhCollectQueryData(self._consulta_disco) != 0:
+                return None
+            valor = self._PDH_FMT_COUNTERVALUE()
+            if pdh.PdhGetFormattedCounterValue(self._contador_disco, self.PDH_FMT_DOUBLE, None, ctypes.byref(valor)) != 0:
+                return None
+            return valor.doubleValue
+        except Exception:
+            return None
+
+    def segundos_sem_entrada(self):
+        """Segundos desde a última entrada de teclado/mouse na sessão, ou None se indisponível."""
+        if not self._windows:
+            return None
+        info = self._LASTINPUTINFO()
+        info.cbSize = ctypes.sizeof(info)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+    def avaliar(self, considerar_disco=True):
+        """
+        Retorna (ocioso, motivo). Durante uma limpeza em andamento, a fila de disco é
+        causada pela própria limpeza e pode ser ignorada com 'considerar_disco=False'.
+        """
+        cpu = self.cpu_percentual()
+        if cpu is not None and cpu > self.cpu_maxima:
+            return False, f"CPU em {cpu:.0f}%"
+        if considerar_disco:
+            fila = self.fila_disco()
+            if fila is not None and fila > self.fila_disco_maxima:
+                return False, f"fila de disco em {fila:.1f}"
+        sem_entrada = self.segundos_sem_entrada()
+        if sem_entrada is not None and sem_entrada < self.ocioso_minimo:
+            return False, f"usuário ativo há {sem_entrada:.0f}s"
+        return True, "sistema ocioso"
+
+class AgenteControle:
+    """
+    Agente de controle remoto (asyncio) para orquestração de várias máquinas.
+
+    Expõe, com autenticação por token ('Authorization: Bearer <token>'):
+    - POST /rpc: JSON-RPC 2.0 com os métodos 'listar_jobs', 'iniciar' (nome, parametros),
+      'estado' (id) e 'jobs';
+    - GET /eventos: conexão longa que transmite eventos de log, progresso e estado
+      dos jobs em JSON Lines.
+
+    Os jobs são funções comuns 'funcao(parametros)' executadas em threads próprias. Os
+    eventos publicados por qualquer thread são agrupados e serializados uma única vez
+    antes de serem distribuídos às filas (limitadas) de todos os observadores.
+    """
+    def __init__(self, jobs, token, host=AGENTE_HOST, porta=AGENTE_PORTA, fila_observador=AGENTE_FILA_OBSERVADOR):
+        if not token:
+            raise ValueError("O agente de controle exige um token de autenticação.")
+        self.jobs_disponiveis = jobs
+        self.token = token
+        self.host = host
+        self.porta = porta
+        self.fila_observador = fila_observador
+        self.loop = None
+        self._servidor = None
+        self._observadores = set()
+        self._pendentes = []
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._pronto = threading.Event()
+        self.eventos_descartados = 0
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        """Inicia o laço asyncio do agente em uma thread própria e aguarda o servidor estar pronto."""
+        erro = []
+
+        def executar():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self._servidor = self.loop.run_until_complete(asyncio.start_server(self._atender, self.host, self.porta))
+                self.porta = self._servidor.sockets[0].getsockname()[1] # Porta real, caso 0 tenha sido pedido
+            except Exception as e:
+                erro.append(e)
+                self._pronto.set()
+                return
+            self._pronto.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=executar, daemon=True).start()
+        self._pronto.wait()
+        if erro:
+            raise erro[0]
+
+    def parar(self):
+        if self.loop and self._servidor:
+            def encerrar():
+                self._servidor.close()
+                for fila in list(self._observadores):
+                    if fila.full():
+                        fila.get_nowait() # Observador lento: abre espaço para o sinal de fim
+                        self.eventos_descartados += 1
+                    fila.put_nowait(None)
+                self.loop.stop()
+            self.loop.call_soon_threadsafe(encerrar)
+
+    # --- Eventos ---
+
+    def publicar(self, evento):
+        """Publica um evento (dicionário) para todos os observadores. Pode ser chamado de qualquer thread."""
+        with self._lock:
+            self._pendentes.append(evento)
+            agendar = len(self._pendentes) == 1
+        if agendar and self.loop:
+            # Um único despertar do laço por lote de eventos acumulados
+            self.loop.call_soon_threadsafe(self._distribuir)
+
+    def _distribuir(self):
+        with self._lock:
+            eventos, self._pendentes = self._pendentes, []
+        if not eventos or not self._observadores:
+            return
+        dados = b"".join((json.dumps(evento, ensure_ascii=False, default=str) + "\n").encode('utf-8') for evento in eventos)
+        for fila in self._observadores:
+            if fila.full():
+                fila.get_nowait() # Observador lento: descarta o lote mais antigo
+                self.eventos_descartados += 1
+            fila.put_nowait(dados)
+
+    # --- Jobs ---
+
+    def iniciar_job(self, nome, parametros=None):
+        """Inicia um job em uma thread própria e retorna o seu id."""
+        if nome not in self.jobs_disponiveis:
+            raise KeyError(f"Job desconhecido: '{nome}'")
+        with self._lock:
+            if any(job["nome"] == nome and job["estado"] == "executando" for job in self._jobs.values()):
+                raise RuntimeError(f"O job '{nome}' já está em execução.")
+            job_id = next(self._ids)
+            job = {"id": job_id, "nome": nome, "parametros": parametros or {}, "estado": "executando",
+                   "inicio": time.time(), "fim": None, "resultado": None, "erro": None}
+            self._jobs[job_id] = job
+        self.publicar({"tipo": "estado", "job": job_id, "nome": nome, "estado": "executando"})
+
+        def executar():
+            try:
+                resultado, erro, estado = self.jobs_disponiveis[nome](job["parametros"]), None, "concluido"
+            except Exception as e:
+                resultado, erro, estado = None, str(e), "falhou"
+            with self._lock: # 'estado' e 'jobs' leem os jobs de outra thread
+                job.update(resultado=resultado, erro=erro, estado=estado, fim=time.time())
+            self.publicar({"tipo": "estado", "job": job_id, "nome": nome, "estado": job["estado"],
+                           "resultado": job["resultado"], "erro": job["erro"]})
+
+        threading.Thread(target=executar, daemon=True).start()
+        return job_id
+
+    def _chamar_metodo(self, metodo, parametros):
+        if metodo == "listar_jobs":
+            return sorted(self.jobs_disponiveis)
+        if metodo == "iniciar":
+            return self.iniciar_job(parametros.get("nome"), parametros.get("parametros"))
+        if metodo == "estado":
+            with self._lock:
+                job = self._jobs.get(parametros.get("id"))
+                job = dict(job) if job is not None else None
+            if job is None:
+                raise KeyError(f"Job inexistente: {parametros.get('id')}")
+            return job
+        if metodo == "jobs":
+            with self._lock:
+                return [dict(job) for job in self._jobs.values()]
+        raise LookupError(metodo)
+
+    # --- HTTP ---
+
+    async def _atender(self, leitor, escritor):
+        try:
+            linha = await asyncio.wait_for(leitor.readline(), 30)
+            partes = linha.decode('latin-1').split()
+            if len(partes) < 2:
+                return
+            metodo_http, rota = partes[0], partes[1]
+            cabecalhos = {}
+            while True:
+                linha = await asyncio.wait_for(leitor.readline(), 30)
+                if linha in (b"\r\n", b"\n", b""):
+                    break
+                if len(cabecalhos) > 100:
+                    return
+                nome, _, valor = linha.decode('latin-1').partition(":")
+                cabecalhos[nome.strip().lower()] = valor.strip()
+
+            autorizacao = cabecalhos.get("authorization", "")
+            if not hmac.compare_digest(autorizacao.encode(), f"Bearer {self.token}".encode()):
+                await self._responder(escritor, 401, {"erro": "não autorizado"})
+                return
+
+            if metodo_http == "GET" and rota == "/eventos":
+                await self._transmitir_eventos(escritor)
+            elif metodo_http == "POST" and rota == "/rpc":
+                tamanho = int(cabecalhos.get("content-length", "0"))
+                if tamanho > AGENTE_TAMANHO_MAXIMO_CORPO:
+                    await self._responder(escritor, 413, {"erro": "corpo muito grande"})
+                    return
+                corpo = await leitor.readexactly(tamanho)
+                await self._responder(escritor, 200, self._processar_rpc(corpo))
+            else:
+                await self._responder(escritor, 404, {"erro": "rota inexistente"})
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    def _processar_rpc(self, corpo):
+        try:
+            requisicao = json.loads(corpo)
+        except ValueError:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "JSON inválido"}}
+        if not isinstance(requisicao, dict):
+            # Lotes ('[...]') e valores soltos não são aceitos
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Requisição inválida: esperado um objeto JSON"}}
+        id_requisicao = requisicao.get("id")
+        try:
+            resultado = self._chamar_metodo(requisicao.get("method"), requisicao.get("params") or {})
+            return {"jsonrpc": "2.0", "id": id_requisicao, "result": resultado}
+        except LookupError as e:
+            if isinstance(e, KeyError):
+                return {"jsonrpc": "2.0", "id": id_requisicao, "error": {"code": -32602, "message": str(e.args[0])}}
+            return {"jsonrpc": "2.0", "id": id_requisicao, "error": {"code": -32601, "message": f"Método inexistente: {e}"}}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": id_requisicao, "error": {"code": -32000, "message": str(e)}}
+
+    @staticmethod
+    async def _responder(escritor, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False, default=str).encode('utf-8')
+        textos = {200: "OK", 401: "Unauthorized", 404: "Not Found", 413: "Payload Too Large"}
+        escritor.write(f"HTTP/1.1 {status} {textos.get(status, '')}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n".encode('latin-1') + corpo)
+        await escritor.drain()
+
+    async def _transmitir_eventos(self, escritor):
+        fila = asyncio.Queue(self.fila_observador)
+        self._observadores.add(fila)
+        try:
+            escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            await escritor.drain()
+            while True:
+                dados = await fila.get()
+                if dados is None:
+                    return
+                lote = [dados]
+                while not fila.empty(): # Junta o que acumulou numa única escrita
+                    dados = fila.get_nowait()
+                    if dados is None:
+                        break
+                    lote.append(dados)
+                escritor.write(b"".join(lote))
+                await escritor.drain()
+                if dados is None:
+                    return
+        finally:
+            self._observadores.discard(fila)
+
+class OrquestradorProcessos:
+    """
+    Um único laço asyncio, em uma thread de trabalho, que conduz todos os processos filhos.
+
+    A saída é lida em blocos e decodificada de forma incremental; cada linha completa é
+    entregue a um callback e o término do processo é entregue como evento (callback),
+    sem polling. Vários comandos simultâneos não custam threads adicionais.
+    """
+    TAMANHO_BLOCO = 64 * 1024
+
+    def __init__(self, encoding=CMD_ENCODING):
+        self.encoding = encoding
+        self.loop = None
+        self._lock = threading.Lock()
+
+    def _laco(self):
+        """Retorna o laço do orquestrador, iniciando a sua thread na primeira chamada."""
+        with self._lock:
+            if self.loop is None:
+                pronto = threading.Event()
+                def executar():
+                    laco = asyncio.new_event_loop()
+                    asyncio.set_event_loop(laco)
+                    self._vigiar_filhos_sem_threads(laco)
+                    self.loop = laco
+                    pronto.set()
+                    laco.run_forever()
+                threading.Thread(target=executar, daemon=True).start()
+                pronto.wait()
+            return self.loop
+
+    @staticmethod
+    def _vigiar_filhos_sem_threads(laco):
+        """
+        No Windows o laço Proactor já acompanha os processos sem threads extras. Nos demais
+        sistemas, antes do Python 3.12, o padrão cria uma thread por filho; usa pidfd se houver.
+        """
+        if os.name == 'nt' or sys.version_info >= (3, 12) or not hasattr(asyncio, 'PidfdChildWatcher'):
+            return
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+            vigia = asyncio.PidfdChildWatcher()
+            vigia.attach_loop(laco)
+            asyncio.set_child_watcher(vigia)
+        except (OSError, AttributeError):
+            pass
+
+    @staticmethod
+    async def _iniciar(command, **opcoes):
+        opcoes.setdefault('stdin', subprocess.DEVNULL)
+        opcoes.setdefault('stdout', asyncio.subprocess.PIPE)
+        opcoes.setdefault('stderr', asyncio.subprocess.STDOUT)
+        if isinstance(command, str):
+            return await asyncio.create_subprocess_shell(command, **opcoes)
+        return await asyncio.create_subprocess_exec(*command, **opcoes)
+
+    async def _ler_linhas(self, fluxo, ao_receber_linha):
+        """Lê o fluxo em blocos e entrega cada linha completa (terminada em '\\n')."""
+        decodificador = codecs.getincrementaldecoder(self.encoding)(errors='ignore')
+        pendente = ""
+        while True:
+            bloco = await fluxo.read(self.TAMANHO_BLOCO)
+            linhas = (pendente + decodificador.decode(bloco, final=not bloco)).splitlines(keepends=True)
+            pendente = ""
+            # A última linha fica pendente se estiver incompleta (ou terminar em '\\r', que pode ser um '\\r\\n' partido)
+            if bloco and linhas and (linhas[-1].endswith('\r') or not linhas[-1].endswith('\n')):
+                pendente = linhas.pop()
+            for linha in linhas:
+                ao_receber_linha(linha.rstrip('\r\n') + '\n')
+            if not bloco:
+                return
+
+    def executar(self, command, ao_receber_linha, ao_concluir, **opcoes):
+        """
+        Inicia um comando e retorna imediatamente um Future (concurrent.futures).
+
+        'ao_receber_linha(linha)' é chamada para cada linha da saída e 'ao_concluir(codigo, erro)'
+        uma única vez, no laço do orquestrador, quando o processo termina (ou falha ao iniciar).
+        """
+        controle = {"processo": None}
+
+        async def conduzir():
+            try:
+                processo = await self._iniciar(command, **opcoes)
+            except Exception as e:
+                ao_concluir(None, e)
+                return None
+            codigo = await self._acompanhar(processo, ao_receber_linha, controle)
+            ao_concluir(codigo, None)
+            return codigo
+
+        futuro = asyncio.run_coroutine_threadsafe(conduzir(), self._laco())
+        futuro.controle = controle
+        return futuro
+
+    async def _acompanhar(self, processo, ao_receber_linha, controle):
+        controle["processo"] = processo
+        try:
+            await self._ler_linhas(processo.stdout, ao_receber_linha)
+        except Exception as e:
+            ao_receber_linha(f"Erro ao ler o output do processo. Detalhes: {e}\n")
+        return await processo.wait()
+
+    async def conduzir(self, command, ao_receber_linha, controle=None, **opcoes):
+        """
+        Corrotina (para sequências no laço do orquestrador): executa um comando entregando cada
+        linha da saída e retorna o código de saída. 'controle' permite terminá-lo com 'terminar'.
+        """
+        processo = await self._iniciar(command, **opcoes)
+        return await self._acompanhar(processo, ao_receber_linha, {} if controle is None else controle)
+
+    def terminar(self, futuro_ou_controle):
+        """Solicita o término do processo iniciado por 'executar' (pelo Future) ou por 'conduzir' (pelo controle)."""
+        controle = getattr(futuro_ou_controle, 'controle', futuro_ou_controle)
+        processo = controle.get("processo")
+        if processo is not None and processo.returncode is None:
+            self.loop.call_soon_threadsafe(processo.terminate)
+
+    async def capturar(self, command, tempo_limite=None, **opcoes):
+        """Corrotina: executa um comando curto e retorna (codigo, stdout, stderr) decodificados."""
+        processo = await self._iniciar(command, stderr=asyncio.subprocess.PIPE, **opcoes)
+        try:
+            saida, erros = await asyncio.wait_for(processo.communicate(), tempo_limite)
+        except asyncio.TimeoutError:
+            processo.kill()
+            await processo.wait()
+            raise TimeoutError(f"O comando excedeu o tempo limite de {tempo_limite}s.")
+        decodificar = lambda dados: (dados or b"").decode(self.encoding, errors='ignore')
+        return processo.returncode, decodificar(saida), decodificar(erros)
+
+    def submeter(self, corrotina):
+        """Agenda uma corrotina no laço do orquestrador e retorna o seu Future."""
+        return asyncio.run_coroutine_threadsafe(corrotina, self._laco())
+
+class HistoricoExecucoes:
+    """
+    Banco SQLite local com o histórico das execuções de limpeza e das tarefas de reparo.
+
+    As gravações são enfileiradas e feitas em lote por uma thread própria, para não
+    atrasar a rotina de limpeza; as consultas usam conexões separadas (modo WAL).
+    Com 'somente_leitura', o banco é aberto só para consultas (mode=ro): não é criado nem
+    migrado e a thread de gravação não é iniciada.
+    """
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS execucoes (
+            run_id TEXT PRIMARY KEY, inicio REAL, fim REAL, duracao REAL,
+            bytes_total INTEGER, falhas INTEGER, cancelada INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS categorias (
+            run_id TEXT, categoria TEXT, inicio REAL, bytes INTEGER,
+            itens INTEGER, falhas INTEGER, duracao REAL
+        );
+        CREATE TABLE IF NOT EXISTS tarefas (
+            task_id TEXT, inicio REAL, fim REAL, duracao REAL,
+            codigo_saida INTEGER, sucesso INTEGER,
+            unidade TEXT, total INTEGER, livre INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_categorias_categoria ON categorias (categoria, inicio);
+        CREATE INDEX IF NOT EXISTS idx_execucoes_inicio ON execucoes (inicio);
+        CREATE INDEX IF NOT EXISTS idx_tarefas_task ON tarefas (task_id, inicio);
+    """
+    INSERCOES = {
+        "execucao": "INSERT OR REPLACE INTO execucoes VALUES (?, ?, ?, ?, ?, ?, ?)",
+        "categoria": "INSERT INTO categorias VALUES (?, ?, ?, ?, ?, ?, ?)",
+        "tarefa": "INSERT INTO tarefas (task_id, inicio, fim, duracao, codigo_saida, sucesso, unidade, total, livre) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    }
+    # Colunas acrescentadas depois da primeira versão (bancos antigos são migrados ao abrir)
+    COLUNAS_NOVAS = {"tarefas": (("unidade", "TEXT"), ("total", "INTEGER"), ("livre", "INTEGER"))}
+    TAMANHO_LOTE = 200
+
+    def __init__(self, caminho=None, somente_leitura=False):
+        self.caminho = caminho or os.path.join(diretorio_dados_app(), "historico.sqlite3")
+        self.somente_leitura = somente_leitura
+        self._fila = None
+        if somente_leitura:
+            return
+        conexao = sqlite3.connect(self.caminho)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript(self.ESQUEMA)
+        for tabela, colunas in self.COLUNAS_NOVAS.items():
+            existentes = {linha[1] for linha in conexao.execute(f"PRAGMA table_info({tabela})")}
+            for coluna, tipo in colunas:
+                if coluna not in existentes:
+                    conexao.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+        conexao.commit()
+        conexao.close()
+        self._fila = Queue()
+        threading.Thread(target=self._gravar_em_lote, daemon=True).start()
+
+    def _gravar_em_lote(self):
+        """Thread de gravação: agrupa os registros pendentes em uma única transação."""
+        conexao = sqlite3.connect(self.caminho)
+        while True:
+            lote = [self._fila.get()]
+            try:
+                while len(lote) < self.TAMANHO_LOTE:
+                    lote.append(self._fila.get(timeout=0.5))
+            except Empty:
+                pass
+            try:
+                with conexao:
+                    for tipo, valores in lote:
+                        conexao.execute(self.INSERCOES[tipo], valores)
+            except sqlite3.Error as e:
+                print(f"ERRO: Falha ao gravar o histórico em '{self.caminho}'. Detalhes: {e}")
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    def _enfileirar(self, tipo, valores):
+        if self._fila is None:
+            raise sqlite3.OperationalError(f"Histórico '{self.caminho}' aberto somente para leitura")
+        self._fila.put((tipo, valores))
+
+    def registrar_execucao(self, run_id, inicio, fim, bytes_total, falhas, cancelada):
+        self._enfileirar("execucao", (run_id, inicio, fim, fim - inicio, bytes_total, falhas, int(cancelada)))
+
+    def registrar_categoria(self, run_id, categoria, inicio, bytes_liberados, itens, falhas, duracao):
+        self._enfileirar("categoria", (run_id, categoria, inicio, bytes_liberados, itens, falhas, duracao))
+
+    def registrar_tarefa(self, task_id, inicio, fim, codigo_saida, unidade=None, total=None, livre=None):
+        self._enfileirar("tarefa", (task_id, inicio, fim, fim - inicio, codigo_saida, int(codigo_saida == 0), unidade, total, livre))
+
+    def descarregar(self):
+        """Bloqueia até que todos os registros enfileirados tenham sido gravados."""
+        if self._fila is not None:
+            self._fila.join()
+
+    def _consultar(self, sql, parametros=()):
+        if self.somente_leitura:
+            # Sem criar o arquivo se ele não existir (mode=ro falha em vez de criar um banco vazio)
+            conexao = sqlite3.connect(pathlib.Path(os.path.abspath(self.caminho)).as_uri() + "?mode=ro", uri=True)
+        else:
+            conexao = sqlite3.connect(self.caminho)
+        try:
+            return conexao.execute(sql, parametros).fetchall()
+        finally:
+            conexao.close()
+
+    def tendencia_categoria(self, categoria, limite=10):
+        """Retorna [(inicio, bytes)] das últimas execuções de uma categoria, da mais antiga à mais nova."""
+        linhas = self._consultar(
+            "SELECT inicio, bytes FROM categorias WHERE categoria = ? ORDER BY inicio DESC LIMIT ?",
+            (categoria, limite))
+        return list(reversed(linhas))
+
+    def resumo_categorias(self):
+        """Retorna [(categoria, execuções, média de bytes, total de itens, total de falhas)]."""
+        return self._consultar(
+            "SELECT categoria, COUNT(*), AVG(bytes), SUM(itens), SUM(falhas) "
+            "FROM categorias GROUP BY categoria ORDER BY categoria")
+
+    def resumo_tarefas(self):
+        """Retorna [(task_id, execuções, sucessos, duração média, última execução)]."""
+        return self._consultar(
+            "SELECT task_id, COUNT(*), SUM(sucesso), AVG(duracao), MAX(inicio) "
+            "FROM tarefas GROUP BY task_id ORDER BY task_id")
+
+    def duracoes_tarefa(self, task_id, limite=20):
+        """Retorna [(duracao, unidade, total, livre)] das últimas execuções bem-sucedidas, da mais nova à mais antiga."""
+        return self._consultar(
+            "SELECT duracao, unidade, total, livre FROM tarefas WHERE task_id = ? AND sucesso = 1 "
+            "ORDER BY inicio DESC LIMIT ?", (task_id, limite))
+
+    def tarefas_registradas(self):
+        """Retorna os task_ids que já têm alguma execução registrada."""
+        return [linha[0] for linha in self._consultar("SELECT DISTINCT task_id FROM tarefas ORDER BY task_id")]
+
+    def ultimas_execucoes(self, limite=20):
+        """Retorna [(run_id, inicio, duracao, bytes_total, falhas, cancelada)] das execuções mais recentes."""
+        return self._consultar(
+            "SELECT run_id, inicio, duracao, bytes_total, falhas, cancelada "
+            "FROM execucoes ORDER BY inicio DESC LIMIT ?", (limite,))
+
+class EstimadorDuracao:
+    """
+    Estima a duração das tarefas de reparo (SFC, DISM, desfragmentação, varredura...) a partir
+    do histórico e refina a estimativa conforme o progresso chega.
+
+    A previsão é a mediana ponderada das últimas execuções bem-sucedidas da tarefa: as mais
+    recentes e as da mesma unidade pesam mais e, nas tarefas que percorrem o disco, a duração
+    de cada amostra é ajustada pela proporção entre o espaço ocupado hoje e o daquela execução.
+    """
+    TAREFAS_PROPORCIONAIS_AO_USO = frozenset({"desfragmentar_disco", "defender_scan", "chkdsk"})
+
+    def __init__(self, historico, amostras=ETA_AMOSTRAS):
+        self.historico = historico
+        self.amostras = amostras
+
+    def prever(self, task_id, unidade=None, total=None, livre=None):
+        """Retorna {"duracao": segundos, "amostras": n} ou None se a tarefa não tiver histórico."""
+        linhas = self.historico.duracoes_tarefa(task_id, self.amostras) if self.historico else []
+        if not linhas:
+            return None
+        usado = total - livre if total and livre is not None else None
+        proporcional = task_id in self.TAREFAS_PROPORCIONAIS_AO_USO
+        pontos, peso = [], 1.0
+        for duracao, unidade_amostra, total_amostra, livre_amostra in linhas:
+            valor = duracao
+            if proporcional and usado and total_amostra and livre_amostra is not None and total_amostra > livre_amostra:
+                valor = duracao * usado / (total_amostra - livre_amostra)
+            pontos.append((valor, peso * (ETA_PESO_MESMA_UNIDADE if unidade and unidade_amostra == unidade else 1.0)))
+            peso *= ETA_DECAIMENTO
+        pontos.sort()
+        metade, acumulado = sum(p for _, p in pontos) / 2, 0.0
+        for valor, p in pontos:
+            acumulado += p
+            if acumulado >= metade:
+                return {"duracao": valor, "amostras": len(pontos)}
+
+    @staticmethod
+    def refinar(duracao_prevista, decorrido, percentual=None, eta_progresso=None):
+        """
+        Tempo restante combinando a previsão do histórico com o progresso informado pela tarefa.
+        Quanto maior o percentual, maior o peso do ritmo observado; sem previsão, vale só o progresso.
+        """
+        if not percentual or percentual <= 0:
+            return max(duracao_prevista - decorrido, 0) if duracao_prevista else None
+        if eta_progresso is None:
+            eta_progresso = decorrido * (100 - percentual) / percentual
+        if not duracao_prevista:
+            return eta_progresso
+        restante_previsto = duracao_prevista * (100 - percentual) / 100
+        peso = min(percentual / 100.0, 1.0)
+        return peso * eta_progresso + (1 - peso) * restante_previsto
+
+def caracteristicas_unidade(unidade):
+    """Retorna (unidade, total, livre) em bytes, ou (unidade, None, None) se não for possível medir."""
+    try:
+        uso = shutil.disk_usage(unidade + os.sep if unidade.endswith(':') else unidade)
+        return unidade, uso.total, uso.free
+    except (OSError, AttributeError, TypeError):
+        return unidade, None, None
+
+def estimativas_tarefas(historico, unidade=None):
+    """Previsões de duração de todas as tarefas com histórico (para a saída em JSON da linha de comando)."""
+    unidade, total, livre = caracteristicas_unidade(unidade or volume_de(os.environ.get('SystemRoot') or os.sep))
+    estimador = EstimadorDuracao(historico)
+    resultado = []
+    for task_id in historico.tarefas_registradas():
+        previsao = estimador.prever(task_id, unidade, total, livre)
+        if previsao:
+            resultado.append({"tarefa": task_id, "unidade": unidade, "duracao_prevista": round(previsao["duracao"], 1),
+                              "amostras": previsao["amostras"]})
+    return resultado
+
+def agrupar_volumes_por_disco(discos):
+    """
+    Agrupa os volumes que compartilham algum disco físico: dentro de um grupo os volumes são
+    tratados em sequência (para não disputarem o mesmo disco) e os grupos, em paralelo.
+    'discos' é {volume: tupla de discos ou None}; se o disco de algum volume for desconhecido,
+    todos ficam num único grupo (execução em sequência, como antes).
+    """
+    volumes = list(discos)
+    if not volumes or any(not discos[volume] for volume in volumes):
+        return [volumes] if volumes else []
+    grupos = [] # [(discos do grupo, volumes do grupo)]
+    for volume in volumes:
+        discos_grupo, volumes_grupo = set(discos[volume]), [volume]
+        for grupo in [g for g in grupos if g[0] & discos_grupo]: # Um volume em vários discos une os grupos deles
+            grupos.remove(grupo)
+            discos_grupo |= grupo[0]
+            volumes_grupo = grupo[1] + volumes_grupo
+        grupos.append((discos_grupo, sorted(volumes_grupo, key=volumes.index)))
+    return [volumes_grupo for _, volumes_grupo in grupos]
+
+def volume_de(caminho):
+    """Retorna o identificador do volume de um caminho ('C:' no Windows, o ponto de montagem nos demais)."""
+    unidade, _ = os.path.splitdrive(os.path.abspath(caminho))
+    return unidade.upper() if unidade else raiz_do_volume(caminho)
+
+class BaldeTokens:
+    """
+    Balde de tokens: permite 'taxa' unidades por segundo, com rajadas de até um segundo.
+    Consumir além do disponível gera uma dívida, paga com espera proporcional.
+    """
+    def __init__(self, taxa):
+        self.taxa = taxa
+        self.tokens = taxa
+        self._ultimo = time.monotonic()
+
+    def retirar(self, quantidade):
+        """Retira 'quantidade' tokens e retorna quantos segundos é preciso esperar (0 se não houver limite)."""
+        if self.taxa <= 0:
+            return 0.0
+        agora = time.monotonic()
+        self.tokens = min(self.taxa, self.tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+        self.tokens -= quantidade
+        return -self.tokens / self.taxa if self.tokens < 0 else 0.0
+
+class LimitadorIO:
+    """
+    Limita operações por segundo e bytes por segundo de exclusões e varreduras, por volume.
+
+    Os limites podem ser alterados a qualquer momento (inclusive durante uma limpeza) e o
+    tempo que cada volume passou aguardando o limitador é acumulado para ajuste fino.
+    """
+    PADRAO = "*" # Chave dos limites aplicados aos volumes sem configuração própria
+
+    def __init__(self, operacoes_por_segundo=LIMITE_IO_OPERACOES, bytes_por_segundo=LIMITE_IO_BYTES):
+        self._lock = threading.Lock()
+        self._limites = {self.PADRAO: (operacoes_por_segundo, bytes_por_segundo)}
+        self._baldes = {} # volume -> (balde de operações, balde de bytes)
+        self._metricas = {} # volume -> {"espera": s, "operacoes": n, "bytes": n}
+
+    def configurar(self, volume, operacoes_por_segundo, bytes_por_segundo):
+        """
+        Define os limites de um volume, ou, com volume=None, o padrão dos volumes sem configuração
+        própria (as dos demais são mantidas). 0 = sem limite.
+        """
+        with self._lock:
+            if volume is None:
+                self._limites[self.PADRAO] = (operacoes_por_segundo, bytes_por_segundo)
+                for volume_do_balde in [v for v in self._baldes if v not in self._limites]:
+                    del self._baldes[volume_do_balde]
+            else:
+                self._limites[volume] = (operacoes_por_segundo, bytes_por_segundo)
+                self._baldes.pop(volume, None)
+
+    def limites(self, volume=None):
+        with self._lock:
+            return self._limites.get(volume, self._limites[self.PADRAO])
+
+    def aguardar(self, volume, operacoes=1, nbytes=0, cancelado=None):
+        """Bloqueia o tempo necessário para respeitar os limites do volume."""
+        with self._lock:
+            baldes = self._baldes.get(volume)
+            if baldes is None:
+                operacoes_ps, bytes_ps = self._limites.get(volume, self._limites[self.PADRAO])
+                baldes = self._baldes[volume] = (BaldeTokens(operacoes_ps), BaldeTokens(bytes_ps))
+            espera = max(baldes[0].retirar(operacoes), baldes[1].retirar(nbytes))
+            metricas = self._metricas.setdefault(volume, {"espera": 0.0, "operacoes": 0, "bytes": 0})
+            metricas["operacoes"] += operacoes
+            metricas["bytes"] += nbytes
+        if espera <= 0:
+            return
+
+        # Dorme em fatias curtas para respeitar o cancelamento
+        inicio = time.monotonic()
+        fim = inicio + espera
+        while espera > 0:
+            if cancelado and cancelado():
+                break
+            time.sleep(min(espera, 0.25))
+            espera = fim - time.monotonic()
+        with self._lock: # Conta o tempo realmente dormido, menor que o calculado se houve cancelamento
+            metricas = self._metricas.setdefault(volume, {"espera": 0.0, "operacoes": 0, "bytes": 0})
+            metricas["espera"] += time.monotonic() - inicio
+
+    def consumir_metricas(self):
+        """Retorna e zera as métricas acumuladas por volume."""
+        with self._lock:
+            metricas, self._metricas = self._metricas, {}
+            return metricas
+
+class RegrasExclusao:
+    """
+    Regras de exclusão do usuário (caminhos e globs), compiladas uma única vez.
+
+    As regras viram uma árvore de prefixos por componente do caminho: componentes literais
+    são filhos em um dicionário, e os componentes com curinga de um mesmo nó são agrupados em
+    tabelas de prefixo/sufixo (ex.: 'agente-*', '*.lic'), com regex só para o que sobrar.
+    '**' casa qualquer quantidade de pastas, e globs sem separador ('node_modules', '*.lic')
+    valem para o nome em qualquer nível. Quem percorre a árvore de cima para baixo guarda o
+    estado de cada pasta e testa só o nome seguinte ('avancar'), com custo que não cresce
+    com a quantidade de regras. Um caminho excluído protege também tudo o que está abaixo dele.
+    """
+    _CURINGAS = frozenset('*?[')
+
+    class _No:
+        __slots__ = ('filhos', 'curingas', 'tabela', 'recursivo', 'terminal', 'laco')
+
+        def __init__(self, laco=False):
+            self.filhos = {} # Componente literal -> nó
+            self.curingas = {} # Componente com curinga -> nó (compilado em 'tabela')
+            self.tabela = None
+            self.recursivo = None # Nó alcançado por '**' (casa zero ou mais componentes)
+            self.terminal = False
+            self.laco = laco # True no nó de '**', que também consome componentes
+
+    class _TabelaNomes:
+        """Encontra, para um nome, todos os nós cujos padrões de componente o casam."""
+        def __init__(self, padroes):
+            self.prefixos, self.sufixos, self.outros = {}, {}, []
+            for padrao, no in padroes.items():
+                corpo = padrao[1:] if padrao.startswith('*') else padrao[:-1] if padrao.endswith('*') else None
+                if corpo is not None and not RegrasExclusao._CURINGAS.intersection(corpo):
+                    tabela = self.sufixos if padrao.startswith('*') else self.prefixos
+                    tabela.setdefault(corpo, []).append(no)
+                else:
+                    self.outros.append((re.compile(fnmatch.translate(padrao), re.S), no))
+            self.tamanhos_prefixo = sorted({len(p) for p in self.prefixos})
+            self.tamanhos_sufixo = sorted({len(s) for s in self.sufixos})
+
+        def casar(self, nome):
+            encontrados = []
+            for tamanho in self.tamanhos_prefixo:
+                encontrados.extend(self.prefixos.get(nome[:tamanho], ()))
+            for tamanho in self.tamanhos_sufixo:
+                if tamanho <= len(nome):
+                    encontrados.extend(self.sufixos.get(nome[len(nome) - tamanho:], ()))
+            encontrados.extend(no for regex, no in self.outros if regex.match(nome))
+            return encontrados
+
+    def __init__(self, regras=()):
+        self.regras = []
+        self._raiz = self._No()
+        for regra in regras:
+            regra = regra.strip()
+            if regra and not regra.startswith('#'):
+                self._adicionar(regra)
+        self._compilar()
+        self._estado_inicial = self._fechar([self._raiz])
+
+    def __bool__(self):
+        return bool(self.regras)
+
+    @staticmethod
+    def _normalizar(caminho):
+        caminho = os.path.normcase(os.path.expandvars(os.path.expanduser(caminho)))
+        if caminho.startswith('\\\\?\\unc\\'):
+            caminho = '\\\\' + caminho[8:]
+        elif caminho.startswith('\\\\?\\'):
+            caminho = caminho[4:]
+        return caminho
+
+    @classmethod
+    def _componentes(cls, caminho):
+        caminho = os.path.normpath(cls._normalizar(caminho))
+        return [c for c in caminho.split(os.sep) if c]
+
+    def _adicionar(self, regra):
+        self.regras.append(regra)
+        if os.sep in self._normalizar(regra):
+            componentes = self._componentes(regra)
+        else:
+            componentes = ['**', os.path.normcase(regra)] # Somente o nome: vale em qualquer nível
+        no = self._raiz
+        for componente in componentes:
+            if componente == '**':
+                no.recursivo = no.recursivo or self._No(laco=True)
+                no = no.recursivo
+            elif self._CURINGAS.intersection(componente):
+                no = no.curingas.setdefault(componente, self._No())
+            else:
+                no = no.filhos.setdefault(componente, self._No())
+        no.terminal = True
+
+    def _compilar(self):
+        pilha = [self._raiz]
+        while pilha:
+            no = pilha.pop()
+            if no.curingas:
+                no.tabela = self._TabelaNomes(no.curingas)
+            pilha.extend(no.filhos.values())
+            pilha.extend(no.curingas.values())
+            if no.recursivo:
+                pilha.append(no.recursivo)
+
+    @staticmethod
+    def _fechar(nos):
+        """Acrescenta os nós alcançáveis por '**' sem consumir componentes."""
+        estado = []
+        for no in nos:
+            while no is not None and no not in estado:
+                estado.append(no)
+                no = no.recursivo
+        return tuple(estado)
+
+    def avancar(self, estado, nome):
+        """
+        Estado da entrada 'nome' dentro da pasta cujo estado é 'estado'.
+
+        Retorna None se a entrada estiver excluída; uma tupla vazia indica que nenhuma regra
+        alcança mais nada abaixo dela.
+        """
+        if not estado:
+            return estado
+        nome = os.path.normcase(nome)
+        proximos = []
+        for no in estado:
+            filho = no.filhos.get(nome)
+            if filho is not None:
+                proximos.append(filho)
+            if no.tabela:
+                proximos.extend(no.tabela.casar(nome))
+            if no.laco:
+                proximos.append(no)
+        if any(no.terminal for no in proximos):
+            return None
+        return self._fechar(proximos)
+
+    def estado_de(self, caminho):
+        """Estado de um caminho completo, ou None se ele (ou uma pasta acima) estiver excluído."""
+        estado = self._estado_inicial
+        for componente in self._componentes(caminho):
+            if not estado:
+                break
+            estado = self.avancar(estado, componente)
+            if estado is None:
+                return None
+        return estado
+
+    def exclui(self, caminho):
+        """True se o caminho (ou uma pasta acima dele) estiver excluído."""
+        return bool(self.regras) and self.estado_de(caminho) is None
+
+def ler_exclusoes(arquivo=None):
+    """Retorna as regras de exclusão salvas pelo usuário (uma por linha)."""
+    arquivo = arquivo or os.path.join(diretorio_dados_app(), EXCLUSOES_ARQUIVO)
     try:
-        # Garante que o pip do ambiente correto seja usado para a instalação.
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "ttkbootstrap"])
-        # Usa uma caixa de mensagem nativa do Windows para notificar o usuário.
-        ctypes.windll.user32.MessageBoxW(0, "A dependência 'ttkbootstrap' foi instalada com sucesso. Por favor, execute o programa novamente.", "Instalação Concluída", 0x40) # MB_OK | MB_ICONINFORMATION
-        sys.exit(0)
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"ERRO CRÍTICO: Falha ao instalar 'ttkbootstrap' via pip. Detalhes: {e}")
-        ctypes.windll.user32.MessageBoxW(0, "A biblioteca 'ttkbootstrap' não pôde ser instalada. Por favor, instale-a manualmente ('pip install ttkbootstrap') e tente novamente.", "Erro Crítico", 0x10) # MB_OK | MB_ICONERROR
-        sys.exit(1)
+        with open(arquivo, encoding='utf-8') as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        print(f"Erro ao ler as regras de exclusão em '{arquivo}': {e}")
+        return []
 
+def carregar_exclusoes(extras=(), arquivo=None):
+    """Compila as regras salvas pelo usuário, as da plataforma e as extras."""
+    return RegrasExclusao(ler_exclusoes(arquivo) + PLATAFORMA.exclusoes_padrao() + list(extras))
 
-# --- Função para encontrar o caminho dos arquivos (essencial para o PyInstaller) ---
-def resource_path(relative_path):
-    """ Retorna o caminho absoluto para o recurso, funciona para dev e para PyInstaller """
+def salvar_exclusoes(regras, arquivo=None):
+    """Grava as regras de exclusão (uma por linha) na pasta de dados do aplicativo."""
+    arquivo = arquivo or os.path.join(diretorio_dados_app(), EXCLUSOES_ARQUIVO)
+    with open(arquivo, "w", encoding='utf-8') as f:
+        f.writelines(regra.strip() + "\n" for regra in regras if regra.strip())
+
+def eh_link(entrada):
+    """True para links simbólicos e para pastas que são junções ou outros pontos de nova análise (reparse points)."""
     try:
-        # PyInstaller cria uma pasta temporária e armazena o caminho em _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
+        if entrada.is_symlink():
+            return True
+        if not entrada.is_dir(follow_symlinks=False):
+            return False
+        if hasattr(entrada, 'is_junction') and entrada.is_junction():
+            return True
+        atributos = getattr(entrada.stat(follow_symlinks=False), 'st_file_attributes', 0)
+        return bool(atributos & getattr(stat, 'FILE_ATTRIBUTE_REPARSE_POINT', 0x400))
+    except OSError:
+        return False
 
-    return os.path.join(base_path, relative_path)
+def eh_diretorio_real(entrada):
+    """True para diretórios que podem ser percorridos sem seguir nenhum link ou junção."""
+    try:
+        return entrada.is_dir(follow_symlinks=False) and not eh_link(entrada)
+    except OSError:
+        return False
 
-# --- Funções de Inicialização ---
+def eh_deposito_quarentena(nome):
+    """
+    True para o nome do depósito da quarentena. Ele fica na raiz do volume, que pode ser a própria
+    pasta limpa (ex.: /tmp numa montagem tmpfs), e nunca é apagado, movido nem percorrido pela limpeza.
+    """
+    return os.path.normcase(nome) == os.path.normcase(QUARENTENA_NOME_PASTA)
 
-def verificar_admin():
+class PercursoSeguro:
     """
-    Verifica se o script está sendo executado com privilégios de administrador.
+    Percurso de árvores de diretórios imune a ciclos, junções e caminhos duplicados.
 
-    Returns:
-        bool: True se o usuário for administrador, False caso contrário.
+    Cada diretório é identificado pelo par (dispositivo, inode) e só é visitado uma vez, de
+    modo que um link em laço, uma junção legada (ex.: 'Application Data' apontando para a
+    pasta pai) ou uma montagem 'bind' da mesma árvore não repetem trabalho. Arquivos com
+    mais de um link físico só têm os bytes contados na primeira vez (arquivo_novo).
+
+    Links simbólicos e junções seguem a 'politica_links':
+    - LINKS_NAO_SEGUIR: são ignorados (nem percorridos nem listados);
+    - LINKS_DENTRO_DA_RAIZ: são seguidos só quando o destino fica dentro da raiz percorrida;
+    - LINKS_SEGUIR: são sempre seguidos (ciclos e duplicatas continuam barrados pelo inode).
+
+    Além do gerador 'percorrer', usado nas varreduras, os métodos 'visitar_diretorio' e
+    'arquivo_novo' são usados pelo MotorRemocao, que nunca segue links (remove o próprio link).
+    No Windows, o scandir não informa inode nem contagem de links dos arquivos; lá os links
+    físicos só são reconhecidos quando quem chama já tem um os.stat completo.
+    """
+    def __init__(self, politica_links=LINKS_NAO_SEGUIR, exclusoes=None, cancelado=lambda: False, ponto_de_controle=None,
+                 mesmo_dispositivo=False):
+        if politica_links not in (LINKS_NAO_SEGUIR, LINKS_DENTRO_DA_RAIZ, LINKS_SEGUIR):
+            raise ValueError(f"Política de links desconhecida: {politica_links}")
+        self.politica_links = politica_links
+        self.exclusoes = exclusoes
+        self.cancelado = cancelado
+        self.ponto_de_controle = ponto_de_controle
+        self.mesmo_dispositivo = mesmo_dispositivo # Não entra em pastas de outro sistema de arquivos montado
+        self._diretorios = set()
+        self._arquivos = set()
+        self.dispositivo = None
+        # Estatísticas
+        self.diretorios_repetidos = 0
+        self.arquivos_repetidos = 0
+        self.links_ignorados = 0
+        self.falhas = 0
+
+    @staticmethod
+    def identidade(info):
+        """Par (dispositivo, inode) de um stat, ou None se o sistema não informar o inode."""
+        return (info.st_dev, info.st_ino) if info.st_ino else None
+
+    def visitar_diretorio(self, info):
+        """Registra a visita a um diretório; False se ele já foi visitado ou fica em outro dispositivo."""
+        if self.mesmo_dispositivo and self.dispositivo is not None and info.st_dev != self.dispositivo:
+            self.diretorios_repetidos += 1
+            return False
+        identidade = self.identidade(info)
+        if identidade is None:
+            return True
+        if identidade in self._diretorios:
+            self.diretorios_repetidos += 1
+            return False
+        self._diretorios.add(identidade)
+        return True
+
+    def arquivo_novo(self, info):
+        """False se os bytes deste arquivo já foram contados por outro link físico dele."""
+        identidade = self.identidade(info)
+        if identidade is None:
+            return True
+        links = getattr(info, 'st_nlink', 1)
+        if identidade in self._arquivos:
+            self.arquivos_repetidos += 1
+            if links <= 1:
+                self._arquivos.discard(identidade) # Último link (os outros já foram apagados): o inode pode ser reutilizado
+            return False
+        if links > 1:
+            self._arquivos.add(identidade)
+        return True
+
+    def _seguir_link(self, entrada, raiz_real):
+        """Decide, pela política, se um link é seguido."""
+        if self.politica_links == LINKS_NAO_SEGUIR:
+            return False
+        if self.politica_links == LINKS_DENTRO_DA_RAIZ:
+            destino = os.path.realpath(entrada.path)
+            return destino == raiz_real or destino.startswith(raiz_real.rstrip(os.sep) + os.sep)
+        return True
+
+    @staticmethod
+    def _stat_diretorio(caminho, entrada=None):
+        # No Windows, o stat do scandir vem sem inode; o os.stat completo o informa
+        if entrada is not None and os.name != 'nt':
+            return entrada.stat()
+        return os.stat(caminho)
+
+    def percorrer(self, raiz):
+        """
+        Gera (pasta, estado das exclusões, entradas de arquivo) para cada pasta da árvore, de cima para baixo.
+        Pastas excluídas, já visitadas ou alcançadas por links não seguidos não chegam a ser listadas.
+        """
+        raiz = os.path.abspath(raiz)
+        estado = self.exclusoes.estado_de(raiz) if self.exclusoes else ()
+        if estado is None:
+            return
+        try:
+            info = self._stat_diretorio(raiz)
+        except OSError:
+            self.falhas += 1
+            return
+        if self.dispositivo is None:
+            self.dispositivo = info.st_dev
+        if not self.visitar_diretorio(info):
+            return
+        raiz_real = os.path.realpath(raiz)
+        pilha = [(raiz, estado)]
+        while pilha:
+            if self.cancelado():
+                return
+            if self.ponto_de_controle:
+                self.ponto_de_controle()
+            pasta, estado = pilha.pop()
+            try:
+                with os.scandir(pasta) as iterador:
+                    entradas = list(iterador)
+            except OSError:
+                self.falhas += 1
+                continue
+            arquivos, subpastas = [], []
+            for entrada in entradas:
+                if eh_deposito_quarentena(entrada.name):
+                    continue
+                estado_entrada = self.exclusoes.avancar(estado, entrada.name) if estado else estado
+                if estado_entrada is None:
+                    continue
+                link = eh_link(entrada)
+                if link and not self._seguir_link(entrada, raiz_real):
+                    self.links_ignorados += 1
+                    continue
+                try:
+                    eh_diretorio = entrada.is_dir() # Segue o link, se chegou até aqui
+                except OSError:
+                    eh_diretorio = False
+                if not eh_diretorio:
+                    arquivos.append(entrada)
+                    continue
+                try:
+                    info = self._stat_diretorio(entrada.path, entrada)
+                except OSError:
+                    self.falhas += 1
+                    continue
+                if self.visitar_diretorio(info):
+                    subpastas.append((entrada.path, estado_entrada))
+            yield pasta, estado, arquivos
+            pilha.extend(reversed(subpastas))
+
+    def estatisticas(self):
+        return {"diretorios_repetidos": self.diretorios_repetidos, "arquivos_repetidos": self.arquivos_repetidos,
+                "links_ignorados": self.links_ignorados, "falhas": self.falhas}
+
+class ProtecaoTemporarios:
+    """
+    Decide quais itens de uma pasta temporária compartilhada (/tmp, /var/tmp) devem ficar.
+
+    Chamada com o os.lstat de cada entrada, antes de ela ser apagada ou percorrida; retorna
+    True para preservar:
+    - sockets e FIFOs (ssh-agent, tmux, X11, serviços), que só existem enquanto alguém os usa;
+    - itens modificados, acessados ou alterados há menos de 'idade_minima' segundos;
+    - itens de outros usuários (as pastas deles nem chegam a ser abertas);
+    - arquivos e pastas abertos por algum processo (descritores e diretório corrente em /proc),
+      o que inclui arquivos de trava e rascunhos de compilações em andamento.
+    Os itens em uso são levantados uma única vez, na criação; a idade mínima cobre o que for
+    aberto depois disso.
+    """
+    def __init__(self, idade_minima=TEMPORARIOS_IDADE_MINIMA, agora=None):
+        self.idade_minima = idade_minima
+        self.limite = (agora if agora is not None else time.time()) - idade_minima
+        self.usuario = os.geteuid() if hasattr(os, 'geteuid') else None
+        self.em_uso = self._itens_em_uso()
+
+    @staticmethod
+    def _itens_em_uso(proc='/proc'):
+        """Conjunto (dispositivo, inode) dos arquivos abertos e diretórios correntes dos processos visíveis."""
+        em_uso = set()
+        try:
+            processos = [nome for nome in os.listdir(proc) if nome.isdigit()]
+        except OSError:
+            return em_uso
+        for pid in processos:
+            pasta_fd = os.path.join(proc, pid, 'fd')
+            try:
+                descritores = [os.path.join(pasta_fd, fd) for fd in os.listdir(pasta_fd)]
+            except OSError:
+                descritores = [] # Processo encerrado ou de outro usuário
+            for caminho in descritores + [os.path.join(proc, pid, 'cwd')]:
+                try:
+                    info = os.stat(caminho) # Segue o link mágico até o arquivo aberto
+                except OSError:
+                    continue
+                em_uso.add((info.st_dev, info.st_ino))
+        return em_uso
+
+    def __call__(self, info):
+        if stat.S_ISSOCK(info.st_mode) or stat.S_ISFIFO(info.st_mode):
+            return True
+        if max(info.st_mtime, info.st_atime, info.st_ctime) > self.limite:
+            return True
+        if self.usuario is not None and info.st_uid != self.usuario:
+            return True
+        return (info.st_dev, info.st_ino) in self.em_uso
+
+def tamanho_arvore(caminho, cancelado=lambda: False):
+    """
+    Retorna (bytes, entradas) de um arquivo ou de toda a árvore de um diretório, sem seguir
+    links nem junções e contando uma única vez os arquivos com vários links físicos.
     """
     try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except Exception as e:
-        print(f"Não foi possível verificar o status de administrador. Erro: {e}")
+        info = os.lstat(caminho)
+    except OSError:
+        return 0, 0
+    atributos = getattr(info, 'st_file_attributes', 0)
+    if not stat.S_ISDIR(info.st_mode) or atributos & getattr(stat, 'FILE_ATTRIBUTE_REPARSE_POINT', 0x400):
+        return (0 if stat.S_ISDIR(info.st_mode) else info.st_size), 1
+    percurso = PercursoSeguro(LINKS_NAO_SEGUIR, cancelado=cancelado)
+    total, entradas = 0, 0
+    for _, _, arquivos in percurso.percorrer(caminho):
+        entradas += 1 + len(arquivos)
+        for entrada in arquivos:
+            try:
+                info = entrada.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if percurso.arquivo_novo(info):
+                total += info.st_size
+    return total, entradas
+
+class MotorRemocao:
+    """
+    Remove árvores de diretórios trabalhando relativo a descritores de diretório.
+
+    Em sistemas com 'dir_fd' (POSIX), cada exclusão é feita pelo nome relativo ao diretório
+    já aberto, sem que o sistema operacional resolva o caminho completo a cada arquivo.
+    Nos demais (Windows), usa os metadados que o 'os.scandir' já entrega e caminhos com o
+    prefixo '\\\\?\\' (sem normalização nem limite de MAX_PATH). Em ambos, os diretórios
+    que ficam vazios são removidos de baixo para cima na mesma passada, sem recursão.
+    Links simbólicos e junções são removidos sem serem seguidos. Com 'exclusoes', cada pasta
+    é testada antes de ser aberta, e uma pasta excluída nem chega a ser listada. O 'percurso'
+    (PercursoSeguro) barra pastas já visitadas (montagens 'bind' da mesma árvore) ou em outro
+    sistema de arquivos, e conta uma única vez os bytes de arquivos com vários links físicos.
+    O filtro opcional 'preservar' recebe o lstat de cada entrada e mantém as que ele recusar.
+    """
+    USA_DIR_FD = (os.unlink in os.supports_dir_fd and os.rmdir in os.supports_dir_fd
+                  and os.open in os.supports_dir_fd and os.scandir in os.supports_fd)
+    _FLAGS_DIRETORIO = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+    def __init__(self, cancelado=lambda: False, limitador=None, volume=None, ponto_de_controle=None, exclusoes=None,
+                 percurso=None, preservar=None):
+        self.cancelado = cancelado
+        self.limitador = limitador
+        self.volume = volume
+        self.ponto_de_controle = ponto_de_controle
+        self.exclusoes = exclusoes
+        self.percurso = percurso or PercursoSeguro(LINKS_NAO_SEGUIR, mesmo_dispositivo=True)
+        self.preservar = preservar # preservar(os.lstat da entrada) -> True mantém o item (ex.: ProtecaoTemporarios)
+        self._dispositivos = {} # Pasta que contém os itens removidos -> dispositivo (st_dev)
+
+    @staticmethod
+    def _novas_estatisticas():
+        return {"bytes": 0, "arquivos": 0, "diretorios": 0, "falhas": 0, "preservados": 0}
+
+    def _avancar(self, estado, nome, estatisticas):
+        """Estado das regras de exclusão para a entrada; None (e contabiliza) se ela for protegida."""
+        if eh_deposito_quarentena(nome):
+            estatisticas["preservados"] += 1
+            return None
+        if not estado:
+            return estado
+        estado = self.exclusoes.avancar(estado, nome)
+        if estado is None:
+            estatisticas["preservados"] += 1
+        return estado
+
+    def _preservada(self, entrada, estatisticas):
+        """True (e contabiliza) se o filtro 'preservar' mantém a entrada; ela não é apagada nem percorrida."""
+        try:
+            info = entrada.stat(follow_symlinks=False) # Fica em cache na própria entrada
+        except OSError:
+            estatisticas["falhas"] += 1
+            return True
+        if self.preservar(info):
+            estatisticas["preservados"] += 1
+            return True
+        return False
+
+    def _dispositivo_da_pasta(self, caminho, info):
+        pai = os.path.dirname(os.path.abspath(caminho))
+        dispositivo = self._dispositivos.get(pai)
+        if dispositivo is None:
+            try:
+                dispositivo = os.stat(pai).st_dev
+            except OSError:
+                dispositivo = info.st_dev
+            self._dispositivos[pai] = dispositivo
+        return dispositivo
+
+    def _aguardar(self, nbytes):
+        if self.limitador:
+            self.limitador.aguardar(self.volume, nbytes=nbytes, cancelado=self.cancelado)
+
+    def remover(self, caminho):
+        """Remove um arquivo, link ou diretório (com todo o conteúdo). Retorna as estatísticas."""
+        estatisticas = self._novas_estatisticas()
+        estado = self.exclusoes.estado_de(caminho) if self.exclusoes else ()
+        if estado is None or eh_deposito_quarentena(os.path.basename(caminho)):
+            estatisticas["preservados"] += 1
+            return estatisticas
+        try:
+            info = os.lstat(caminho)
+        except OSError:
+            estatisticas["falhas"] += 1
+            return estatisticas
+        if self.preservar and self.preservar(info):
+            estatisticas["preservados"] += 1
+            return estatisticas
+        atributos = getattr(info, 'st_file_attributes', 0)
+        if not stat.S_ISDIR(info.st_mode) or atributos & getattr(stat, 'FILE_ATTRIBUTE_REPARSE_POINT', 0x400):
+            self._remover_arquivo(None, caminho, info, estatisticas, eh_diretorio=stat.S_ISDIR(info.st_mode))
+            return estatisticas
+        # O sistema de arquivos de referência é o da pasta que contém o item, a cada chamada: o mesmo
+        # motor atende itens de pastas diferentes, e um item que é ponto de montagem não é percorrido
+        self.percurso.dispositivo = self._dispositivo_da_pasta(caminho, info)
+
+        if self.USA_DIR_FD:
+            self._remover_arvore_dir_fd(caminho, estado, estatisticas)
+        else:
+            self._remover_arvore_caminhos(caminho, estado, estatisticas)
+        return estatisticas
+
+    def _remover_arquivo(self, dir_fd, nome, info, estatisticas, eh_diretorio=False):
+        """Remove uma entrada que não será percorrida (arquivo, link ou junção)."""
+        tamanho = 0 if eh_diretorio else info.st_size
+        self._aguardar(tamanho)
+        remover = os.rmdir if eh_diretorio else os.unlink
+        try:
+            try:
+                if dir_fd is not None:
+                    remover(nome, dir_fd=dir_fd)
+                else:
+                    remover(nome)
+            except PermissionError:
+                if os.name != 'nt' or dir_fd is not None:
+                    raise
+                os.chmod(nome, stat.S_IWRITE) # Arquivo somente leitura no Windows
+                remover(nome)
+            if tamanho and self.percurso.arquivo_novo(info): # Outro link físico já contou estes bytes
+                estatisticas["bytes"] += tamanho
+            estatisticas["arquivos"] += 1
+        except FileNotFoundError:
+            pass
+        except OSError:
+            estatisticas["falhas"] += 1
+
+    def _remover_arvore_dir_fd(self, caminho, estado, estatisticas):
+        pai, nome = os.path.split(os.path.abspath(caminho))
+        try:
+            fd_pai = os.open(pai, self._FLAGS_DIRETORIO)
+        except OSError:
+            estatisticas["falhas"] += 1
+            return
+        # Pilha explícita: (fd do diretório, entradas ainda não tratadas, fd do pai, nome no pai, estado das exclusões)
+        pilha = []
+        try:
+            self._empilhar_dir_fd(pilha, fd_pai, nome, estado, estatisticas)
+            while pilha:
+                fd, entradas, fd_do_pai, nome_no_pai, estado = pilha[-1]
+                if self.cancelado():
+                    break
+                if not entradas:
+                    pilha.pop()
+                    os.close(fd)
+                    try:
+                        os.rmdir(nome_no_pai, dir_fd=fd_do_pai)
+                        estatisticas["diretorios"] += 1
+                    except OSError:
+                        pass # Não ficou vazio (falhas ou exclusões dentro dele); já contabilizadas
+                    continue
+                entrada = entradas.pop()
+                estado_entrada = self._avancar(estado, entrada.name, estatisticas)
+                if estado_entrada is None or (self.preservar and self._preservada(entrada, estatisticas)):
+                    continue
+                if eh_diretorio_real(entrada):
+                    self._empilhar_dir_fd(pilha, fd, entrada.name, estado_entrada, estatisticas)
+                else:
+                    try:
+                        info = entrada.stat(follow_symlinks=False)
+                    except OSError:
+                        estatisticas["falhas"] += 1
+                        continue
+                    self._remover_arquivo(fd, entrada.name, info, estatisticas)
+        finally:
+            for fd, *_ in pilha:
+                os.close(fd)
+            os.close(fd_pai)
+
+    def _empilhar_dir_fd(self, pilha, fd_pai, nome, estado, estatisticas):
+        if self.ponto_de_controle:
+            self.ponto_de_controle()
+        try:
+            fd = os.open(nome, self._FLAGS_DIRETORIO, dir_fd=fd_pai)
+        except OSError:
+            estatisticas["falhas"] += 1
+            return
+        if not self.percurso.visitar_diretorio(os.fstat(fd)):
+            os.close(fd) # Mesma pasta por outro caminho (montagem 'bind') ou outro sistema de arquivos
+            estatisticas["preservados"] += 1
+            return
+        try:
+            with os.scandir(fd) as iterador:
+                entradas = list(iterador)
+        except OSError:
+            os.close(fd)
+            estatisticas["falhas"] += 1
+            return
+        pilha.append((fd, entradas, fd_pai, nome, estado))
+
+    def _remover_arvore_caminhos(self, caminho, estado, estatisticas):
+        caminho = os.path.abspath(caminho)
+        if os.name == 'nt' and not caminho.startswith('\\\\?\\'):
+            caminho = '\\\\?\\UNC\\' + caminho[2:] if caminho.startswith('\\\\') else '\\\\?\\' + caminho
+        pilha = []
+        self._empilhar_caminho(pilha, caminho, estado, estatisticas)
+        while pilha and not self.cancelado():
+            diretorio, entradas, estado = pilha[-1]
+            if not entradas:
+                pilha.pop()
+                try:
+                    os.rmdir(diretorio)
+                    estatisticas["diretorios"] += 1
+                except OSError:
+                    pass
+                continue
+            entrada = entradas.pop()
+            estado_entrada = self._avancar(estado, entrada.name, estatisticas)
+            if estado_entrada is None or (self.preservar and self._preservada(entrada, estatisticas)):
+                continue
+            if eh_diretorio_real(entrada):
+                self._empilhar_caminho(pilha, entrada.path, estado_entrada, estatisticas)
+            else:
+                try:
+                    info = entrada.stat(follow_symlinks=False) # No Windows, vem do próprio scandir
+                except OSError:
+                    estatisticas["falhas"] += 1
+                    continue
+                eh_diretorio = entrada.is_dir(follow_symlinks=False) # Junção: remove só o link
+                self._remover_arquivo(None, entrada.path, info, estatisticas, eh_diretorio=eh_diretorio)
+
+    def _empilhar_caminho(self, pilha, caminho, estado, estatisticas):
+        if self.ponto_de_controle:
+            self.ponto_de_controle()
+        try:
+            if not self.percurso.visitar_diretorio(os.stat(caminho)):
+                estatisticas["preservados"] += 1
+                return
+            with os.scandir(caminho) as iterador:
+                pilha.append((caminho, list(iterador), estado))
+        except OSError:
+            estatisticas["falhas"] += 1
+
+class TravaArquivo:
+    """
+    Trava exclusiva entre processos sobre um arquivo (fcntl.flock no POSIX, msvcrt.locking no
+    Windows), sem espera. O sistema a libera sozinho se o processo que a detém morrer.
+    """
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    @property
+    def adquirida(self):
+        return self._arquivo is not None
+
+    def adquirir(self):
+        """True se a trava foi obtida (ou já era desta instância); False se outro a detém. Lança OSError se o arquivo não abrir."""
+        if self._arquivo:
+            return True
+        arquivo = open(self.caminho, "a+b")
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self._arquivo = arquivo
+        return True
+
+    def liberar(self):
+        if not self._arquivo:
+            return
+        if os.name == 'nt':
+            try:
+                import msvcrt
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+            except OSError:
+                pass
+        self._arquivo.close() # No POSIX, fechar libera o flock
+        self._arquivo = None
+
+    def ocupada(self):
+        """True se alguma instância (deste ou de outro processo) detém a trava agora."""
+        if self._arquivo:
+            return True
+        try:
+            if not self.adquirir():
+                return True
+        except OSError:
+            return False
+        self.liberar()
         return False
 
-def run_main_app():
+class DiarioLimpeza:
+    """
+    Diário (write-ahead) da rotina de limpeza, para retomá-la se ela for interrompida.
+
+    Antes de limpar um diretório, os itens planejados são registrados; os itens concluídos
+    são registrados em lotes (um registro por DIARIO_LOTE_ITENS itens), assim como o fim de
+    cada diretório e de cada categoria. Cada registro é uma única escrita seguida de flush
+    (sobrevive ao encerramento do processo); o fsync, mais caro, acontece no máximo a cada
+    DIARIO_INTERVALO_SINCRONIZACAO segundos e no fim de cada categoria. Perder os últimos
+    registros numa queda de energia só faz a retomada repetir alguns itens, o que é inofensivo:
+    os que já foram apagados não existem mais.
+
+    Ao fim da rotina (concluída ou cancelada pelo usuário), o diário é compactado em um único
+    registro de conclusão.
+
+    Enquanto uma execução escreve o diário, ela detém uma trava de arquivo ('<diário>.trava'),
+    para que outro processo (a janela e o modo serviço) não o retome, descarte ou sobrescreva
+    ('em_andamento'). Uma falha de E/S não interrompe a limpeza: o diário é desativado até a
+    próxima execução e a falha é entregue a 'ao_falhar' (ex.: o log do aplicativo).
+    """
+    def __init__(self, caminho=None, ao_falhar=None):
+        self.caminho = caminho or os.path.join(diretorio_dados_app(), DIARIO_ARQUIVO)
+        self.ao_falhar = ao_falhar
+        self.trava = TravaArquivo(self.caminho + ".trava")
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._ultima_sincronizacao = 0.0
+
+    def _falhar(self, erro):
+        """Fecha o diário desta execução após uma falha de E/S e avisa quem o usa."""
+        with self._lock:
+            if self._arquivo:
+                try:
+                    self._arquivo.close()
+                except OSError:
+                    pass
+                self._arquivo = None
+        if self.ao_falhar:
+            self.ao_falhar(erro)
+        else:
+            print(f"AVISO: Falha no diário de limpeza em '{self.caminho}'. Detalhes: {erro}")
+
+    def em_andamento(self):
+        """True se uma execução (deste ou de outro processo) está escrevendo o diário agora."""
+        return self.trava.ocupada()
+
+    def pendente(self):
+        """
+        Lê o diário e retorna o estado da execução interrompida, ou None se a última terminou.
+        O estado traz run, categorias, opcoes, concluidas (categorias), diretorios (concluídos),
+        itens (diretório -> nomes concluídos), planejados (diretório -> quantidade) e bytes.
+        """
+        estado = None
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue # Última linha incompleta (escrita interrompida)
+                    tipo = registro.get("t")
+                    if tipo == "inicio":
+                        if estado is None or estado["run"] != registro["run"]:
+                            estado = {"run": registro["run"], "categorias": registro["categorias"],
+                                      "opcoes": registro.get("opcoes", {}), "concluidas": set(), "diretorios": set(),
+                                      "itens": {}, "planejados": {}, "bytes": 0}
+                    elif estado is None:
+                        continue
+                    elif tipo == "plano":
+                        estado["planejados"][registro["dir"]] = len(registro["itens"])
+                    elif tipo == "itens":
+                        estado["itens"].setdefault(registro["dir"], set()).update(registro["itens"])
+                    elif tipo == "dir":
+                        estado["diretorios"].add(registro["dir"])
+                        estado["itens"].pop(registro["dir"], None)
+                    elif tipo == "categoria":
+                        estado["concluidas"].add(registro["cat"])
+                        estado["bytes"] += registro.get("bytes", 0)
+                    elif tipo == "fim":
+                        estado = None
+        except FileNotFoundError:
+            return None
+        return estado
+
+    def iniciar(self, run_id, categorias, retomada=False, **opcoes):
+        """
+        Abre o diário de uma execução (recomeçando o arquivo, ou acrescentando a ele na retomada).
+        Retorna False, sem tocar no arquivo, se o diário não puder ser aberto ou estiver em uso.
+        """
+        try:
+            with self._lock:
+                if self._arquivo:
+                    self._arquivo.close()
+                    self._arquivo = None
+                if not self.trava.adquirir():
+                    raise BlockingIOError(f"O diário '{self.caminho}' está em uso por outra execução da limpeza")
+                self._arquivo = open(self.caminho, "a" if retomada else "w", encoding='utf-8')
+                if retomada:
+                    self._arquivo.write("\n") # Encerra uma eventual última linha incompleta (ignorada na leitura)
+        except OSError as e:
+            self._falhar(e)
+            return False
+        return self._registrar({"t": "inicio", "run": run_id, "categorias": list(categorias), "opcoes": opcoes}, sincronizar=True)
+
+    def _registrar(self, registro, sincronizar=False):
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n"
+        try:
+            with self._lock:
+                if not self._arquivo:
+                    return False
+                self._arquivo.write(linha)
+                self._arquivo.flush()
+                agora = time.monotonic()
+                if sincronizar or agora - self._ultima_sincronizacao >= DIARIO_INTERVALO_SINCRONIZACAO:
+                    os.fsync(self._arquivo.fileno())
+                    self._ultima_sincronizacao = agora
+        except OSError as e:
+            self._falhar(e)
+            return False
+        return True
+
+    def planejar_diretorio(self, diretorio, itens):
+        self._registrar({"t": "plano", "dir": diretorio, "itens": list(itens)})
+
+    def concluir_itens(self, diretorio, itens):
+        if itens:
+            self._registrar({"t": "itens", "dir": diretorio, "itens": list(itens)})
+
+    def concluir_diretorio(self, diretorio):
+        self._registrar({"t": "dir", "dir": diretorio})
+
+    def concluir_categoria(self, categoria, liberado):
+        self._registrar({"t": "categoria", "cat": categoria, "bytes": liberado}, sincronizar=True)
+
+    def encerrar(self, run_id, **resumo):
+        """
+        Compacta o diário em um único registro de conclusão (troca atômica do arquivo) e libera a trava.
+        Retorna False se o diário não foi encerrado (em uso por outra execução ou falha de E/S).
+        """
+        try:
+            with self._lock:
+                try:
+                    if self._arquivo:
+                        self._arquivo.close()
+                        self._arquivo = None
+                    if not self.trava.adquirir():
+                        return False # Outra execução (ex.: o modo serviço) ainda escreve este diário
+                    temporario = self.caminho + ".tmp"
+                    with open(temporario, "w", encoding='utf-8') as f:
+                        f.write(json.dumps(dict(resumo, t="fim", run=run_id), ensure_ascii=False) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temporario, self.caminho)
+                finally:
+                    self.trava.liberar()
+        except OSError as e:
+            self._falhar(e)
+            return False
+        return True
+
+class Quarentena:
+    """
+    Armazena itens "excluídos" em uma pasta de quarentena por volume, permitindo desfazer.
+
+    Os itens são movidos com 'os.rename' (sem cópia) para '<volume>\\$LimpezaQuarentena\\<execução>'
+    e um manifesto registra o caminho original de cada item, para restaurar a execução inteira.
+    """
+    MANIFESTO = "manifesto.jsonl"
+
+    def __init__(self, arquivo_registro=None):
+        # Registro dos depósitos de quarentena já usados, para encontrá-los em qualquer volume
+        self.arquivo_registro = arquivo_registro or os.path.join(diretorio_dados_app(), "quarentena_volumes.txt")
+        self._lock = threading.Lock()
+        self._contadores = {}
+
+    def depositos(self):
+        """Retorna a lista de depósitos de quarentena conhecidos que ainda existem."""
+        try:
+            with open(self.arquivo_registro, encoding='utf-8') as f:
+                return [linha.strip() for linha in f if linha.strip() and os.path.isdir(linha.strip())]
+        except FileNotFoundError:
+            return []
+
+    def _deposito_para(self, caminho):
+        """Retorna (e registra) o depósito de quarentena do volume que contém o caminho."""
+        deposito = os.path.join(raiz_do_volume(caminho), QUARENTENA_NOME_PASTA)
+        if not os.path.isdir(deposito):
+            os.makedirs(deposito, exist_ok=True)
+        if deposito not in self.depositos():
+            with open(self.arquivo_registro, "a", encoding='utf-8') as f:
+                f.write(deposito + "\n")
+        return deposito
+
+    def mover(self, caminho, run_id, tamanho=0):
+        """Move um arquivo ou diretório para a quarentena. Lança OSError em caso de falha."""
+        with self._lock:
+            pasta_execucao = os.path.join(self._deposito_para(caminho), run_id)
+            os.makedirs(pasta_execucao, exist_ok=True)
+            numero = self._contadores.get(pasta_execucao, 0) + 1
+            self._contadores[pasta_execucao] = numero
+            destino = os.path.join(pasta_execucao, str(numero))
+            os.rename(caminho, destino) # Mesmo volume: apenas renomeia, sem copiar dados
+            registro = {"origem": caminho, "item": str(numero), "tamanho": tamanho, "ts": time.time()}
+            with open(os.path.join(pasta_execucao, self.MANIFESTO), "a", encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def mover_arvore(self, caminho, run_id, exclusoes=None, estado=(), cancelado=lambda: False, aguardar=None,
+                     preservar=None):
+        """
+        Move um item para a quarentena sem levar junto o que as regras de exclusão protegem.
+
+        Renomear uma pasta leva a subárvore inteira; por isso, quando o estado das exclusões
+        ainda tem regras que alcançam algo abaixo dela, a pasta é percorrida entrada a entrada
+        (como no MotorRemocao): as protegidas ficam, as demais são movidas uma a uma, e as
+        subpastas com regras pendentes são abertas da mesma forma. A pasta em si só é removida
+        se ficar vazia. 'aguardar(entradas)' cobra o limitador de E/S antes de cada movimentação.
+        Com o filtro 'preservar' (ver MotorRemocao), toda pasta é percorrida entrada a entrada.
+
+        Returns:
+            dict: {"bytes", "itens", "falhas", "preservados"}
+        """
+        estatisticas = {"bytes": 0, "itens": 0, "falhas": 0, "preservados": 0}
+        if eh_deposito_quarentena(os.path.basename(caminho)):
+            estatisticas["preservados"] += 1
+            return estatisticas
+        if estado or preservar:
+            try:
+                info = os.lstat(caminho)
+            except OSError:
+                estatisticas["falhas"] += 1
+                return estatisticas
+            if preservar and preservar(info):
+                estatisticas["preservados"] += 1
+                return estatisticas
+            atributos = getattr(info, 'st_file_attributes', 0)
+            if not stat.S_ISDIR(info.st_mode) or atributos & getattr(stat, 'FILE_ATTRIBUTE_REPARSE_POINT', 0x400):
+                estado = None # Arquivo, link ou junção: movido sem ser percorrido
+        # (caminho, estado das exclusões, entradas ainda não tratadas); estado None: não percorrer
+        pilha = [(caminho, estado, None)]
+        while pilha and not cancelado():
+            atual, estado_atual, entradas = pilha[-1]
+            if entradas is None:
+                pilha.pop()
+                if estado_atual or (preservar and estado_atual is not None):
+                    try:
+                        with os.scandir(atual) as iterador:
+                            pilha.append((atual, estado_atual, list(iterador)))
+                    except OSError:
+                        estatisticas["falhas"] += 1
+                    continue
+                # Nenhuma regra alcança o que está abaixo: a subárvore vai inteira
+                tamanho, quantidade = tamanho_arvore(atual, cancelado)
+                if aguardar:
+                    aguardar(quantidade)
+                try:
+                    self.mover(atual, run_id, tamanho)
+                    estatisticas["bytes"] += tamanho
+                    estatisticas["itens"] += 1
+                except OSError:
+                    estatisticas["falhas"] += 1
+                continue
+            if not entradas:
+                pilha.pop()
+                try:
+                    os.rmdir(atual) # Só se todo o conteúdo foi movido
+                except OSError:
+                    pass
+                continue
+            entrada = entradas.pop()
+            if eh_deposito_quarentena(entrada.name):
+                estatisticas["preservados"] += 1
+                continue
+            estado_entrada = exclusoes.avancar(estado_atual, entrada.name) if estado_atual else ()
+            if estado_entrada is None:
+                estatisticas["preservados"] += 1
+                continue
+            if preservar:
+                try:
+                    preservada = preservar(entrada.stat(follow_symlinks=False))
+                except OSError:
+                    estatisticas["falhas"] += 1
+                    continue
+                if preservada:
+                    estatisticas["preservados"] += 1
+                    continue
+            pilha.append((entrada.path, estado_entrada if eh_diretorio_real(entrada) else None, None))
+        return estatisticas
+
+    def _ler_manifesto(self, pasta_execucao):
+        try:
+            with open(os.path.join(pasta_execucao, self.MANIFESTO), encoding='utf-8') as f:
+                return [json.loads(linha) for linha in f if linha.strip()]
+        except (OSError, ValueError):
+            return []
+
+    def execucoes(self):
+        """Retorna [(run_id, pasta, tamanho, data de modificação)] de todos os depósitos, da mais antiga à mais nova."""
+        resultado = []
+        for deposito in self.depositos():
+            for run_id in os.listdir(deposito):
+                pasta = os.path.join(deposito, run_id)
+                if os.path.isdir(pasta):
+                    tamanho = sum(item.get("tamanho", 0) for item in self._ler_manifesto(pasta))
+                    resultado.append((run_id, pasta, tamanho, os.path.getmtime(pasta)))
+        return sorted(resultado, key=lambda execucao: execucao[3])
+
+    def ultima_execucao(self):
+        """Retorna o id da execução mais recente em quarentena, ou None."""
+        execucoes = self.execucoes()
+        return execucoes[-1][0] if execucoes else None
+
+    def restaurar(self, run_id):
+        """
+        Devolve aos caminhos originais todos os itens de uma execução, em todos os volumes.
+
+        Returns:
+            tuple: (itens restaurados, itens não restaurados)
+        """
+        restaurados, conflitos = 0, 0
+        with self._lock: # Uma limpeza em andamento pode estar movendo itens para a mesma pasta
+            for id_execucao, pasta, _, _ in self.execucoes():
+                if id_execucao != run_id:
+                    continue
+                conflitos_pasta = 0
+                for registro in reversed(self._ler_manifesto(pasta)):
+                    item = os.path.join(pasta, registro["item"])
+                    origem = registro["origem"]
+                    if not os.path.exists(item):
+                        continue
+                    try:
+                        if os.path.exists(origem):
+                            raise FileExistsError(origem)
+                        os.makedirs(os.path.dirname(origem), exist_ok=True)
+                        os.rename(item, origem)
+                        restaurados += 1
+                    except OSError:
+                        conflitos_pasta += 1
+                # Cada volume tem a sua pasta: só fica a que ainda guarda itens não restaurados
+                if not conflitos_pasta:
+                    shutil.rmtree(pasta, ignore_errors=True)
+                conflitos += conflitos_pasta
+        return restaurados, conflitos
+
+    def aplicar_retencao(self, tamanho_maximo=QUARENTENA_TAMANHO_MAXIMO, idade_maxima_dias=QUARENTENA_IDADE_MAXIMA_DIAS):
+        """
+        Descarta definitivamente as execuções mais antigas que a idade máxima e, depois,
+        as mais antigas até o total ficar abaixo do tamanho máximo.
+
+        Returns:
+            tuple: (execuções descartadas, bytes liberados)
+        """
+        execucoes = self.execucoes()
+        limite_mtime = time.time() - idade_maxima_dias * 86400
+        total = sum(execucao[2] for execucao in execucoes)
+        descartadas, liberado = 0, 0
+        for _, pasta, tamanho, mtime in execucoes:
+            if mtime >= limite_mtime and total <= tamanho_maximo:
+                break
+            shutil.rmtree(pasta, ignore_errors=True)
+            total -= tamanho
+            liberado += tamanho
+            descartadas += 1
+        return descartadas, liberado
+
+def ler_argumentos(argv=None):
+    """Lê as opções de linha de comando (modo serviço sem interface)."""
+    parser = argparse.ArgumentParser(description="Limpador e Otimizador para Windows")
+    parser.add_argument("--servico", action="store_true", help="Executa sem interface, limpando periodicamente quando o sistema estiver ocioso.")
+    parser.add_argument("--categorias", default="temp_usuarios,cache_navegadores,locais_especificos",
+                        help="Categorias de limpeza do modo serviço, separadas por vírgula.")
+    parser.add_argument("--intervalo-horas", type=float, default=SERVICO_INTERVALO_HORAS)
+    parser.add_argument("--cpu-maxima", type=float, default=SERVICO_CPU_MAXIMA)
+    parser.add_argument("--fila-disco-maxima", type=float, default=SERVICO_FILA_DISCO_MAXIMA)
+    parser.add_argument("--ocioso-minimo", type=float, default=SERVICO_OCIOSO_MINIMO,
+                        help="Segundos sem entrada do usuário para considerar o sistema ocioso.")
+    parser.add_argument("--excluir", action="append", default=[], metavar="REGRA",
+                        help="Caminho ou glob que nunca deve ser limpo (pode ser repetido; soma-se às regras salvas).")
+    parser.add_argument("--estimativas", action="store_true",
+                        help="Imprime em JSON a duração prevista de cada tarefa de reparo (a partir do histórico) e sai.")
+    parser.add_argument("--agente", action="store_true", help="Executa sem interface, com o agente de controle remoto (JSON-RPC/HTTP).")
+    parser.add_argument("--agente-host", default=AGENTE_HOST, help="Interface onde o agente aceita conexões.")
+    parser.add_argument("--agente-porta", type=int, default=AGENTE_PORTA)
+    parser.add_argument("--agente-token", default=os.environ.get("LIMPEZA_AGENTE_TOKEN"),
+                        help="Token de autenticação (padrão: variável de ambiente LIMPEZA_AGENTE_TOKEN).")
+    return parser.parse_args(argv)
+
+def run_main_app(argumentos=None):
     """
     Função principal que importa a GUI e executa a aplicação.
 
@@ -82,7 +3415,7 @@ def run_main_app():
     from tkinter.constants import LEFT, DISABLED, NORMAL, WORD, END
     import ttkbootstrap as ttk
     from ttkbootstrap.scrolled import ScrolledText
-    from ttkbootstrap.dialogs import Messagebox
+    from ttkbootstrap.dialogs import Messagebox, Querybox
 
     # --- Classes de Utilidades ---
     class ToolTip:
@@ -137,18 +3470,63 @@ def run_main_app():
             self.processo_limpeza = None # Armazena o subprocesso da limpeza de disco
             self.limpeza_cancelada = False # Flag para controlar o cancelamento
             # Define o caminho padrão para o arquivo de log
-            self.log_file_path = os.path.join(os.path.expanduser("~"), "Desktop", "limpeza_log.txt")
-            self.log_queue = Queue() # Fila para comunicação entre threads e a GUI
+            pasta_log = os.path.join(os.path.expanduser("~"), "Desktop")
+            self.log_estruturado = LogEstruturado(pasta_log) # Log principal (JSONL com rotação e índice)
+            self.log_file_path = os.path.join(pasta_log, "limpeza_log.txt") # Log em texto (opcional)
+            self.log_texto_ativo = tk.BooleanVar(value=False)
+            self.sessao_id = datetime.now().strftime("%Y%m%d-%H%M%S") # Usado nos registros fora de uma limpeza
+            self._contexto_thread = threading.local() # Categoria de limpeza da thread atual
+            # Canal único (em lote) de eventos das threads de trabalho para a tela, os arquivos de log e o agente
+            self.eventos = BarramentoEventos()
+            self.consumidor_arquivo = self.eventos.adicionar_consumidor(ConsumidorArquivoLog(self.log_estruturado, self.log_file_path))
+            self.log_texto_ativo.trace_add("write", lambda *_: setattr(self.consumidor_arquivo, "texto_ativo", self.log_texto_ativo.get()))
+            self.armazem_log = ArmazemLog() # Linhas exibidas na área de log, indexadas para filtro e busca
             self.task_buttons = {} # Dicionário para rastrear botões de tarefas
+            self.task_progress = {} # Indicadores de progresso (barra e rótulo) de cada tarefa
+            self.indicadores_volumes = {} # task_id -> linhas de progresso por volume (tarefas em todas as unidades)
+            self.manutencao_volumes = {} # task_id -> controle (cancelamento e processos) da tarefa em todas as unidades
+            # Inventário de unidades em segundo plano (não bloqueia a inicialização da interface)
+            self.inventario = InventarioUnidades(ao_atualizar=lambda inv: self.root.after(0, self.atualizar_lista_unidades, inv))
+            self.quarentena = Quarentena() # Depósito para desfazer limpezas feitas em modo quarentena
+            self.limitador_io = LimitadorIO() # Limite de operações/bytes por segundo de exclusões e varreduras
+            self.exclusoes_extras = [] # Regras de exclusão passadas na linha de comando (não são salvas)
+            self.exclusoes = carregar_exclusoes() # Caminhos e globs que a limpeza nunca toca
+            self.run_id = None # Identificador da execução de limpeza atual
+            self.espaco_em_quarentena = 0 # Bytes movidos para a quarentena na execução atual (ainda ocupam o disco)
+            self._lock_quarentena = threading.Lock() # As lixeiras dos volumes são esvaziadas em paralelo
+            # Diário da rotina de limpeza, para retomá-la após uma interrupção; uma falha nele não interrompe a limpeza
+            self.diario = DiarioLimpeza(ao_falhar=lambda e: self.log(
+                f"Falha no diário de limpeza; a execução continua, mas não poderá ser retomada se for interrompida. Detalhes: {e}", "AVISO"))
+            self.retomada = None # Estado (lido do diário) da execução interrompida sendo retomada
+            self.modo_servico = False # True quando executado sem interface (manutenção automática)
+            self.agente = None # Agente de controle remoto (opcional)
+            self.orquestrador = OrquestradorProcessos() # Laço asyncio único que conduz os comandos externos
+            self.observadores_tarefa = [] # Funções chamadas com (task_id, codigo_saida) ao fim de cada tarefa
+            self.tarefas_ativas = set() # Tarefas iniciadas e ainda não concluídas (cada uma é concluída uma única vez)
+            self._lock_tarefas = threading.Lock()
+            self._lock_limpeza = threading.Lock() # Impede duas rotinas de limpeza simultâneas (GUI, serviço, agente)
+            self.execucao_liberada = threading.Event() # Limpada para pausar a limpeza no próximo ponto seguro
+            self.execucao_liberada.set()
+            try:
+                self.historico = HistoricoExecucoes() # Histórico de execuções (SQLite, gravação em lote)
+            except Exception as e:
+                print(f"AVISO: Histórico de execuções indisponível. Detalhes: {e}")
+                self.historico = None
+            self.estimador = EstimadorDuracao(self.historico) # Duração prevista das tarefas de reparo
+            self.estimativas_tarefa = {} # task_id -> início, características da unidade e duração prevista
 
             # Variáveis para o contador de reinicialização
             self.countdown_label = None
             self.countdown_timer_id = None
             self.tempo_restante = 0
             
-            # Inicia a configuração da UI e o processador da fila de logs
+            # Inicia a configuração da UI e a entrega dos eventos à thread principal
             self.setup_ui()
-            self.root.after(100, self.process_log_queue)
+            self.consumidor_interface = self.eventos.adicionar_consumidor(ConsumidorInterface(self.root.after, self.tratar_eventos))
+            self.eventos.iniciar()
+            atexit.register(self.eventos.parar) # Grava nos arquivos o que ainda estiver pendente
+            self.inventario.iniciar()
+            threading.Thread(target=self.aplicar_retencao_quarentena, daemon=True).start()
 
         def setup_ui(self):
             """Configura a janela principal e todos os widgets da interface gráfica."""
@@ -183,9 +3561,23 @@ def run_main_app():
             # Menu "Arquivo"
             file_menu = ttk.Menu(menubar, tearoff=0)
             file_menu.add_command(label="Alterar Local do Arquivo de Log", command=self.escolher_local_log)
+            file_menu.add_checkbutton(label="Gravar Também Log em Texto (.txt)", variable=self.log_texto_ativo)
+            file_menu.add_command(label="Consultar Execução Anterior...", command=self.consultar_execucao_anterior)
+            file_menu.add_command(label="Regras de Exclusão...", command=self.editar_exclusoes)
             file_menu.add_separator()
             file_menu.add_command(label="Sair", command=self.root.quit)
             menubar.add_cascade(label="Arquivo", menu=file_menu)
+
+            # Menu "Histórico"
+            historico_menu = ttk.Menu(menubar, tearoff=0)
+            historico_menu.add_command(label="Histórico de Execuções e Tendências", command=self.mostrar_historico)
+            menubar.add_cascade(label="Histórico", menu=historico_menu)
+
+            # Menu "Quarentena"
+            quarentena_menu = ttk.Menu(menubar, tearoff=0)
+            quarentena_menu.add_command(label="Restaurar Última Limpeza", command=self.restaurar_ultima_quarentena)
+            quarentena_menu.add_command(label="Esvaziar Quarentena", command=self.esvaziar_quarentena)
+            menubar.add_cascade(label="Quarentena", menu=quarentena_menu)
             
             # Menu "Ajuda"
             help_menu = ttk.Menu(menubar, tearoff=0)
@@ -227,23 +3619,28 @@ def run_main_app():
 
             self.vars = {
                 "lixeira": tk.BooleanVar(), "temp_usuarios": tk.BooleanVar(),
-                "cache_navegadores": tk.BooleanVar(), "locais_especificos": tk.BooleanVar(),
-                "limpeza_disco": tk.BooleanVar(), "reiniciar": tk.BooleanVar()
+                "cache_navegadores": tk.BooleanVar(), "bancos_navegadores": tk.BooleanVar(), "locais_especificos": tk.BooleanVar(),
+                "limpeza_disco": tk.BooleanVar(), "compactar_logs": tk.BooleanVar(),
+                "reiniciar": tk.BooleanVar()
             }
             
             tooltip_texts = {
                 "lixeira": "Esvazia completamente a Lixeira do Windows.",
                 "temp_usuarios": "Apaga arquivos temporários da pasta AppData\\Local\\Temp do usuário.",
                 "cache_navegadores": "Remove arquivos de cache do Chrome, Edge e Firefox.",
+                "bancos_navegadores": "Compacta (VACUUM) o histórico, os favicons e os cookies dos navegadores.\nBancos de navegadores abertos são ignorados.",
                 "locais_especificos": "Limpa pastas de sistema como C:\\Windows\\Temp e Prefetch.",
                 "limpeza_disco": "Abre a ferramenta nativa de Limpeza de Disco do Windows.",
+                "compactar_logs": f"Compacta (gzip) arquivos de log com mais de {LOGS_ANTIGOS_IDADE_DIAS} dias, sem apagá-los.",
                 "reiniciar": "Reinicia o computador automaticamente após a conclusão da limpeza."
             }
             
             opcoes = [
                 ("Limpar Lixeira", "lixeira"), ("Limpar Temp dos Usuários", "temp_usuarios"),
-                ("Limpar Cache dos Navegadores", "cache_navegadores"), ("Limpar Locais Específicos do Sistema", "locais_especificos"),
-                ("Executar Limpeza de Disco (Ferramenta do Windows)", "limpeza_disco"), ("Reiniciar o computador após a limpeza", "reiniciar")
+                ("Limpar Cache dos Navegadores", "cache_navegadores"), ("Compactar Bancos de Dados dos Navegadores", "bancos_navegadores"),
+                ("Limpar Locais Específicos do Sistema", "locais_especificos"),
+                ("Executar Limpeza de Disco (Ferramenta do Windows)", "limpeza_disco"), ("Compactar Arquivos de Log Antigos", "compactar_logs"),
+                ("Reiniciar o computador após a limpeza", "reiniciar")
             ]
             
             for texto, var_key in opcoes:
@@ -251,12 +3648,39 @@ def run_main_app():
                 cb.pack(pady=4, anchor="w")
                 ToolTip(cb, text=tooltip_texts[var_key])
 
+            # Modo quarentena: move os itens em vez de apagá-los, permitindo desfazer
+            self.var_quarentena = tk.BooleanVar()
+            cb_quarentena = ttk.Checkbutton(frame_opcoes, text="Modo Quarentena (permite desfazer a limpeza)", variable=self.var_quarentena, bootstyle="warning")
+            cb_quarentena.pack(pady=(10, 4), anchor="w")
+            ToolTip(cb_quarentena, text=f"Move os arquivos para '{QUARENTENA_NOME_PASTA}' no mesmo volume em vez de apagá-los.\n"
+                                        f"A quarentena é esvaziada automaticamente após {QUARENTENA_IDADE_MAXIMA_DIAS} dias "
+                                        f"ou acima de {self.formatar_espaco(QUARENTENA_TAMANHO_MAXIMO)}.")
+
             # Botões para marcar/desmarcar todas as opções
             select_frame = ttk.Frame(frame_opcoes)
             select_frame.pack(pady=10, fill='x')
             ttk.Button(select_frame, text="Marcar Tudo", command=self.selecionar_todos, bootstyle="secondary").pack(side=LEFT, padx=5)
             ttk.Button(select_frame, text="Desmarcar Tudo", command=self.desmarcar_todos, bootstyle="secondary").pack(side=LEFT, padx=5)
 
+            # --- Seção do Limitador de I/O ---
+            frame_limite = ttk.Labelframe(parent_tab, text="Limite de I/O (0 = sem limite)", padding=10)
+            frame_limite.pack(pady=5, padx=10, fill='x')
+            ttk.Label(frame_limite, text="Volume:").pack(side=LEFT)
+            self.limite_volume_combobox = ttk.Combobox(frame_limite, state="readonly", values=["Todos"], width=7)
+            self.limite_volume_combobox.set("Todos")
+            self.limite_volume_combobox.pack(side=LEFT, padx=(5, 10))
+            self.limite_volume_combobox.bind("<<ComboboxSelected>>", self._exibir_limites_volume)
+            ttk.Label(frame_limite, text="Operações/s:").pack(side=LEFT)
+            self.limite_operacoes = ttk.Spinbox(frame_limite, from_=0, to=100000, increment=50, width=7)
+            self.limite_operacoes.pack(side=LEFT, padx=(5, 10))
+            ttk.Label(frame_limite, text="MB/s:").pack(side=LEFT)
+            self.limite_mb = ttk.Spinbox(frame_limite, from_=0, to=10000, increment=5, width=6)
+            self.limite_mb.pack(side=LEFT, padx=(5, 10))
+            btn_limite = ttk.Button(frame_limite, text="Aplicar", command=self.aplicar_limite_io, bootstyle="secondary")
+            btn_limite.pack(side=LEFT)
+            ToolTip(btn_limite, "Limita a velocidade das exclusões e varreduras para não prejudicar outros programas.\nPode ser alterado durante a limpeza.")
+            self._exibir_limites_volume()
+
             # --- Seção de Progresso ---
             progress_frame = ttk.Frame(parent_tab)
             progress_frame.pack(pady=10, padx=10, fill='x')
@@ -296,21 +3720,18 @@ def run_main_app():
             )
             defrag_button.pack(side=LEFT, expand=True, fill='x', padx=(0, 10))
             self.task_buttons["desfragmentar_disco"] = defrag_button # Rastreia o botão
-            ToolTip(widget=defrag_button, text="Executa a desfragmentação do disco selecionado ao lado. Pode levar muito tempo.")
+            ToolTip(widget=defrag_button, text="Executa a desfragmentação do disco selecionado ao lado. Pode levar muito tempo.\n"
+                                               "Com 'Todas', unidades em discos físicos diferentes são otimizadas ao mesmo tempo.")
 
-            available_drives = self.get_available_drives()
+            # A lista de unidades é preenchida pelo inventário em segundo plano
             self.drive_combobox = ttk.Combobox(
                 defrag_frame, 
                 state="readonly", 
-                values=available_drives, 
+                values=[], 
                 width=5
             )
-            # Define 'C:' como padrão se existir, senão o primeiro da lista
-            if 'C:' in available_drives:
-                self.drive_combobox.set('C:')
-            elif available_drives:
-                self.drive_combobox.set(available_drives[0])
             self.drive_combobox.pack(side=LEFT)
+            self._criar_indicador_progresso(frame_desempenho, "desfragmentar_disco")
             
             # --- Outras ferramentas ---
             btn_teste_conexao = ttk.Button(frame_desempenho, text="Testar Velocidade da Internet", command=self.abrir_teste_conexao, bootstyle="secondary-outline")
@@ -332,7 +3753,7 @@ def run_main_app():
             self.create_task_button(frame_reparo, "Reparar Imagem do Windows (DISM)", self.executar_dism, "dism", "Executa o DISM para reparar a imagem do sistema Windows, que é usada pelo SFC.")
             
             # CHKDSK será executado automaticamente (sem Messagebox.yesno)
-            self.create_task_button(frame_reparo, "Agendar Verificação de Disco (CHKDSK)", self.executar_chkdsk, "chkdsk", "Agenda uma verificação completa do disco C: na próxima reinicialização para corrigir erros.")
+            self.create_task_button(frame_reparo, "Agendar Verificação de Disco (CHKDSK)", self.executar_chkdsk, "chkdsk", "Agenda uma verificação completa da unidade selecionada na seção acima (ou de todas) na próxima reinicialização para corrigir erros.")
             
             # Windows Update será executado automaticamente (sem Messagebox.yesno)
             self.create_task_button(frame_reparo, "Corrigir Problemas do Windows Update", self.corrigir_windows_update, "win_update", "Tenta redefinir os componentes do Windows Update para corrigir falhas de atualização.")
@@ -350,14 +3771,299 @@ def run_main_app():
             button.pack(pady=5, fill='x', padx=50)
             self.task_buttons[task_id] = button
             ToolTip(widget=button, text=tooltip_text)
+            self._criar_indicador_progresso(parent, task_id)
+
+        def _criar_indicador_progresso(self, parent, task_id):
+            """Cria a barra de progresso de uma tarefa, exibida logo abaixo do seu botão quando houver progresso."""
+            frame = ttk.Frame(parent)
+            barra = ttk.Progressbar(frame, mode="determinate", bootstyle="success-striped")
+            barra.pack(side=LEFT, expand=True, fill='x')
+            rotulo = ttk.Label(frame, text="", width=28)
+            rotulo.pack(side=LEFT, padx=(10, 0))
+            self.task_progress[task_id] = {"frame": frame, "barra": barra, "rotulo": rotulo, "botao": self.task_buttons[task_id]}
+
+        def atualizar_progresso_tarefa(self, task_id, evento):
+            """Atualiza (na thread principal) o indicador de progresso de uma tarefa a partir de um evento."""
+            indicador = self._mostrar_indicador_progresso(task_id)
+            if not indicador:
+                return
+            indicador["barra"].config(value=evento["percentual"])
+            texto = f"{evento['fase'] + ' ' if evento['fase'] else ''}{evento['percentual']:.0f}%"
+            eta = evento.get("eta_estimada", evento.get("eta"))
+            if eta is not None:
+                texto += f" - restam ~{self.formatar_duracao(eta)}"
+            indicador["rotulo"].config(text=texto)
+
+        def _mostrar_indicador_progresso(self, task_id):
+            """Exibe o indicador da tarefa logo abaixo do botão (ou da linha do botão) e o retorna."""
+            indicador = self.task_progress.get(task_id)
+            if indicador and not indicador["frame"].winfo_ismapped():
+                ancora = indicador["botao"].master if indicador["botao"].master is not indicador["frame"].master else indicador["botao"]
+                indicador["frame"].pack(after=ancora, fill='x', padx=50, pady=(0, 5))
+            return indicador
+
+        def iniciar_estimativa(self, task_id, unidade=None, inicio=None):
+            """
+            Guarda as características da unidade no início da tarefa e anuncia a duração prevista.
+            Retorna True se houver previsão (a tela então mostra a contagem regressiva).
+            Consulta o histórico (SQLite) e o disco: chamar fora da thread da interface e do laço
+            do orquestrador, com a 'unidade' já lida do seletor.
+            """
+            unidade, total, livre = caracteristicas_unidade(unidade or volume_de(os.environ.get('SystemRoot') or os.sep))
+            previsao = self.estimador.prever(task_id, unidade, total, livre)
+            with self._lock_tarefas:
+                if task_id not in self.tarefas_ativas:
+                    return False # A tarefa terminou antes da estimativa ficar pronta
+                self.estimativas_tarefa[task_id] = {
+                    "inicio": inicio or time.time(), "unidade": unidade, "total": total, "livre": livre,
+                    "duracao_prevista": previsao["duracao"] if previsao else None, "ultimo_progresso": 0,
+                }
+            if not previsao:
+                return False
+            self.log(f"Duração estimada: ~{self.formatar_duracao(previsao['duracao'])} (com base em {previsao['amostras']} execuções anteriores).", "INFO",
+                     tarefa=task_id, unidade=unidade, duracao_prevista=round(previsao["duracao"], 1), amostras=previsao["amostras"])
+            self.publicar_metrica("duracao_prevista", tarefa=task_id, unidade=unidade,
+                                  valor=round(previsao["duracao"], 1), amostras=previsao["amostras"])
+            return True
+
+        def _atualizar_estimativa_tarefa(self, task_id):
+            """Enquanto a tarefa não informa progresso, mostra a contagem regressiva da duração prevista."""
+            estado = self.estimativas_tarefa.get(task_id)
+            if not estado:
+                return
+            agora = time.time()
+            if agora - estado["ultimo_progresso"] > 5: # Sem eventos de progresso recentes
+                indicador = self._mostrar_indicador_progresso(task_id)
+                if indicador:
+                    decorrido, prevista = agora - estado["inicio"], estado["duracao_prevista"]
+                    indicador["barra"].config(value=min(99, 100 * decorrido / prevista) if prevista else 0)
+                    if decorrido < prevista:
+                        texto = f"Previsto: restam ~{self.formatar_duracao(prevista - decorrido)}"
+                    else:
+                        texto = f"Além do previsto (~{self.formatar_duracao(prevista)})"
+                    indicador["rotulo"].config(text=texto)
+            self.root.after(1000, self._atualizar_estimativa_tarefa, task_id)
+
+        def ocultar_progresso_tarefa(self, task_id):
+            """Esconde e zera o indicador de progresso de uma tarefa."""
+            indicador = self.task_progress.get(task_id)
+            if indicador:
+                indicador["frame"].pack_forget()
+                indicador["barra"].config(value=0)
+                indicador["rotulo"].config(text="")
+
+        def criar_indicadores_volumes(self, task_id, volumes):
+            """Cria, abaixo do indicador da tarefa, uma linha de progresso por unidade e o botão único de cancelamento."""
+            indicador = self._mostrar_indicador_progresso(task_id)
+            if not indicador:
+                return
+            indicador["rotulo"].config(text=f"0 de {len(volumes)} unidades")
+            quadro = ttk.Frame(indicador["frame"].master)
+            quadro.pack(after=indicador["frame"], fill='x', padx=50, pady=(0, 5))
+            linhas = {}
+            for volume in volumes:
+                linha = ttk.Frame(quadro)
+                linha.pack(fill='x', pady=1)
+                ttk.Label(linha, text=volume, width=6).pack(side=LEFT)
+                barra = ttk.Progressbar(linha, mode="determinate", bootstyle="info-striped")
+                barra.pack(side=LEFT, expand=True, fill='x')
+                rotulo = ttk.Label(linha, text="Na fila", width=22)
+                rotulo.pack(side=LEFT, padx=(10, 0))
+                linhas[volume] = {"barra": barra, "rotulo": rotulo, "percentual": 0.0, "concluido": False}
+            cancelar = ttk.Button(quadro, text="Cancelar em Todas as Unidades", bootstyle="danger-outline",
+                                  command=lambda: self.cancelar_manutencao_volumes(task_id))
+            cancelar.pack(pady=(4, 0), anchor='e')
+            self.indicadores_volumes[task_id] = {"frame": quadro, "linhas": linhas, "cancelar": cancelar}
+
+        def remover_indicadores_volumes(self, task_id):
+            indicadores = self.indicadores_volumes.pop(task_id, None)
+            if indicadores:
+                indicadores["frame"].destroy()
+
+        def atualizar_progresso_volume(self, task_id, volume, evento):
+            """Atualiza a linha de uma unidade e, no indicador da tarefa, a média de todas."""
+            indicadores = self.indicadores_volumes.get(task_id)
+            if not indicadores or volume not in indicadores["linhas"]:
+                return
+            linha = indicadores["linhas"][volume]
+            linha["percentual"] = evento["percentual"]
+            linha["barra"].config(value=evento["percentual"])
+            texto = f"{evento['fase'] + ' ' if evento['fase'] else ''}{evento['percentual']:.0f}%"
+            if evento.get("eta") is not None:
+                texto += f" - ~{self.formatar_duracao(evento['eta'])}"
+            linha["rotulo"].config(text=texto)
+            self._atualizar_total_volumes(task_id)
+
+        def concluir_indicador_volume(self, task_id, volume, codigo_saida):
+            indicadores = self.indicadores_volumes.get(task_id)
+            if not indicadores or volume not in indicadores["linhas"]:
+                return
+            linha = indicadores["linhas"][volume]
+            linha["concluido"] = True
+            if codigo_saida == 0:
+                linha["percentual"] = 100.0
+                linha["barra"].config(value=100)
+                linha["rotulo"].config(text="Concluído")
+            else:
+                linha["rotulo"].config(text="Cancelado" if codigo_saida is None else f"Falha (código {codigo_saida})")
+            self._atualizar_total_volumes(task_id)
+
+        def _atualizar_total_volumes(self, task_id):
+            linhas = self.indicadores_volumes[task_id]["linhas"].values()
+            indicador = self.task_progress.get(task_id)
+            if indicador:
+                indicador["barra"].config(value=sum(l["percentual"] for l in linhas) / len(linhas))
+                indicador["rotulo"].config(text=f"{sum(l['concluido'] for l in linhas)} de {len(linhas)} unidades")
 
         def setup_log_area(self):
-            """Cria e configura a área de texto para exibir os logs de atividade."""
+            """
+            Cria a área de logs: barra de filtros (tipo, tarefa, período e busca) e a área de texto.
+            As linhas ficam no armazém em memória; a área de texto recebe só as linhas visíveis.
+            """
             log_frame = ttk.Labelframe(self.root, text="Logs de Atividade", padding=10)
             log_frame.pack(pady=10, padx=10, expand=True, fill='both')
-            self.log_text = ScrolledText(log_frame, wrap=WORD, font=("Courier New", 9), height=10)
-            self.log_text.pack(expand=True, fill='both')
+
+            filtros = ttk.Frame(log_frame)
+            filtros.pack(fill='x', pady=(0, 5))
+            ttk.Label(filtros, text="Tipo:").pack(side=LEFT)
+            self.filtro_tipo = ttk.Combobox(filtros, values=["Todos", "ERRO", "AVISO", "SUCESSO", "INFO", "CMD", "Sem CMD"], width=9, state="readonly")
+            self.filtro_tipo.set("Todos")
+            self.filtro_tipo.pack(side=LEFT, padx=(2, 8))
+            ttk.Label(filtros, text="Tarefa:").pack(side=LEFT)
+            self.filtro_tarefa = ttk.Combobox(filtros, values=["Todas"], width=16, state="readonly")
+            self.filtro_tarefa.set("Todas")
+            self.filtro_tarefa.pack(side=LEFT, padx=(2, 8))
+            ttk.Label(filtros, text="Período:").pack(side=LEFT)
+            self.filtro_periodo = ttk.Combobox(filtros, values=list(self.PERIODOS_LOG), width=13, state="readonly")
+            self.filtro_periodo.set("Tudo")
+            self.filtro_periodo.pack(side=LEFT, padx=(2, 8))
+            ttk.Label(filtros, text="Buscar:").pack(side=LEFT)
+            self.filtro_busca = tk.StringVar()
+            ttk.Entry(filtros, textvariable=self.filtro_busca, width=18).pack(side=LEFT, padx=2, fill='x', expand=True)
+            self.contagem_log_label = ttk.Label(filtros, text="", bootstyle="secondary")
+            self.contagem_log_label.pack(side=LEFT, padx=(8, 0))
+            for combobox in (self.filtro_tipo, self.filtro_tarefa, self.filtro_periodo):
+                combobox.bind("<<ComboboxSelected>>", lambda e: self.aplicar_filtro_log())
+            self.filtro_busca.trace_add("write", lambda *_: self.aplicar_filtro_log())
+
+            area = ttk.Frame(log_frame)
+            area.pack(expand=True, fill='both')
+            self.log_scrollbar = ttk.Scrollbar(area, orient='vertical', command=self._rolar_log)
+            self.log_scrollbar.pack(side='right', fill='y')
+            self.log_text = tk.Text(area, wrap=WORD, font=("Courier New", 9), height=10)
+            self.log_text.pack(side=LEFT, expand=True, fill='both')
+            self.log_text.bind("<Configure>", lambda e: self._agendar_renderizacao_log())
+            self.log_text.bind("<MouseWheel>", lambda e: self._rolar_log("scroll", -int(e.delta / 120) * 3, "units"))
+            self.log_text.bind("<Button-4>", lambda e: self._rolar_log("scroll", -3, "units"))
+            self.log_text.bind("<Button-5>", lambda e: self._rolar_log("scroll", 3, "units"))
+
+            self._filtro_log = {} # Argumentos de ArmazemLog.filtrar do filtro atual
+            self._visao_log = self.armazem_log.filtrar() # Índices das linhas que passam no filtro
+            self._inicio_log = 0 # Primeira linha da visão exibida
+            self._seguir_final_log = True # Acompanha as linhas novas enquanto o usuário não rolar para cima
+            self._renderizacao_log_pendente = False
             self.update_log_colors() # Define as cores iniciais das tags de log
+
+        PERIODOS_LOG = {"Tudo": None, "Últimos 5 min": 300, "Última hora": 3600, "Últimas 24 h": 86400}
+
+        def aplicar_filtro_log(self):
+            """Refaz a visão da área de log a partir dos filtros escolhidos (usa os índices do armazém)."""
+            tipo = self.filtro_tipo.get()
+            tags = None if tipo == "Todos" else {"ERRO", "AVISO", "SUCESSO", "INFO"} if tipo == "Sem CMD" else {tipo}
+            tarefa = self.filtro_tarefa.get()
+            periodo = self.PERIODOS_LOG.get(self.filtro_periodo.get())
+            self._filtro_log = {
+                "tags": tags,
+                "tarefa": None if tarefa == "Todas" else tarefa,
+                "texto": self.filtro_busca.get().strip() or None,
+                "desde": time.time() - periodo if periodo else None,
+            }
+            self._visao_log = self.armazem_log.filtrar(**self._filtro_log)
+            self._seguir_final_log = True
+            self._renderizar_log()
+
+        def registrar_na_tela(self, linha, tag, tarefa=None, momento=None):
+            """Guarda uma linha no armazém de log e a exibe se ela passar no filtro atual (thread principal)."""
+            descartadas = self.armazem_log.descartadas
+            indice = self.armazem_log.adicionar(linha, tag or "INFO", tarefa, momento)
+            if self.armazem_log.descartadas != descartadas:
+                self._visao_log = self.armazem_log.filtrar(**self._filtro_log) # Linhas antigas foram descartadas (índices mudaram)
+            elif indice < len(self.armazem_log) - 1:
+                # Linha mais antiga que a última exibida (outra thread): entra na sua posição
+                visao = self._visao_log
+                if isinstance(visao, range):
+                    self._visao_log = visao = list(visao)
+                ArmazemLog.deslocar_indices(visao, indice)
+                if self.armazem_log.atende(indice, **self._filtro_log):
+                    bisect.insort(visao, indice)
+            elif self.armazem_log.atende(indice, **self._filtro_log):
+                visao = self._visao_log
+                if isinstance(visao, range) and visao.stop == indice:
+                    self._visao_log = range(visao.start, indice + 1)
+                else:
+                    if isinstance(visao, range):
+                        self._visao_log = visao = list(visao)
+                    visao.append(indice)
+            if tarefa and len(self.armazem_log.por_tarefa.get(tarefa, ())) == 1:
+                self.filtro_tarefa.config(values=["Todas"] + sorted(self.armazem_log.por_tarefa))
+            self._agendar_renderizacao_log()
+
+        def limpar_tela_log(self):
+            """Esvazia o armazém e a área de log."""
+            self.armazem_log.limpar()
+            self._visao_log = self.armazem_log.filtrar(**self._filtro_log)
+            self._inicio_log = 0
+            self._seguir_final_log = True
+            self.filtro_tarefa.config(values=["Todas"])
+            self._renderizar_log()
+
+        def _agendar_renderizacao_log(self):
+            # Várias linhas chegando juntas geram uma única renderização
+            if not self._renderizacao_log_pendente:
+                self._renderizacao_log_pendente = True
+                self.root.after(50, self._renderizar_log)
+
+        def _linhas_visiveis_log(self):
+            altura_linha = self.log_text.tk.call("font", "metrics", self.log_text.cget("font"), "-linespace") or 1
+            return max(1, self.log_text.winfo_height() // int(altura_linha))
+
+        def _renderizar_log(self):
+            """Coloca na área de texto apenas as linhas da visão que cabem na janela."""
+            self._renderizacao_log_pendente = False
+            total = len(self._visao_log)
+            linhas = self._linhas_visiveis_log()
+            if self._seguir_final_log or self._inicio_log > max(0, total - linhas):
+                self._inicio_log = max(0, total - linhas)
+            fim = min(total, self._inicio_log + linhas)
+            armazem = self.armazem_log
+            argumentos = []
+            for indice in self._visao_log[self._inicio_log:fim]:
+                argumentos += (armazem.textos[indice], armazem.tags[indice])
+
+            self.log_text.delete('1.0', END)
+            if argumentos:
+                self.log_text.insert(END, *argumentos)
+            if self._seguir_final_log:
+                self.log_text.see(END)
+            if total:
+                self.log_scrollbar.set(self._inicio_log / total, fim / total)
+            else:
+                self.log_scrollbar.set(0, 1)
+            self.contagem_log_label.config(text=f"{total} de {len(armazem)} linhas")
+
+        def _rolar_log(self, acao, quantidade, unidade=None):
+            """Rola a janela de linhas exibidas (barra de rolagem ou roda do mouse)."""
+            total = len(self._visao_log)
+            linhas = self._linhas_visiveis_log()
+            if acao == "moveto":
+                inicio = int(float(quantidade) * total)
+            else:
+                passo = linhas if unidade == "pages" else 1
+                inicio = self._inicio_log + int(quantidade) * passo
+            self._inicio_log = max(0, min(inicio, max(0, total - linhas)))
+            self._seguir_final_log = self._inicio_log >= total - linhas
+            self._renderizar_log()
+            return "break"
             
         def update_log_colors(self):
             """Atualiza as cores das tags de log de acordo com o tema atual."""
@@ -375,45 +4081,75 @@ def run_main_app():
             self.update_log_colors()
             self.log(f"Tema da interface alterado para '{selected_theme}'.", "INFO")
 
-        def log(self, mensagem, tipo="INFO"):
+        def log(self, mensagem, tipo="INFO", categoria=None, **campos):
             """
             Registra uma mensagem na área de log da GUI e no arquivo de log externo.
+            Campos numéricos adicionais (ex.: bytes=..., itens=...) vão para o registro JSONL.
             Retorna a mensagem formatada para fins de relatórios.
             """
-            agora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+            momento = datetime.now()
+            agora = momento.strftime("%d/%m/%Y %H:%M:%S")
             mensagem_formatada = f"[{agora}] [{tipo.upper()}] {mensagem}\n"
+            categoria = categoria or getattr(self._contexto_thread, 'categoria', None)
             
-            # A inserção na GUI é agendada para garantir que seja executada na thread principal
-            def _inserir_log():
-                self.log_text.insert(END, mensagem_formatada, tipo.upper())
-                self.log_text.see(END) # Rola automaticamente para o final
-            self.root.after(0, _inserir_log)
-            
-            # Escreve a mesma mensagem no arquivo de log
-            try:
-                with open(self.log_file_path, "a", encoding='utf-8') as f:
-                    f.write(mensagem_formatada)
-            except Exception as e:
-                print(f"ERRO: Não foi possível escrever no arquivo de log '{self.log_file_path}'. Detalhes: {e}")
+            # Registro estruturado (log JSONL e agente remoto)
+            registro = {
+                "ts": momento.isoformat(timespec='milliseconds'),
+                "run": self.run_id or self.sessao_id,
+                "tag": tipo.upper(),
+                "cat": categoria,
+                "msg": mensagem,
+            }
+            registro.update(campos)
+
+            # Tela, arquivos de log e agente recebem a mensagem em lote, pelo barramento de eventos
+            self.eventos.publicar(EVENTO_LOG, linha=mensagem_formatada, tag=tipo.upper(),
+                                  tarefa=campos.get("tarefa") or categoria, registro=registro)
             
             # Retorna a mensagem formatada
             return mensagem_formatada 
 
-        def process_log_queue(self):
-            """
-            Processa a fila de mensagens de log vindas de subprocessos em threads.
-            """
-            try:
-                while True: # Processa todas as mensagens atualmente na fila
-                    line, tag = self.log_queue.get_nowait()
-                    if line: # Adiciona a linha de log na GUI
-                        self.log_text.insert(END, line, tag)
-                        self.log_text.see(END)
-            except Empty:
-                pass # A fila está vazia, o que é normal
-            finally:
-                # Reagenda a verificação da fila para daqui a 100ms
-                self.root.after(100, self.process_log_queue)
+        def publicar_metrica(self, nome, **valores):
+            """Publica uma métrica nomeada no barramento de eventos (vai para o log JSONL e para o agente)."""
+            self.eventos.publicar(EVENTO_METRICA, nome=nome, run=self.run_id or self.sessao_id,
+                                  cat=getattr(self._contexto_thread, 'categoria', None), **valores)
+
+        def tratar_eventos(self, eventos):
+            """Aplica na interface (thread principal) um lote de eventos do barramento."""
+            for evento in eventos:
+                dados = evento.dados
+                if evento.tipo == EVENTO_LOG:
+                    if dados["linha"]:
+                        self.registrar_na_tela(dados["linha"], dados["tag"], dados.get("tarefa"), evento.momento)
+                elif evento.tipo == EVENTO_PROGRESSO:
+                    if dados.get("volume"):
+                        self.atualizar_progresso_volume(dados["tarefa"], dados["volume"], dados)
+                    elif dados.get("tarefa"):
+                        self.atualizar_progresso_tarefa(dados["tarefa"], dados)
+                    else:
+                        self.progress_bar.config(value=dados["percentual"])
+                        self.porcentagem_label.config(text=f"{int(dados['percentual'])}%")
+                elif evento.tipo == EVENTO_ESTADO_TAREFA:
+                    task_id = dados["tarefa"]
+                    if task_id == "limpeza":
+                        self.finalizar_limpeza(dados["total_opcoes"], dados["bytes"], dados["bytes_medidos"], dados["bytes_quarentena"])
+                    elif dados["estado"] == "executando":
+                        self.set_task_button_state(task_id, DISABLED)
+                        self.ocultar_progresso_tarefa(task_id)
+                        self.remover_indicadores_volumes(task_id)
+                        if dados.get("volumes"):
+                            self.criar_indicadores_volumes(task_id, dados["volumes"])
+                        if dados.get("estimativa"):
+                            self._atualizar_estimativa_tarefa(task_id)
+                    elif dados["estado"] == "volume_concluido":
+                        self.concluir_indicador_volume(task_id, dados["volume"], dados["codigo_saida"])
+                    else:
+                        indicadores = self.indicadores_volumes.get(task_id)
+                        if indicadores:
+                            indicadores["cancelar"].config(state=DISABLED)
+                        # Progresso ou contagem regressiva não ficam na tela depois do fim (o resultado vai para o log)
+                        self.ocultar_progresso_tarefa(task_id)
+                        self.set_task_button_state(task_id, NORMAL)
 
         def get_user_path(self, *args):
             """
@@ -425,7 +4161,7 @@ def run_main_app():
                 return None
             
             # Constrói o caminho base do perfil do usuário
-            user_profile = os.path.join(os.environ.get('SystemDrive', 'C:'), 'Users', user)
+            user_profile = PLATAFORMA.perfil_usuario(user)
             
             if not os.path.exists(user_profile):
                 self.log(f"O diretório de perfil para o usuário '{user}' não foi encontrado em '{user_profile}'.", "ERRO")
@@ -433,9 +4169,10 @@ def run_main_app():
                 
             return os.path.join(user_profile, *args)
 
-        def limpar_diretorio(self, dir_path, dir_name):
+        def limpar_diretorio(self, dir_path, dir_name, preservar=None):
             """
             Apaga de forma segura e recursiva todo o conteúdo de um diretório.
+            'preservar' (ex.: ProtecaoTemporarios) recebe o lstat de cada item e mantém os que recusar.
             """
             if self.limpeza_cancelada: return 0
             
@@ -444,8 +4181,17 @@ def run_main_app():
             if not dir_path or not os.path.exists(dir_path):
                 self.log(f"Diretório '{dir_name}' não encontrado ou caminho inválido. Ignorando.", "AVISO")
                 return 0
+            exclusoes = self.exclusoes
+            estado_exclusoes = exclusoes.estado_de(dir_path) if exclusoes else ()
+            if estado_exclusoes is None:
+                self.log(f"Diretório '{dir_name}' protegido por uma regra de exclusão. Ignorando.", "INFO")
+                return 0
+            retomada = self.retomada
+            if retomada and dir_path in retomada["diretorios"]:
+                self.log(f"Limpeza de '{dir_name}' já concluída na execução interrompida. Ignorando.", "INFO")
+                return 0
                 
-            espaco_liberado, excluidos, falhas = 0, 0, 0
+            espaco_liberado, em_quarentena_bytes, excluidos, falhas, preservados = 0, 0, 0, 0, 0
             
             try:
                 itens = os.listdir(dir_path)
@@ -458,88 +4204,252 @@ def run_main_app():
             except Exception as e:
                 self.log(f"Erro ao listar o diretório '{dir_name}'. Detalhes: {e}", "AVISO")
                 return 0
+            feitos = retomada["itens"].get(dir_path) if retomada else None
+            if feitos:
+                # Itens já tratados antes da interrupção (inclusive os preservados ou que falharam) não são revisitados
+                itens = [item for item in itens if item not in feitos]
+                self.log(f"Retomando a limpeza de '{dir_name}': {len(feitos)} itens já tratados na execução interrompida.", "INFO")
+
+            # Plano no diário antes de apagar; os itens tratados são registrados em lotes
+            self.diario.planejar_diretorio(dir_path, itens)
+            concluidos = []
+            def marcar_concluido(item):
+                concluidos.append(item)
+                if len(concluidos) >= DIARIO_LOTE_ITENS:
+                    self.diario.concluir_itens(dir_path, concluidos)
+                    concluidos.clear()
+
+            em_quarentena = self.var_quarentena.get()
+            acao = "movidos para a quarentena" if em_quarentena else "excluídos"
+            volume = volume_de(dir_path)
+            cancelado = lambda: self.limpeza_cancelada
+            self.limitador_io.aguardar(volume, operacoes=len(itens) or 1, cancelado=cancelado) # Custo da listagem
+            motor = MotorRemocao(cancelado=cancelado, limitador=self.limitador_io, volume=volume,
+                                 ponto_de_controle=self._ponto_de_controle, exclusoes=exclusoes, preservar=preservar)
 
             # Exclusão item por item para maior resiliência
             for item in itens:
+                self._ponto_de_controle()
                 if self.limpeza_cancelada: break
                 item_path = os.path.join(dir_path, item)
-                tamanho_estimado = 0
+                estado_item = exclusoes.avancar(estado_exclusoes, item) if estado_exclusoes else ()
+                if estado_item is None or eh_deposito_quarentena(item):
+                    preservados += 1
+                    marcar_concluido(item)
+                    continue
                 
                 try:
-                    try:
-                        tamanho_estimado = os.path.getsize(item_path)
-                    except Exception:
-                        pass
-
-                    if os.path.isfile(item_path) or os.path.islink(item_path):
-                        os.unlink(item_path)
-                    elif os.path.isdir(item_path):
-                        shutil.rmtree(item_path, ignore_errors=True) 
-                        
-                    espaco_liberado += tamanho_estimado
-                    excluidos += 1
+                    if em_quarentena:
+                        # Tamanho real da árvore (o de uma pasta seria ~0) é a base da retenção por tamanho;
+                        # com regras de exclusão abaixo do item, ele é movido entrada a entrada
+                        estatisticas = self.quarentena.mover_arvore(
+                            item_path, self.run_id, exclusoes, estado_item, cancelado,
+                            aguardar=lambda entradas: self.limitador_io.aguardar(volume, operacoes=entradas, cancelado=cancelado), # Só metadados: renomear não grava dados
+                            preservar=preservar)
+                        em_quarentena_bytes += estatisticas["bytes"]
+                        preservados += estatisticas["preservados"]
+                        if estatisticas["falhas"]:
+                            falhas += 1
+                        else:
+                            excluidos += 1
+                        marcar_concluido(item)
+                        continue
+
+                    # O motor cobra o limitador arquivo a arquivo e devolve os bytes realmente liberados
+                    estatisticas = motor.remover(item_path)
+                    espaco_liberado += estatisticas["bytes"]
+                    preservados += estatisticas["preservados"]
+                    # Uma pasta mantida por conter itens protegidos não é falha
+                    if estatisticas["falhas"] or (os.path.lexists(item_path) and not estatisticas["preservados"]):
+                        falhas += 1
+                    else:
+                        excluidos += 1
                 except Exception:
                     falhas += 1
+                marcar_concluido(item)
+
+            self.diario.concluir_itens(dir_path, concluidos)
+            if not self.limpeza_cancelada:
+                self.diario.concluir_diretorio(dir_path)
+            self._contabilizar(excluidos, falhas)
+            if preservados:
+                motivo = "por regras de exclusão ou por estarem em uso, recentes ou com outro dono" if preservar else "por regras de exclusão"
+                self.log(f"{preservados} itens de '{dir_name}' preservados {motivo}.", "INFO",
+                         diretorio=dir_name, preservados=preservados)
                     
+            if em_quarentena:
+                # Na quarentena os bytes continuam no disco: são relatados à parte, não como liberados
+                with self._lock_quarentena:
+                    self.espaco_em_quarentena += em_quarentena_bytes
+                resultado = f"{excluidos} itens {acao} ({self.formatar_espaco(em_quarentena_bytes)}, liberados só ao esvaziar a quarentena)."
+            else:
+                resultado = f"{excluidos} itens {acao}, liberando {self.formatar_espaco(espaco_liberado)}."
+            campos = dict(diretorio=dir_name, bytes=espaco_liberado, itens=excluidos, falhas=falhas)
+            if em_quarentena:
+                campos["bytes_quarentena"] = em_quarentena_bytes
             if falhas > 0:
-                self.log(f"Limpeza de '{dir_name}' concluída com {falhas} falhas. {excluidos} itens excluídos, liberando {self.formatar_espaco(espaco_liberado)}.", "AVISO")
+                self.log(f"Limpeza de '{dir_name}' concluída com {falhas} falhas. {resultado}", "AVISO", **campos)
             else:
-                self.log(f"Limpeza de '{dir_name}' concluída. {excluidos} itens excluídos, liberando {self.formatar_espaco(espaco_liberado)}.", "SUCESSO")
+                self.log(f"Limpeza de '{dir_name}' concluída. {resultado}", "SUCESSO", **campos)
             
             return espaco_liberado
 
         def get_available_drives(self):
-            """Retorna uma lista de letras de unidades de disco disponíveis no sistema."""
-            drives = []
-            for letter in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
-                drive = f"{letter}:\\"
-                if os.path.exists(drive):
-                    drives.append(f"{letter}:")
-            return drives
+            """Retorna uma lista de letras de unidades de disco disponíveis no sistema (do inventário em cache)."""
+            return sorted(self.inventario.unidades())
+
+        def atualizar_lista_unidades(self, inventario):
+            """Atualiza (na thread principal) as unidades do seletor quando o inventário muda."""
+            unidades = sorted(inventario)
+            opcoes = unidades + ["Todas"] if len(unidades) > 1 else unidades # Todas: por disco físico, em paralelo
+            if list(self.drive_combobox.cget('values')) == opcoes:
+                return
+            self.drive_combobox.config(values=opcoes)
+            self.limite_volume_combobox.config(values=["Todos"] + unidades)
+            # Define 'C:' como padrão se existir, senão o primeiro da lista
+            if self.drive_combobox.get() not in opcoes:
+                if 'C:' in unidades:
+                    self.drive_combobox.set('C:')
+                elif unidades:
+                    self.drive_combobox.set(unidades[0])
+                else:
+                    self.drive_combobox.set('')
+
+        # --- Limitador de I/O ---
+
+        def _exibir_limites_volume(self, event=None):
+            """Mostra nos campos os limites atuais do volume selecionado."""
+            volume = self.limite_volume_combobox.get()
+            operacoes, nbytes = self.limitador_io.limites(None if volume == "Todos" else volume)
+            for campo, valor in ((self.limite_operacoes, operacoes), (self.limite_mb, nbytes / 1024**2)):
+                campo.delete(0, END)
+                campo.insert(0, f"{valor:g}")
+
+        def aplicar_limite_io(self):
+            """Aplica imediatamente (inclusive durante uma limpeza) os limites informados na interface."""
+            try:
+                operacoes = float(self.limite_operacoes.get() or 0)
+                megabytes = float(self.limite_mb.get() or 0)
+                if operacoes < 0 or megabytes < 0:
+                    raise ValueError
+            except ValueError:
+                Messagebox.show_warning("Informe números não negativos para os limites de I/O.", "Aviso: Valor Inválido")
+                return
+            volume = self.limite_volume_combobox.get()
+            self.limitador_io.configurar(None if volume == "Todos" else volume, operacoes, megabytes * 1024**2)
+            descricao = "sem limite" if not (operacoes or megabytes) else f"{operacoes:g} operações/s, {megabytes:g} MB/s"
+            self.log(f"Limite de I/O para '{volume}' definido: {descricao}.", "INFO")
+
+        def relatar_metricas_limitador(self):
+            """Registra, por volume, quanto tempo a limpeza passou aguardando o limitador de I/O."""
+            for volume, metricas in sorted(self.limitador_io.consumir_metricas().items()):
+                if metricas["espera"] > 0:
+                    self.log(f"Limitador de I/O em {volume}: {metricas['espera']:.1f}s em espera para {metricas['operacoes']} operações "
+                             f"e {self.formatar_espaco(metricas['bytes'])}.", "INFO",
+                             volume=volume, espera_limitador=round(metricas["espera"], 3),
+                             operacoes=metricas["operacoes"], bytes_limitados=metricas["bytes"])
+
+        def medir_espaco_liberado(self, antes, depois):
+            """Registra o aumento real de espaço livre por volume entre dois inventários e retorna o total."""
+            total = 0
+            for unidade, (_, livre_antes) in sorted(antes.items()):
+                if unidade not in depois:
+                    continue
+                diferenca = depois[unidade][1] - livre_antes
+                if diferenca > 0:
+                    total += diferenca
+                    self.log(f"Volume {unidade}: espaço livre aumentou {self.formatar_espaco(diferenca)} (medido).", "INFO",
+                             volume=unidade, bytes_medidos=diferenca, livre=depois[unidade][1])
+            return total
 
         # --- Funções de Limpeza Específicas ---
 
         def limpar_lixeira(self):
-            """Esvazia a Lixeira do Windows usando uma chamada da API do sistema."""
+            """
+            Esvazia a Lixeira de cada volume em paralelo (uma pasta por SID em '$Recycle.Bin', ou as
+            pastas da lixeira XDG no Linux), medindo o espaço liberado. Se nenhuma pasta for
+            encontrada, usa a API do sistema (SHEmptyRecycleBinW) como alternativa.
+            """
             if self.limpeza_cancelada: return 0
             self.log("Iniciando esvaziamento da Lixeira...", "INFO")
+            perfil = self.get_user_path()
+            pastas = PLATAFORMA.pastas_lixeira(perfil, self.get_available_drives()) if perfil else []
+            if pastas:
+                return self._esvaziar_pastas_lixeira(pastas)
+            if not PLATAFORMA.lixeira_por_api:
+                self.log("Nenhuma pasta de lixeira encontrada. Ignorando.", "INFO")
+                return 0
+
             try:
-                # 7 = SHERB_NOCONFIRMATION | SHERB_NOPROGRESSUI | SHERB_NOSOUND
-                if ctypes.windll.shell32.SHEmptyRecycleBinW(None, None, 7) == 0: 
-                    self.log("Lixeira esvaziada com sucesso.", "SUCESSO")
-                else:
-                    self.log("Falha ao esvaziar a lixeira ou ela já estava vazia.", "AVISO")
+                tamanho = PLATAFORMA.tamanho_lixeira() # Medido antes, já que a API não informa o que liberou
+                if PLATAFORMA.esvaziar_lixeira(): 
+                    self.log(f"Lixeira esvaziada com sucesso, liberando {self.formatar_espaco(tamanho)}.", "SUCESSO", bytes=tamanho)
+                    return tamanho
+                self.log("Falha ao esvaziar a lixeira ou ela já estava vazia.", "AVISO")
             except Exception as e:
                 self.log(f"Erro inesperado ao tentar esvaziar a lixeira. Detalhes: {e}", "ERRO")
             return 0 
 
+        def _esvaziar_pastas_lixeira(self, pastas):
+            """Esvazia as pastas da lixeira com uma thread por volume e soma o espaço liberado."""
+            categoria = getattr(self._contexto_thread, 'categoria', None)
+
+            def esvaziar(nome, caminho):
+                # Cada thread tem os próprios contadores, somados aos da categoria no final
+                self._contexto_thread.categoria = categoria
+                self._contexto_thread.contadores = [0, 0]
+                try:
+                    return self.limpar_diretorio(caminho, nome), self._contexto_thread.contadores
+                finally:
+                    self._contexto_thread.categoria = None
+                    self._contexto_thread.contadores = None
+
+            total = 0
+            with ThreadPoolExecutor(max_workers=len(pastas)) as executor:
+                futuros = [executor.submit(esvaziar, nome, caminho) for nome, caminho in pastas]
+                for futuro in as_completed(futuros):
+                    try:
+                        liberado, (itens, falhas) = futuro.result()
+                    except Exception as e:
+                        self.log(f"Erro inesperado ao esvaziar a lixeira de um volume. Detalhes: {e}", "ERRO")
+                        continue
+                    total += liberado
+                    self._contabilizar(itens, falhas)
+            self.log(f"Lixeira esvaziada em {len(pastas)} pastas, liberando {self.formatar_espaco(total)}.", "SUCESSO", bytes=total)
+            return total
+
         def limpar_temp_usuarios(self):
             """Limpa a pasta de arquivos temporários do usuário."""
-            temp_path = self.get_user_path('AppData', 'Local', 'Temp')
-            return self.limpar_diretorio(temp_path, "Temp do Usuário")
+            perfil = self.get_user_path()
+            if not perfil:
+                return 0
+            total = 0
+            for nome, caminho in PLATAFORMA.temporarios_usuario(perfil):
+                if self.limpeza_cancelada: break
+                total += self.limpar_diretorio(caminho, nome)
+            return total
 
         def limpar_cache_navegadores(self):
             """Limpa o cache dos principais navegadores (Chrome, Edge, Firefox)."""
             if self.limpeza_cancelada: return 0
             total = 0
-            # Paths relativos ao perfil do usuário (App Data)
-            navegadores = {
-                "Google Chrome": ('AppData', 'Local', 'Google', 'Chrome', 'User Data', 'Default', 'Cache'),
-                "Microsoft Edge": ('AppData', 'Local', 'Microsoft', 'Edge', 'User Data', 'Default', 'Cache')
-            }
+            perfil = self.get_user_path()
+            if not perfil:
+                return 0
+            # Pastas de cache dentro do perfil do usuário (dependem da plataforma)
+            navegadores = PLATAFORMA.caches_navegadores(perfil)
             
             # --- Limpeza de Cache para Chrome/Edge ---
-            for nav, path_parts in navegadores.items():
+            for nav, full_path in navegadores.items():
                 if self.limpeza_cancelada: break
-                full_path = self.get_user_path(*path_parts)
-                if full_path and os.path.exists(full_path):
+                if os.path.exists(full_path):
                     total += self.limpar_diretorio(full_path, f"Cache do {nav}")
                 else:
                     self.log(f"Diretório de cache do {nav} não encontrado. Ignorando.", "INFO")
             
             # --- Limpeza de Cache para Firefox (mais complexa) ---
             if not self.limpeza_cancelada:
-                firefox_profiles_path = self.get_user_path('AppData', 'Local', 'Mozilla', 'Firefox', 'Profiles')
+                firefox_profiles_path = PLATAFORMA.perfis_firefox(perfil)
                 if firefox_profiles_path and os.path.exists(firefox_profiles_path):
                     self.log("Buscando diretórios de cache do Firefox...", "INFO")
                     try:
@@ -558,28 +4468,28 @@ def run_main_app():
             return total
 
         def limpar_locais_especificos(self):
-            """Limpa diretórios temporários do sistema, como Windows\Temp e Prefetch."""
+            """Limpa diretórios temporários do sistema, como Windows\\Temp e Prefetch (ou /tmp e /var/tmp)."""
             if self.limpeza_cancelada: return 0
             total = 0
-            windir = os.environ.get('windir', 'C:\\Windows')
-            locais = {
-                "Windows Temp": os.path.join(windir, 'Temp'),
-                "Prefetch": os.path.join(windir, 'Prefetch'),
-            }
-            for nome, caminho in locais.items():
+            protecao = PLATAFORMA.protecao_temporarios() # Só itens antigos, sem uso e do próprio usuário
+            for nome, caminho in PLATAFORMA.temporarios_sistema():
                 if self.limpeza_cancelada: break
-                total += self.limpar_diretorio(caminho, nome)
+                total += self.limpar_diretorio(caminho, nome, preservar=protecao)
             return total
             
         def limpeza_de_disco_windows_tool(self):
             """Executa a ferramenta nativa de Limpeza de Disco do Windows (cleanmgr.exe)."""
             if self.limpeza_cancelada: return 0
             self.log("Iniciando a Limpeza de Disco do Windows... Aguarde a ferramenta ser fechada.", "INFO")
+            comando = PLATAFORMA.comando_limpeza_disco()
+            if not comando:
+                self.log("A Limpeza de Disco do Windows não está disponível nesta plataforma. Ignorando.", "AVISO")
+                return 0
             self.log("Nota: As opções desta ferramenta devem ser pré-configuradas executando 'cleanmgr.exe /sageset:1' manualmente no terminal.", "AVISO")
             try:
                 self.processo_limpeza = subprocess.Popen(
-                    ['cleanmgr.exe', '/sagerun:1'], 
-                    creationflags=subprocess.CREATE_NEW_CONSOLE
+                    comando, 
+                    creationflags=PLATAFORMA.flags_nova_console
                 )
                 self.processo_limpeza.wait() # Aguarda o processo terminar
             except Exception as e:
@@ -591,18 +4501,175 @@ def run_main_app():
                 self.processo_limpeza = None
             return 0
 
+        def compactar_logs_antigos(self):
+            """
+            Compacta em paralelo (pool de processos) os arquivos de log antigos, sem apagá-los.
+            Retorna o espaço economizado (tamanho original - tamanho compactado).
+            """
+            if self.limpeza_cancelada: return 0
+            self.log("Procurando arquivos de log antigos para compactar...", "INFO")
+
+            arquivos = list(encontrar_logs_antigos(
+                LOGS_ANTIGOS_DIRETORIOS, LOGS_ANTIGOS_PADROES, LOGS_ANTIGOS_IDADE_DIAS,
+                LOGS_ANTIGOS_TAMANHO_MINIMO, cancelado=lambda: self.limpeza_cancelada, limitador=self.limitador_io,
+                exclusoes=self.exclusoes
+            ))
+            if not arquivos:
+                self.log("Nenhum arquivo de log antigo encontrado para compactar.", "INFO")
+                return 0
+
+            self.log(f"{len(arquivos)} arquivos de log encontrados. Compactando...", "INFO")
+            total_original, total_compactado, compactados, falhas = 0, 0, 0, 0
+            inicio = time.perf_counter()
+
+            processos = min(4, os.cpu_count() or 1)
+            fila = iter(arquivos)
+            # Compartilhados com os processos do pool: a pausa e o cancelamento valem também para os arquivos já enviados
+            liberado, cancelado = multiprocessing.Event(), multiprocessing.Event()
+            liberado.set()
+            with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo_compactacao,
+                                     initargs=(liberado, cancelado)) as executor:
+                # Janela limitada: só alguns arquivos por processo ficam enviados ao pool de cada vez
+                em_andamento = {executor.submit(comprimir_arquivo_log, caminho)
+                                for caminho in itertools.islice(fila, processos * LOGS_ANTIGOS_ARQUIVOS_POR_PROCESSO)}
+                while em_andamento:
+                    concluidos, em_andamento = wait(em_andamento, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        try:
+                            caminho, original, compactado, erro = futuro.result()
+                        except Exception as e:
+                            falhas += 1
+                            self.log(f"Falha em um processo de compactação. Detalhes: {e}", "AVISO")
+                            continue
+                        if erro:
+                            falhas += 1
+                            self.log(f"Não foi possível compactar '{caminho}'. Detalhes: {erro}", "AVISO")
+                        else:
+                            compactados += 1
+                            total_original += original
+                            total_compactado += compactado
+                    if not self.execucao_liberada.is_set():
+                        liberado.clear() # Os processos param no próximo bloco
+                        self._ponto_de_controle()
+                    if self.limpeza_cancelada:
+                        cancelado.set()
+                        for pendente in em_andamento:
+                            pendente.cancel()
+                        break
+                    liberado.set()
+                    for caminho in itertools.islice(fila, len(concluidos)):
+                        em_andamento.add(executor.submit(comprimir_arquivo_log, caminho))
+
+            self._contabilizar(compactados, falhas)
+
+            duracao = max(time.perf_counter() - inicio, 1e-6)
+            economizado = total_original - total_compactado
+            taxa = (total_compactado / total_original * 100) if total_original else 0
+            vazao = total_original / duracao
+            mensagem = (f"Compactação de logs concluída: {compactados} arquivos, "
+                        f"{self.formatar_espaco(total_original)} -> {self.formatar_espaco(total_compactado)} "
+                        f"(taxa {taxa:.1f}%, {self.formatar_espaco(vazao)}/s). "
+                        f"Espaço economizado: {self.formatar_espaco(economizado)}.")
+            self.log(mensagem if not falhas else f"{mensagem} {falhas} falhas.", "AVISO" if falhas else "SUCESSO",
+                     bytes=economizado, bytes_originais=total_original, bytes_compactados=total_compactado,
+                     itens=compactados, falhas=falhas, duracao=round(duracao, 3))
+            return economizado
+
+        def compactar_bancos_navegadores(self):
+            """
+            Compacta (VACUUM), em um pool limitado de threads, os bancos SQLite dos perfis dos navegadores
+            (histórico, favicons, cookies, formulários). Bancos em uso pelo navegador são ignorados.
+            Retorna o espaço recuperado.
+            """
+            if self.limpeza_cancelada: return 0
+            perfil = self.get_user_path()
+            if not perfil:
+                return 0
+            bancos = [(navegador, nome_perfil, caminho)
+                      for navegador, nome_perfil, caminho in encontrar_bancos_navegadores(PLATAFORMA.dados_navegadores(perfil))
+                      if not self.exclusoes.exclui(caminho)]
+            if not bancos:
+                self.log("Nenhum banco de dados de navegador encontrado para compactar.", "INFO")
+                return 0
+
+            self.log(f"{len(bancos)} bancos de dados de navegadores encontrados. Compactando (VACUUM)...", "INFO")
+            origem = {caminho: (navegador, nome_perfil) for navegador, nome_perfil, caminho in bancos}
+            total, compactados, em_uso, falhas = 0, 0, 0, 0
+            inicio = time.perf_counter()
+
+            with ThreadPoolExecutor(max_workers=BANCOS_NAVEGADORES_THREADS) as executor:
+                futuros = [executor.submit(compactar_banco_sqlite, caminho) for caminho in origem]
+                for futuro in as_completed(futuros):
+                    self._ponto_de_controle()
+                    if self.limpeza_cancelada:
+                        for pendente in futuros:
+                            pendente.cancel()
+                        break
+                    caminho, estado, antes, depois, detalhes = futuro.result()
+                    navegador, nome_perfil = origem[caminho]
+                    descricao = f"{navegador} ({nome_perfil}): {os.path.basename(caminho)}"
+                    if estado == "compactado":
+                        compactados += 1
+                        total += antes - depois
+                        self.log(f"{descricao}: {self.formatar_espaco(antes)} -> {self.formatar_espaco(depois)}.", "INFO",
+                                 bytes=antes - depois, bytes_originais=antes, bytes_compactados=depois)
+                    elif estado == "em_uso":
+                        em_uso += 1
+                        self.log(f"{descricao} está em uso (navegador aberto). Ignorado.", "INFO")
+                    else:
+                        falhas += 1
+                        motivo = "falhou na verificação de integridade" if estado == "corrompido" else "não pôde ser compactado"
+                        self.log(f"{descricao} {motivo}. Detalhes: {detalhes}", "AVISO")
+
+            self._contabilizar(compactados, falhas)
+
+            duracao = time.perf_counter() - inicio
+            mensagem = (f"Compactação dos bancos dos navegadores concluída: {compactados} bancos, "
+                        f"{self.formatar_espaco(total)} recuperados.")
+            if em_uso:
+                mensagem += f" {em_uso} em uso (feche o navegador para compactá-los)."
+            self.log(mensagem if not falhas else f"{mensagem} {falhas} falhas.", "AVISO" if falhas else "SUCESSO",
+                     bytes=total, itens=compactados, em_uso=em_uso, falhas=falhas, duracao=round(duracao, 3))
+            return total
+
         # --- Funções de Otimização e Reparo ---
 
         def run_long_task_in_thread(self, task_function, task_id):
             """
-            Inicia uma tarefa de longa duração em uma nova thread para não travar a GUI.
+            Inicia uma tarefa de longa duração sem travar a GUI (os comandos são conduzidos pelo orquestrador).
+            Retorna False se a tarefa já estiver em execução (e não foi iniciada de novo).
             """
             button = self.task_buttons.get(task_id)
-            if button and button['state'] == DISABLED:
+            if button and str(button['state']) == DISABLED:
                 self.log("Uma tarefa de otimização já está em execução. Por favor, aguarde a sua conclusão.", "AVISO")
-                return
+                return False
+            # Desativado já aqui: o evento "executando" só chega à tela no próximo lote do barramento
+            self.set_task_button_state(task_id, DISABLED)
+            with self._lock_tarefas:
+                self.tarefas_ativas.add(task_id)
             
-            threading.Thread(target=task_function, args=(task_id,), daemon=True).start()
+            # As tarefas apenas agendam os comandos no orquestrador e retornam imediatamente
+            try:
+                task_function(task_id)
+            except Exception as e:
+                self.log(f"Erro inesperado ao iniciar a tarefa '{task_id}'. Detalhes: {e!r}", "ERRO", tarefa=task_id)
+                self.concluir_tarefa(task_id, time.time(), -1)
+            return True
+
+        def vigiar_tarefa(self, futuro, task_id, inicio):
+            """
+            Acompanha o Future de uma tarefa conduzida pelo orquestrador: se ele terminar com uma
+            exceção (em um callback ou na própria corrotina), registra o erro e conclui a tarefa
+            com -1, para que o botão não fique desativado para sempre.
+            """
+            def verificar(futuro):
+                erro = "a tarefa foi cancelada" if futuro.cancelled() else futuro.exception()
+                if erro is None:
+                    return
+                self.log(f"Erro inesperado na tarefa '{task_id}'. Detalhes: {erro!r}", "ERRO", tarefa=task_id)
+                self.concluir_tarefa(task_id, inicio, -1)
+            futuro.add_done_callback(verificar)
+            return futuro
 
         def set_task_button_state(self, task_id, state):
             """Altera o estado (ativado/desativado) de um botão de tarefa."""
@@ -610,66 +4677,109 @@ def run_main_app():
             if button:
                 button.config(state=state)
 
-        def _stream_process_output(self, process, full_output):
-            """Lê o output de um subprocesso linha por linha e o envia para a fila de logs (ou armazena no buffer)."""
-            try:
-                for line in iter(process.stdout.readline, ''):
-                    if full_output is not None:
-                        full_output.append(line)
-                    else:
-                        self.log_queue.put((line, "CMD"))
-                process.stdout.close()
-            except Exception as e:
-                self.log_queue.put((f"Erro ao ler o output do processo. Detalhes: {e}\n", "ERRO"))
+        def concluir_tarefa(self, task_id, inicio, codigo_saida, registrar_historico=True):
+            """Registra o fim de uma tarefa: histórico, observadores (ex.: agente remoto) e reativação do botão."""
+            with self._lock_tarefas:
+                if task_id not in self.tarefas_ativas:
+                    return # Já concluída (ex.: um callback falhou depois de concluí-la)
+                self.tarefas_ativas.discard(task_id)
+            estado = self.estimativas_tarefa.pop(task_id, None) or {}
+            if self.historico and registrar_historico:
+                self.historico.registrar_tarefa(task_id, inicio, time.time(), codigo_saida,
+                                                estado.get("unidade"), estado.get("total"), estado.get("livre"))
+            for observador in list(self.observadores_tarefa):
+                try:
+                    observador(task_id, codigo_saida)
+                except Exception as e:
+                    print(f"AVISO: Falha em um observador da tarefa '{task_id}'. Detalhes: {e}")
+            self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="concluida", codigo_saida=codigo_saida)
+
+        def _stream_process_output(self, line, full_output, task_id=None, analisador=None):
+            """
+            Trata uma linha do output de um subprocesso: envia para a fila de logs (ou armazena no buffer circular).
+            Se houver um analisador de progresso, as linhas de percentual viram eventos de progresso da tarefa.
+            """
+            if analisador:
+                evento = analisador.alimentar(line)
+                if evento:
+                    estado = self.estimativas_tarefa.get(task_id)
+                    if estado:
+                        # Combina o ritmo observado com a duração prevista pelo histórico
+                        estado["ultimo_progresso"] = time.time()
+                        evento["eta_estimada"] = EstimadorDuracao.refinar(
+                            estado["duracao_prevista"], estado["ultimo_progresso"] - estado["inicio"],
+                            evento["percentual"], evento.get("eta"))
+                    self.eventos.publicar(EVENTO_PROGRESSO, chave=(EVENTO_PROGRESSO, task_id), tarefa=task_id, **evento)
+            if full_output is not None:
+                full_output.append(line)
+            else:
+                # Linhas de percentual consecutivas são mescladas no barramento (só a mais recente chega à tela)
+                chave = ("linha_progresso", task_id) if _RE_LINHA_PROGRESSO.search(line) else None
+                self.eventos.publicar(EVENTO_LOG, chave=chave, linha=line, tag="CMD", tarefa=task_id)
 
         def run_command_with_stream(self, command, task_id, start_msg, success_msg, error_msg, output_processor=None):
             """
             Executa um comando do sistema, captura seu output em tempo real e atualiza a GUI.
             Se 'output_processor' for fornecido, ele processa todo o output antes de logar.
+            O processo é conduzido pelo orquestrador (laço asyncio), sem thread própria.
             """
-            self.root.after(0, lambda: self.set_task_button_state(task_id, DISABLED))
-            self.log(start_msg, "INFO")
+            self.log(start_msg, "INFO", tarefa=task_id)
+            inicio = time.time()
             
-            full_output = [] if output_processor else None
-            
-            try:
-                use_shell = isinstance(command, str)
-
-                process = subprocess.Popen(
-                    command,
-                    shell=use_shell, 
-                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
-                    text=True, encoding=CMD_ENCODING, errors='ignore', 
-                    creationflags=subprocess.CREATE_NO_WINDOW,
-                    bufsize=1 # Line-buffered
-                )
+            full_output = None
+            if output_processor:
+                # Saída completa vai para um arquivo compactado; na memória, só as últimas linhas
+                try:
+                    full_output = BufferCircular(arquivo_despejo=arquivo_despejo_saida(task_id))
+                except OSError:
+                    full_output = BufferCircular()
+
+            self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="executando")
+            unidade = self.drive_combobox.get() if task_id == "desfragmentar_disco" else None # Widget: lido aqui, na thread da interface
+
+            def estimar():
+                # Histórico (SQLite) e espaço do disco: em segundo plano, sem atrasar a janela nem o laço
+                try:
+                    if self.iniciar_estimativa(task_id, unidade, inicio):
+                        self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="executando", estimativa=True)
+                except sqlite3.Error as e:
+                    self.log(f"Não foi possível estimar a duração da tarefa '{task_id}'. Detalhes: {e}", "AVISO", tarefa=task_id)
+
+            threading.Thread(target=estimar, daemon=True).start()
+            analisador = criar_analisador_progresso(command)
+
+            def ao_concluir(codigo_saida, erro):
+                """Chamada pelo orquestrador assim que o processo termina e toda a sua saída foi lida."""
+                if full_output is not None:
+                    full_output.fechar()
+                if erro is not None:
+                    self.log(f"Falha crítica ao tentar iniciar a tarefa '{task_id}'. Detalhes: {erro}", "ERRO")
+                    self.concluir_tarefa(task_id, inicio, -1)
+                    return
+
+                # --- NOVO: Garante o log do resultado da varredura ---
+                if output_processor and full_output:
+                    log_message, log_tag = output_processor(command, "\n".join(full_output.linhas()))
+                    self.log(log_message, log_tag, tarefa=task_id)
+                    if full_output.arquivo_despejo:
+                        self.log(f"Saída completa do comando ({full_output.total_linhas} linhas) salva em '{full_output.arquivo_despejo}'.", "INFO", tarefa=task_id)
+                    
+                # Log de resultado final (se não foi processado por um custom processor)
+                if codigo_saida == 0:
+                    if not output_processor:
+                        self.log(success_msg, "SUCESSO", tarefa=task_id, codigo_saida=0)
+                else:
+                    self.log(f"{error_msg}. Código de saída: {codigo_saida}", "ERRO", tarefa=task_id, codigo_saida=codigo_saida)
+                # --- FIM NOVO ---
                 
-                threading.Thread(target=self._stream_process_output, args=(process, full_output), daemon=True).start()
+                self.concluir_tarefa(task_id, inicio, codigo_saida)
 
-                def check_completion():
-                    if process.poll() is not None: # Processo terminou
-                        
-                        # --- NOVO: Garante o log do resultado da varredura ---
-                        if output_processor and full_output:
-                            log_message, log_tag = output_processor(command, "\n".join(full_output))
-                            self.log(log_message, log_tag)
-                            
-                        # Log de resultado final (se não foi processado por um custom processor)
-                        if process.returncode == 0:
-                            if not output_processor:
-                                self.log(success_msg, "SUCESSO")
-                        else:
-                            self.log(f"{error_msg}. Código de saída: {process.returncode}", "ERRO")
-                        # --- FIM NOVO ---
-                        
-                        self.root.after(0, lambda: self.set_task_button_state(task_id, NORMAL))
-                    else:
-                        self.root.after(200, check_completion)
-                        
-                self.root.after(200, check_completion)
-            except Exception as e:
-                self.log(f"Falha crítica ao tentar iniciar a tarefa '{task_id}'. Detalhes: {e}", "ERRO")
-                self.root.after(0, lambda: self.set_task_button_state(task_id, NORMAL))
+            return self.vigiar_tarefa(self.orquestrador.executar(
+                command,
+                lambda line: self._stream_process_output(line, full_output, task_id, analisador),
+                ao_concluir,
+                creationflags=PLATAFORMA.flags_sem_janela
+            ), task_id, inicio)
         
         # --- NOVO: PROCESSADOR DE LOG PARA DEFENDER E SFC/DISM ---
         def _processar_output_defender(self, command, raw_output):
@@ -757,7 +4867,7 @@ def run_main_app():
             
             if not defender_path:
                 self.log("ERRO: O executável do Microsoft Defender (MpCmdRun.exe) não foi encontrado.", "ERRO")
-                self.root.after(0, lambda: self.set_task_button_state(task_id, NORMAL))
+                self.concluir_tarefa(task_id, time.time(), -1)
                 return
 
             command = [defender_path, '-Scan', '-ScanType', '1', '-DisableRemediation'] 
@@ -787,7 +4897,10 @@ def run_main_app():
             selected_drive = self.drive_combobox.get()
             if not selected_drive:
                 self.log("Nenhum disco selecionado para desfragmentação.", "ERRO")
-                self.root.after(0, lambda: self.set_task_button_state(task_id, NORMAL))
+                self.concluir_tarefa(task_id, time.time(), -1)
+                return
+            if selected_drive == "Todas":
+                self.executar_em_todos_volumes(task_id, lambda volume: ['defrag', volume, '/U', '/V'], "Otimização")
                 return
             
             command = ['defrag', selected_drive, '/U', '/V'] # /U: progresso, /V: verbose
@@ -819,70 +4932,174 @@ def run_main_app():
             )
             
         def executar_chkdsk(self, task_id):
-            """Agenda a verificação de disco (CHKDSK) para a próxima reinicialização, automaticamente."""
+            """Agenda a verificação de disco (CHKDSK) da unidade selecionada (ou de todas) para a próxima reinicialização."""
+            unidade = self.drive_combobox.get() or os.environ.get('SystemDrive', 'C:')
+            if unidade == "Todas":
+                self.executar_em_todos_volumes(task_id, lambda volume: ['fsutil', 'dirty', 'set', volume], "Agendamento do CHKDSK")
+                return
             
             self.run_command_with_stream(
-                ['fsutil', 'dirty', 'set', 'C:'], task_id,
-                "Agendando verificação de disco (CHKDSK) para a unidade C: automaticamente...",
-                "CHKDSK agendado com sucesso para a próxima reinicialização.",
-                "Falha ao agendar o CHKDSK."
+                ['fsutil', 'dirty', 'set', unidade], task_id,
+                f"Agendando verificação de disco (CHKDSK) para a unidade {unidade} automaticamente...",
+                f"CHKDSK da unidade {unidade} agendado com sucesso para a próxima reinicialização.",
+                f"Falha ao agendar o CHKDSK da unidade {unidade}."
             )
+
+        def executar_em_todos_volumes(self, task_id, comando_do_volume, operacao):
+            """
+            Executa uma tarefa de manutenção em todas as unidades locais, conduzida pelo orquestrador:
+            unidades em discos físicos diferentes ao mesmo tempo e as que dividem um disco uma após
+            a outra. Cada unidade tem o seu progresso e resultado; um único cancelamento vale para todas.
+            """
+            volumes = PLATAFORMA.volumes_fixos(self.get_available_drives())
+            if not volumes:
+                self.log(f"{operacao}: nenhuma unidade local encontrada.", "ERRO", tarefa=task_id)
+                self.concluir_tarefa(task_id, time.time(), -1)
+                return
+            controle = {"cancelado": False, "processos": []}
+            self.manutencao_volumes[task_id] = controle
+            self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="executando", volumes=volumes)
+            inicio = time.time()
+            resultados = {}
+
+            async def conduzir_volume(volume):
+                comando = comando_do_volume(volume)
+                analisador = criar_analisador_progresso(comando)
+                processo = {}
+                controle["processos"].append(processo)
+
+                def ao_receber_linha(linha):
+                    evento = analisador.alimentar(linha) if analisador else None
+                    if evento:
+                        self.eventos.publicar(EVENTO_PROGRESSO, chave=(EVENTO_PROGRESSO, task_id, volume), tarefa=task_id, volume=volume, **evento)
+                    chave = ("linha_progresso", task_id, volume) if _RE_LINHA_PROGRESSO.search(linha) else None
+                    self.eventos.publicar(EVENTO_LOG, chave=chave, linha=f"[{volume}] {linha}", tag="CMD", tarefa=task_id)
+
+                self.log(f"{operacao} da unidade {volume} iniciada.", "INFO", tarefa=task_id, volume=volume)
+                inicio_volume = time.time()
+                try:
+                    codigo = await self.orquestrador.conduzir(comando, ao_receber_linha, processo, creationflags=PLATAFORMA.flags_sem_janela)
+                except Exception as e:
+                    self.log(f"Falha ao iniciar: {operacao.lower()} da unidade {volume}. Detalhes: {e}", "ERRO", tarefa=task_id, volume=volume)
+                    codigo = -1
+                finally:
+                    controle["processos"].remove(processo)
+                fim = time.time()
+                resultados[volume] = codigo
+                if self.historico and codigo != -1:
+                    # Cada unidade é uma amostra para a estimativa de duração (com o espaço dela); disk_usage fora do laço
+                    _, total, livre = await asyncio.get_running_loop().run_in_executor(None, caracteristicas_unidade, volume)
+                    self.historico.registrar_tarefa(task_id, inicio_volume, fim, codigo, volume, total, livre)
+                if controle["cancelado"]:
+                    self.log(f"{operacao} da unidade {volume} interrompida pelo cancelamento.", "AVISO", tarefa=task_id, volume=volume, codigo_saida=codigo)
+                elif codigo == 0:
+                    self.log(f"{operacao} da unidade {volume} concluída em {self.formatar_duracao(fim - inicio_volume)}.", "SUCESSO",
+                             tarefa=task_id, volume=volume, codigo_saida=0, duracao=round(fim - inicio_volume, 1))
+                else:
+                    self.log(f"{operacao} da unidade {volume} falhou. Código de saída: {codigo}", "ERRO",
+                             tarefa=task_id, volume=volume, codigo_saida=codigo, duracao=round(fim - inicio_volume, 1))
+                self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="volume_concluido", volume=volume,
+                                      codigo_saida=None if controle["cancelado"] else codigo)
+
+            async def conduzir_grupo(grupo):
+                for volume in grupo: # Mesmo disco físico: uma unidade de cada vez
+                    if controle["cancelado"]:
+                        self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="volume_concluido", volume=volume, codigo_saida=None)
+                        continue
+                    await conduzir_volume(volume)
+
+            async def conduzir_todos():
+                discos = await asyncio.get_running_loop().run_in_executor(None, PLATAFORMA.discos_dos_volumes, volumes)
+                grupos = agrupar_volumes_por_disco(discos)
+                if len(grupos) > 1:
+                    descricao = "; ".join(f"{', '.join(grupo)} (disco {', '.join(map(str, sorted({d for v in grupo for d in discos[v]})))})" for grupo in grupos)
+                    self.log(f"{operacao} de {len(volumes)} unidades em {len(grupos)} discos físicos, em paralelo: {descricao}.", "INFO", tarefa=task_id)
+                elif any(discos[volume] is None for volume in volumes):
+                    self.log(f"Não foi possível identificar o disco físico de todas as unidades. {operacao} em sequência.", "AVISO", tarefa=task_id)
+                else:
+                    self.log(f"Todas as unidades estão no mesmo disco físico. {operacao} em sequência.", "INFO", tarefa=task_id)
+                await asyncio.gather(*(conduzir_grupo(grupo) for grupo in grupos))
+
+                self.manutencao_volumes.pop(task_id, None)
+                concluidas = [v for v, codigo in resultados.items() if codigo == 0]
+                falhas = [v for v, codigo in resultados.items() if codigo != 0]
+                resumo = f"{operacao} em todas as unidades: {len(concluidas)} de {len(volumes)} concluídas"
+                resumo += f"; falhas em {', '.join(falhas)}." if falhas else "."
+                if controle["cancelado"]:
+                    resumo += " Cancelada pelo usuário."
+                self.log(resumo, "SUCESSO" if len(concluidas) == len(volumes) else "AVISO", tarefa=task_id,
+                         itens=len(concluidas), falhas=len(falhas), duracao=round(time.time() - inicio, 1))
+                self.concluir_tarefa(task_id, inicio, 0 if len(concluidas) == len(volumes) else 1, registrar_historico=False)
+
+            self.vigiar_tarefa(self.orquestrador.submeter(conduzir_todos()), task_id, inicio)
+
+        def cancelar_manutencao_volumes(self, task_id):
+            """Cancela de uma vez a tarefa em todas as unidades: termina as em andamento e descarta as da fila."""
+            controle = self.manutencao_volumes.get(task_id)
+            if not controle or controle["cancelado"]:
+                return
+            controle["cancelado"] = True
+            for processo in list(controle["processos"]):
+                self.orquestrador.terminar(processo)
+            self.log("Cancelamento solicitado para todas as unidades.", "AVISO", tarefa=task_id)
             
         def corrigir_windows_update(self, task_id):
             """Executa uma sequência de comandos para tentar corrigir o Windows Update, automaticamente."""
             
-            self.root.after(0, lambda: self.set_task_button_state(task_id, DISABLED)) # Desativa o botão na thread principal
+            self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="executando") # Desativa o botão na thread principal
+
+            commands = [
+                ("net stop wuauserv", "Parando o serviço do Windows Update (wuauserv)..."),
+                ("net stop bits", "Parando o Serviço de Transferência Inteligente (BITS)..."),
+                (f"ren \"{os.path.join(os.environ['windir'], 'SoftwareDistribution')}\" SoftwareDistribution.old", "Renomeando a pasta de distribuição de software..."),
+                ("net start wuauserv", "Iniciando o serviço do Windows Update (wuauserv)..."),
+                ("net start bits", "Iniciando o Serviço de Transferência Inteligente (BITS)...")
+            ]
 
-            def run_update_repair():
-                """Sequência de comandos que será executada na thread secundária."""
+            async def run_update_repair():
+                """Sequência de comandos executada no laço do orquestrador (sem thread própria)."""
                 self.log("Iniciando reparo automático dos componentes do Windows Update...", "INFO")
                 
-                ENCODING = CMD_ENCODING
-                
-                commands = [
-                    ("net stop wuauserv", "Parando o serviço do Windows Update (wuauserv)..."),
-                    ("net stop bits", "Parando o Serviço de Transferência Inteligente (BITS)..."),
-                    (f"ren \"{os.path.join(os.environ['windir'], 'SoftwareDistribution')}\" SoftwareDistribution.old", "Renomeando a pasta de distribuição de software..."),
-                    ("net start wuauserv", "Iniciando o serviço do Windows Update (wuauserv)..."),
-                    ("net start bits", "Iniciando o Serviço de Transferência Inteligente (BITS)...")
-                ]
-                
                 success = True
+                laco = asyncio.get_running_loop()
+                # Consulta ao histórico (SQLite) e ao disco: fora do laço compartilhado pelos comandos
+                if await laco.run_in_executor(None, self.iniciar_estimativa, task_id, None, inicio):
+                    self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa=task_id, estado="executando", estimativa=True)
                 for cmd, msg in commands:
                     self.log(msg, "INFO")
                     try:
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding=ENCODING, timeout=60, creationflags=subprocess.CREATE_NO_WINDOW)
+                        returncode, stdout, stderr = await self.orquestrador.capturar(cmd, tempo_limite=60, creationflags=PLATAFORMA.flags_sem_janela)
                         
-                        if result.stdout:
-                             self.log_queue.put((f"CMD Out: {result.stdout.strip()}\n", "CMD"))
-                        if result.stderr:
-                             self.log_queue.put((f"CMD Err: {result.stderr.strip()}\n", "ERRO"))
+                        if stdout.strip():
+                             self.eventos.publicar(EVENTO_LOG, linha=f"CMD Out: {stdout.strip()}\n", tag="CMD", tarefa="win_update")
+                        if stderr.strip():
+                             self.eventos.publicar(EVENTO_LOG, linha=f"CMD Err: {stderr.strip()}\n", tag="ERRO", tarefa="win_update")
                              
                         ignorable_errors = ["não foi iniciado", "not started", "already been stopped", "código de erro 1060", "error code 1060", "código de erro 1056", "error code 1056"]
-                        full_output = (result.stdout or "") + (result.stderr or "")
+                        full_output = stdout + stderr
                         
-                        if result.returncode != 0 and not any(err in full_output.lower() for err in ignorable_errors):
-                            self.log(f"Falha na execução do comando '{cmd}'. Código: {result.returncode}", "ERRO")
+                        if returncode != 0 and not any(err in full_output.lower() for err in ignorable_errors):
+                            self.log(f"Falha na execução do comando '{cmd}'. Código: {returncode}", "ERRO")
                             success = False; break
                         
                     except Exception as e:
-                        self.log(f"Erro crítico ao executar o comando '{cmd}'. Detalhes: {e}", "ERRO")
+                        self.log(f"Erro crítico ao executar o comando '{cmd}'. Detalhes: {e or type(e).__name__}", "ERRO")
                         success = False; break
                         
                 if success:
                     self.log("Reparo do Windows Update concluído com sucesso!", "SUCESSO")
                 else:
                     self.log("O processo de reparo do Windows Update encontrou um erro e foi interrompido.", "ERRO")
-                    
-                self.root.after(0, lambda: self.set_task_button_state(task_id, NORMAL))
+                await laco.run_in_executor(None, self.concluir_tarefa, task_id, inicio, 0 if success else 1)
                 
-            threading.Thread(target=run_update_repair, daemon=True).start()
+            inicio = time.time()
+            self.vigiar_tarefa(self.orquestrador.submeter(run_update_repair()), task_id, inicio)
 
         def abrir_protecao_sistema(self):
             """Abre a janela de propriedades de Proteção do Sistema do Windows."""
             self.log("Abrindo a janela de Proteção do Sistema...", "INFO")
             try:
-                subprocess.Popen(["SystemPropertiesProtection.exe"], creationflags=subprocess.CREATE_NO_WINDOW)
+                subprocess.Popen(["SystemPropertiesProtection.exe"], creationflags=PLATAFORMA.flags_sem_janela)
             except Exception as e:
                 self.log(f"Não foi possível abrir a Proteção do Sistema. Detalhes: {e}", "ERRO")
 
@@ -906,8 +5123,8 @@ def run_main_app():
             for var in self.vars.values():
                 var.set(False)
 
-        def executar_limpeza_thread(self):
-            """Prepara e inicia o processo de limpeza em uma nova thread."""
+        def executar_limpeza_thread(self, retomada=None):
+            """Prepara e inicia o processo de limpeza em uma nova thread (ou retoma uma execução interrompida)."""
             if not self.entry_usuario.get().strip():
                 Messagebox.show_warning("O nome do usuário é obrigatório para continuar.", "Aviso: Usuário Inválido")
                 return
@@ -916,6 +5133,8 @@ def run_main_app():
                 return
 
             self.limpeza_cancelada = False
+            self.retomada = retomada
+            self.run_id = retomada["run"] if retomada else datetime.now().strftime("%Y%m%d-%H%M%S")
             self.botao_executar.config(state=DISABLED)
             self.botao_cancelar.config(state=NORMAL)
             
@@ -924,67 +5143,163 @@ def run_main_app():
             self.progress_bar["value"] = 0
             self.porcentagem_label.config(text="0%")
             
-            self.log_text.delete('1.0', END)
-            self.log("--- INÍCIO DA ROTINA DE LIMPEZA ---", "INFO")
+            self.limpar_tela_log()
+            self.log("--- RETOMADA DA ROTINA DE LIMPEZA ---" if retomada else "--- INÍCIO DA ROTINA DE LIMPEZA ---", "INFO")
             
             total_opcoes = sum(v.get() for k, v in self.vars.items() if k != 'reiniciar')
             threading.Thread(target=self.executar_limpeza_em_background, args=(total_opcoes,), daemon=True).start()
 
-        def executar_limpeza_em_background(self, total_opcoes):
+        def verificar_execucao_interrompida(self):
+            """Se o diário indicar uma limpeza interrompida (queda, reinício, processo encerrado), oferece retomá-la."""
+            estado = self.diario.pendente()
+            if not estado:
+                return
+            if self.diario.em_andamento():
+                # Não foi interrompida: outra instância (ex.: o modo serviço) ainda está executando-a
+                self.log(f"A limpeza '{estado['run']}' está em andamento em outra instância do aplicativo.", "INFO", run_em_andamento=estado['run'])
+                return
+            categorias = [c for c in estado["categorias"] if c in self.vars]
+            resumo = (f"A limpeza '{estado['run']}' foi interrompida: {len(estado['concluidas'])} de {len(categorias)} categorias "
+                      f"e {len(estado['diretorios'])} diretórios já concluídos.")
+            self.log(resumo, "AVISO", run_interrompida=estado['run'])
+            confirmado = Messagebox.yesno(f"{resumo}\nDeseja retomá-la de onde parou?", "Limpeza Interrompida")
+            if self.diario.em_andamento():
+                # Outra instância começou a executá-la enquanto a pergunta estava aberta
+                self.log(f"A limpeza '{estado['run']}' foi retomada por outra instância do aplicativo.", "INFO")
+                return
+            if not (confirmado and confirmado.lower() in ("yes", "sim")):
+                self.diario.encerrar(estado["run"], descartada=True)
+                return
+
+            # Restaura as opções da execução interrompida e a retoma
+            for key, var in self.vars.items():
+                if key != 'reiniciar':
+                    var.set(key in categorias)
+            self.var_quarentena.set(bool(estado["opcoes"].get("quarentena")))
+            if estado["opcoes"].get("usuario"):
+                self.entry_usuario.delete(0, END)
+                self.entry_usuario.insert(0, estado["opcoes"]["usuario"])
+            self.executar_limpeza_thread(retomada=estado)
+
+        def categorias_de_limpeza(self):
+            """Retorna as funções de cada categoria de limpeza, na ordem de execução."""
+            return {
+                "lixeira": self.limpar_lixeira, "temp_usuarios": self.limpar_temp_usuarios,
+                "cache_navegadores": self.limpar_cache_navegadores, "bancos_navegadores": self.compactar_bancos_navegadores,
+                "locais_especificos": self.limpar_locais_especificos,
+                "limpeza_disco": self.limpeza_de_disco_windows_tool, "compactar_logs": self.compactar_logs_antigos,
+            }
+
+        def executar_categorias(self, chaves):
             """
-            Executa a sequência de tarefas de limpeza selecionadas.
-            Esta função é executada em uma thread separada.
+            Executa, em ordem, as categorias de limpeza indicadas e registra o histórico.
+            Retorna (espaço liberado estimado, aumento de espaço livre medido nos volumes,
+            bytes movidos para a quarentena).
             """
-            espaco_liberado_total = 0
+            if not self._lock_limpeza.acquire(blocking=False):
+                self.log("Já existe uma rotina de limpeza em andamento. Aguarde a sua conclusão.", "AVISO")
+                return 0, 0, 0
+            try:
+                return self._executar_categorias(chaves)
+            finally:
+                self._lock_limpeza.release()
+
+        def _executar_categorias(self, chaves):
+            retomada = self.retomada
+            espaco_liberado_total = retomada["bytes"] if retomada else 0
+            falhas_total = 0
             progresso = 0
-            tarefas = {
-                "lixeira": self.limpar_lixeira, "temp_usuarios": self.limpar_temp_usuarios,
-                "cache_navegadores": self.limpar_cache_navegadores, "locais_especificos": self.limpar_locais_especificos,
-                "limpeza_disco": self.limpeza_de_disco_windows_tool,
-            }
+            inicio_execucao = time.time()
+            self.espaco_em_quarentena = 0
+            espaco_antes = self.inventario.atualizar()
+            self.diario.iniciar(self.run_id, chaves, retomada=bool(retomada),
+                                quarentena=self.var_quarentena.get(), usuario=self.entry_usuario.get().strip())
             
-            for key, func in tarefas.items():
+            for key, func in self.categorias_de_limpeza().items():
+                self._ponto_de_controle()
                 if self.limpeza_cancelada:
                     self.log("Operação de limpeza cancelada pelo usuário.", "AVISO")
                     break
                 
-                if self.vars[key].get():
-                    espaco_liberado_total += func()
+                if key in chaves and retomada and key in retomada["concluidas"]:
+                    self.log(f"Categoria '{key}' já concluída na execução interrompida. Ignorando.", "INFO")
                     progresso += 1
-                    self.atualizar_barra_progresso(progresso, total_opcoes)
-            
-            def finalizacao_gui():
-                self.progress_bar.stop()
+                    self.atualizar_barra_progresso(progresso, len(chaves))
+                elif key in chaves:
+                    self._contexto_thread.categoria = key
+                    self._contexto_thread.contadores = [0, 0] # [itens, falhas]
+                    inicio_categoria = time.time()
+                    liberado = func()
+                    espaco_liberado_total += liberado
+                    itens, falhas = self._contexto_thread.contadores
+                    falhas_total += falhas
+                    duracao_categoria = time.time() - inicio_categoria
+                    if self.historico:
+                        self.historico.registrar_categoria(self.run_id, key, inicio_categoria, liberado, itens, falhas, duracao_categoria)
+                    self.publicar_metrica("categoria", bytes=liberado, itens=itens, falhas=falhas, duracao=round(duracao_categoria, 3))
+                    if not self.limpeza_cancelada:
+                        self.diario.concluir_categoria(key, liberado)
+                    self._contexto_thread.categoria = None
+                    self._contexto_thread.contadores = None
+                    progresso += 1
+                    self.atualizar_barra_progresso(progresso, len(chaves))
 
-                if self.limpeza_cancelada:
-                    self.log("Limpeza interrompida. Revertendo estado da interface.", "AVISO")
-                    self.progress_bar["value"] = 0
-                    self.porcentagem_label.config(text="Cancelado")
-                    self.botao_executar.config(state=NORMAL)
-                    self.botao_cancelar.config(state=DISABLED)
-                    return 
+            self.aplicar_retencao_quarentena()
+            self.relatar_metricas_limitador()
+            self.publicar_metrica("barramento_eventos", acordadas_interface=self.consumidor_interface.acordadas, **self.eventos.estatisticas())
+            espaco_medido = self.medir_espaco_liberado(espaco_antes, self.inventario.atualizar())
+            if self.historico:
+                self.historico.registrar_execucao(self.run_id, inicio_execucao, time.time(), espaco_liberado_total, falhas_total, self.limpeza_cancelada)
+            self.diario.encerrar(self.run_id, bytes=espaco_liberado_total, cancelada=self.limpeza_cancelada)
+            self.retomada = None
+            return espaco_liberado_total, espaco_medido, self.espaco_em_quarentena
 
-                if total_opcoes > 0:
-                    self.progress_bar["value"] = 100
-                    self.porcentagem_label.config(text="100%")
-                else:
-                    self.log("Nenhuma tarefa de limpeza foi selecionada ou executada.", "AVISO")
-                    
-                relatorio = f"Espaço total liberado (estimado): {self.formatar_espaco(espaco_liberado_total)}"
-                self.log("--- ROTINA DE LIMPEZA CONCLUÍDA ---", "INFO")
-                self.log(relatorio, "SUCESSO")
-                Messagebox.show_info(f"Limpeza finalizada com sucesso!\n{relatorio}", "Concluído")
-                
-                deve_reiniciar = self.vars['reiniciar'].get()
-                self.log(f"Verificando a opção de reinicialização. Selecionada: {deve_reiniciar}", "INFO")
+        def executar_limpeza_em_background(self, total_opcoes):
+            """
+            Executa a sequência de tarefas de limpeza selecionadas.
+            Esta função é executada em uma thread separada.
+            """
+            chaves = [key for key in self.categorias_de_limpeza() if self.vars[key].get()]
+            espaco_liberado_total, espaco_medido, espaco_quarentena = self.executar_categorias(chaves)
+            # Pelo barramento, a finalização chega à tela depois dos últimos logs e progressos da rotina
+            self.eventos.publicar(EVENTO_ESTADO_TAREFA, tarefa="limpeza", estado="concluida", total_opcoes=total_opcoes,
+                                  bytes=espaco_liberado_total, bytes_medidos=espaco_medido, bytes_quarentena=espaco_quarentena,
+                                  cancelada=self.limpeza_cancelada)
 
-                if deve_reiniciar:
-                    self.reiniciar_sistema()
-                else:
-                    self.botao_executar.config(state=NORMAL)
-                    self.botao_cancelar.config(state=DISABLED)
+        def finalizar_limpeza(self, total_opcoes, espaco_liberado_total, espaco_medido, espaco_quarentena=0):
+            """Atualiza a interface ao fim da rotina de limpeza (thread principal)."""
+            self.progress_bar.stop()
+
+            if self.limpeza_cancelada:
+                self.log("Limpeza interrompida. Revertendo estado da interface.", "AVISO")
+                self.progress_bar["value"] = 0
+                self.porcentagem_label.config(text="Cancelado")
+                self.botao_executar.config(state=NORMAL)
+                self.botao_cancelar.config(state=DISABLED)
+                return 
+
+            if total_opcoes > 0:
+                self.progress_bar["value"] = 100
+                self.porcentagem_label.config(text="100%")
+            else:
+                self.log("Nenhuma tarefa de limpeza foi selecionada ou executada.", "AVISO")
+
+            relatorio = (f"Espaço total liberado (estimado): {self.formatar_espaco(espaco_liberado_total)}\n"
+                         f"Aumento de espaço livre nos volumes (medido): {self.formatar_espaco(espaco_medido)}")
+            if espaco_quarentena:
+                relatorio += f"\nMovido para a quarentena (liberado ao esvaziá-la): {self.formatar_espaco(espaco_quarentena)}"
+            self.log("--- ROTINA DE LIMPEZA CONCLUÍDA ---", "INFO")
+            self.log(relatorio, "SUCESSO", bytes=espaco_liberado_total, bytes_medidos=espaco_medido, bytes_quarentena=espaco_quarentena)
+            Messagebox.show_info(f"Limpeza finalizada com sucesso!\n{relatorio}", "Concluído")
+
+            deve_reiniciar = self.vars['reiniciar'].get()
+            self.log(f"Verificando a opção de reinicialização. Selecionada: {deve_reiniciar}", "INFO")
 
-            self.root.after(0, finalizacao_gui)
+            if deve_reiniciar:
+                self.reiniciar_sistema()
+            else:
+                self.botao_executar.config(state=NORMAL)
+                self.botao_cancelar.config(state=DISABLED)
 
         def cancelar_limpeza(self):
             """Sinaliza o cancelamento da limpeza e tenta parar processos externos."""
@@ -1002,20 +5317,378 @@ def run_main_app():
             """Atualiza o valor da barra de progresso e o rótulo de porcentagem."""
             if total > 0:
                 valor = (progresso / total) * 100
-                self.root.after(0, lambda: self.progress_bar.config(value=valor))
-                self.root.after(0, lambda: self.porcentagem_label.config(text=f"{int(valor)}%"))
+                self.eventos.publicar(EVENTO_PROGRESSO, chave=(EVENTO_PROGRESSO, "limpeza"), run=self.run_id, percentual=valor)
+
+        def _ponto_de_controle(self):
+            """Ponto seguro de pausa: bloqueia enquanto a execução estiver pausada (ou até o cancelamento)."""
+            while not self.execucao_liberada.wait(0.5):
+                if self.limpeza_cancelada:
+                    return
+
+        # --- Modo Serviço (Manutenção Automática) ---
+
+        def iniciar_servico_manutencao(self, categorias, intervalo_horas=SERVICO_INTERVALO_HORAS, monitor=None):
+            """
+            Executa as categorias indicadas periodicamente, somente com o sistema ocioso.
+            Quando o sistema volta a ser usado, a limpeza é pausada no próximo ponto seguro
+            e retomada quando ele fica ocioso de novo.
+            """
+            self.modo_servico = True
+            monitor = monitor or MonitorOciosidade()
+            arquivo_ultima = os.path.join(diretorio_dados_app(), "servico_ultima_execucao.txt")
+
+            def ultima_execucao():
+                try:
+                    with open(arquivo_ultima, encoding='utf-8') as f:
+                        return float(f.read().strip())
+                except (OSError, ValueError):
+                    return 0.0
+
+            def executar(chaves, resultado):
+                # Roda com a trava de limpeza já obtida pelo ciclo; o estado da execução é limpo antes de soltá-la
+                try:
+                    self._executar_categorias(chaves)
+                    resultado["ok"] = True
+                except Exception as e:
+                    self.log(f"Erro durante a manutenção automática: {e}", "ERRO")
+                finally:
+                    self.retomada = self.run_id = None
+                    self._lock_limpeza.release()
+
+            def ciclo():
+                self.log(f"Modo serviço iniciado. Categorias: {', '.join(categorias)}; intervalo: {intervalo_horas}h.", "INFO")
+                # Execução interrompida: retomada assim que o sistema estiver ocioso (se não estiver em andamento na janela)
+                retomada = self.diario.pendente() if not self.diario.em_andamento() else None
+                if retomada:
+                    self.log(f"A manutenção '{retomada['run']}' foi interrompida e será retomada.", "AVISO")
+                aguardando_trava = False
+                while True:
+                    try:
+                        retomada, aguardando_trava = iteracao(retomada, aguardando_trava)
+                    except Exception as e:
+                        # Um erro numa passada não pode encerrar o serviço (a thread morreria em silêncio)
+                        self.log(f"Erro no ciclo do modo serviço: {e}", "ERRO")
+                        time.sleep(SERVICO_VERIFICACAO)
+
+            def iteracao(retomada, aguardando_trava):
+                """Uma passada do ciclo; retorna a retomada ainda pendente e se está à espera de outra rotina."""
+                espera = ultima_execucao() + intervalo_horas * 3600 - time.time()
+                if espera > 0 and not retomada:
+                    time.sleep(min(espera, SERVICO_VERIFICACAO * 4))
+                    return retomada, aguardando_trava
+
+                ocioso, motivo = monitor.avaliar()
+                if not ocioso:
+                    time.sleep(SERVICO_VERIFICACAO)
+                    return retomada, aguardando_trava
+
+                # O estado da execução só é tocado depois de obtida a trava (a janela ou o agente podem estar usando-o)
+                if not self._lock_limpeza.acquire(blocking=False):
+                    if not aguardando_trava:
+                        self.log("Outra rotina de limpeza está em andamento. A manutenção automática aguardará a sua conclusão.", "INFO")
+                    time.sleep(SERVICO_VERIFICACAO)
+                    return retomada, True
+                try:
+                    self.log(f"Sistema ocioso ({motivo}). Iniciando a manutenção automática.", "INFO")
+                    self.limpeza_cancelada = False
+                    self.retomada = retomada
+                    self.run_id = retomada["run"] if retomada else datetime.now().strftime("%Y%m%d-%H%M%S")
+                    chaves = [c for c in retomada["categorias"] if c in self.categorias_de_limpeza()] if retomada else categorias
+                    resultado = {"ok": False}
+                    trabalho = threading.Thread(target=executar, args=(chaves, resultado), daemon=True)
+                    trabalho.start()
+                except BaseException:
+                    self.retomada = self.run_id = None
+                    self._lock_limpeza.release()
+                    raise
+                try:
+                    while trabalho.is_alive():
+                        trabalho.join(SERVICO_VERIFICACAO)
+                        if not trabalho.is_alive():
+                            break
+                        # Com a limpeza rodando, a fila de disco é dela mesma; só CPU e usuário contam
+                        pausado = not self.execucao_liberada.is_set()
+                        ocioso, motivo = monitor.avaliar(considerar_disco=pausado)
+                        if not ocioso and self.execucao_liberada.is_set():
+                            self.log(f"Atividade detectada ({motivo}). Pausando a manutenção no próximo ponto seguro.", "AVISO")
+                            self.execucao_liberada.clear()
+                        elif ocioso and not self.execucao_liberada.is_set():
+                            self.log("Sistema ocioso novamente. Retomando a manutenção.", "INFO")
+                            self.execucao_liberada.set()
+                finally:
+                    self.execucao_liberada.set()
+
+                # Também depois de uma falha: a próxima tentativa espera o intervalo, sem repetir o erro a cada verificação
+                with open(arquivo_ultima, "w", encoding='utf-8') as f:
+                    f.write(str(time.time()))
+                if resultado["ok"]:
+                    self.log("Manutenção automática concluída.", "SUCESSO")
+                return None, False
+
+            threading.Thread(target=ciclo, daemon=True).start()
+
+        # --- Agente de Controle Remoto ---
+
+        def iniciar_agente_controle(self, token, host=AGENTE_HOST, porta=AGENTE_PORTA):
+            """Expõe as categorias de limpeza e as tarefas de reparo como jobs de um agente remoto."""
+            def job_limpeza(parametros):
+                categorias = parametros.get("categorias") or []
+                invalidas = [c for c in categorias if c not in self.categorias_de_limpeza()]
+                if not categorias or invalidas:
+                    raise ValueError(f"Categorias inválidas: {invalidas or 'nenhuma informada'}")
+                # O estado da execução só é tocado depois de obtida a trava (outra rotina pode estar usando-o)
+                if not self._lock_limpeza.acquire(blocking=False):
+                    raise RuntimeError("Já existe uma rotina de limpeza em andamento.")
+                try:
+                    self.limpeza_cancelada = False
+                    self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+                    estimado, medido, quarentena = self._executar_categorias(categorias)
+                finally:
+                    self.run_id = None
+                    self._lock_limpeza.release()
+                return {"bytes_estimados": estimado, "bytes_medidos": medido, "bytes_quarentena": quarentena}
+
+            def criar_job_tarefa(task_id, funcao):
+                def job_tarefa(parametros):
+                    iniciada, concluida = threading.Event(), threading.Event()
+                    resultado = {}
+                    def iniciar():
+                        # Na thread da interface, onde o estado do botão pode ser lido com segurança
+                        try:
+                            resultado["iniciada"] = self.run_long_task_in_thread(funcao, task_id)
+                        finally:
+                            iniciada.set()
+                    def observador(id_concluida, codigo_saida):
+                        if id_concluida == task_id:
+                            resultado["codigo_saida"] = codigo_saida
+                            concluida.set()
+                    self.observadores_tarefa.append(observador)
+                    try:
+                        self.root.after(0, iniciar)
+                        if not iniciada.wait(AGENTE_TEMPO_INICIO_TAREFA):
+                            raise TimeoutError(f"A interface não iniciou a tarefa '{task_id}' em {AGENTE_TEMPO_INICIO_TAREFA}s.")
+                        if not resultado.get("iniciada"):
+                            raise RuntimeError(f"A tarefa '{task_id}' já está em execução.")
+                        if not concluida.wait(AGENTE_TEMPO_LIMITE_TAREFA):
+                            raise TimeoutError(f"A tarefa '{task_id}' não terminou em {self.formatar_duracao(AGENTE_TEMPO_LIMITE_TAREFA)}.")
+                    finally:
+                        self.observadores_tarefa.remove(observador)
+                    if resultado["codigo_saida"] != 0:
+                        raise RuntimeError(f"A tarefa '{task_id}' terminou com o código {resultado['codigo_saida']}.")
+                    return resultado
+                return job_tarefa
+
+            tarefas = {
+                "ajustar_energia": self.ajustar_energia, "desfragmentar_disco": self.desfragmentar_disco,
+                "defender_scan": self.executar_varredura_defender, "sfc": self.executar_sfc, "dism": self.executar_dism,
+                "chkdsk": self.executar_chkdsk, "win_update": self.corrigir_windows_update,
+            }
+            jobs = {"limpeza": job_limpeza}
+            jobs.update({task_id: criar_job_tarefa(task_id, funcao) for task_id, funcao in tarefas.items()})
+
+            self.agente = AgenteControle(jobs, token, host, porta)
+            self.agente.iniciar()
+            self.eventos.adicionar_consumidor(ConsumidorAgente(self.agente))
+            self.log(f"Agente de controle remoto ouvindo em {host}:{self.agente.porta}.", "INFO")
+
+        def _contabilizar(self, itens=0, falhas=0):
+            """Soma itens e falhas aos contadores da categoria em execução na thread atual."""
+            contadores = getattr(self._contexto_thread, 'contadores', None)
+            if contadores is not None:
+                contadores[0] += itens
+                contadores[1] += falhas
+
+        # --- Histórico de Execuções ---
+
+        @staticmethod
+        def _grafico_tendencia(valores):
+            """Representa uma série de valores como um mini-gráfico de texto (ex.: '▁▃▅█')."""
+            blocos = "▁▂▃▄▅▆▇█"
+            if not valores:
+                return ""
+            maximo = max(valores) or 1
+            return "".join(blocos[min(int(v / maximo * (len(blocos) - 1)), len(blocos) - 1)] for v in valores)
+
+        def mostrar_historico(self):
+            """Abre uma janela com o histórico de execuções e a tendência de cada categoria."""
+            if not self.historico:
+                Messagebox.show_warning("O histórico de execuções não está disponível.", "Histórico")
+                return
+
+            def carregar():
+                # Em segundo plano: esperar a gravação em lote e consultar o banco congelaria a janela
+                try:
+                    self.historico.descarregar() # Garante que a última execução já esteja gravada
+                    categorias = [(categoria, execucoes, media, itens, falhas,
+                                   [b or 0 for _, b in self.historico.tendencia_categoria(categoria)])
+                                  for categoria, execucoes, media, itens, falhas in self.historico.resumo_categorias()]
+                    dados = (categorias, self.historico.resumo_tarefas(), self.historico.ultimas_execucoes())
+                except sqlite3.Error as e:
+                    self.log(f"Não foi possível consultar o histórico de execuções. Detalhes: {e}", "ERRO")
+                    return
+                self.root.after(0, self._abrir_janela_historico, *dados)
+
+            threading.Thread(target=carregar, daemon=True).start()
+
+        def _abrir_janela_historico(self, categorias, tarefas, ultimas_execucoes):
+            janela = ttk.Toplevel(self.root)
+            janela.title("Histórico de Execuções")
+            janela.geometry("760x560")
+
+            # --- Tendência por categoria ---
+            frame_categorias = ttk.Labelframe(janela, text="Categorias de Limpeza", padding=10)
+            frame_categorias.pack(pady=5, padx=10, fill='both', expand=True)
+            colunas = ("execucoes", "media", "itens", "falhas", "tendencia")
+            tabela = ttk.Treeview(frame_categorias, columns=colunas, height=7)
+            tabela.heading("#0", text="Categoria")
+            for coluna, titulo in zip(colunas, ("Execuções", "Média Liberada", "Itens", "Falhas", "Últimas Execuções")):
+                tabela.heading(coluna, text=titulo)
+                tabela.column(coluna, width=100, anchor='center')
+            tabela.column("tendencia", width=160)
+            tabela.pack(fill='both', expand=True)
+            for categoria, execucoes, media, itens, falhas, serie in categorias:
+                tabela.insert('', END, text=categoria, values=(execucoes, self.formatar_espaco(media or 0), itens or 0, falhas or 0, self._grafico_tendencia(serie)))
+
+            # --- Tarefas de reparo ---
+            frame_tarefas = ttk.Labelframe(janela, text="Tarefas de Otimização e Reparo", padding=10)
+            frame_tarefas.pack(pady=5, padx=10, fill='both', expand=True)
+            colunas = ("execucoes", "sucesso", "duracao", "ultima")
+            tabela = ttk.Treeview(frame_tarefas, columns=colunas, height=6)
+            tabela.heading("#0", text="Tarefa")
+            for coluna, titulo in zip(colunas, ("Execuções", "Sucessos", "Duração Média", "Última")):
+                tabela.heading(coluna, text=titulo)
+                tabela.column(coluna, width=120, anchor='center')
+            tabela.pack(fill='both', expand=True)
+            for task_id, execucoes, sucessos, duracao, ultima in tarefas:
+                ultima_txt = datetime.fromtimestamp(ultima).strftime("%d/%m/%Y %H:%M") if ultima else "-"
+                tabela.insert('', END, text=task_id, values=(execucoes, f"{sucessos or 0}/{execucoes}", f"{(duracao or 0) / 60:.1f} min", ultima_txt))
+
+            # --- Últimas execuções ---
+            frame_execucoes = ttk.Labelframe(janela, text="Últimas Execuções", padding=10)
+            frame_execucoes.pack(pady=5, padx=10, fill='both', expand=True)
+            colunas = ("inicio", "duracao", "liberado", "falhas", "status")
+            tabela = ttk.Treeview(frame_execucoes, columns=colunas, height=6)
+            tabela.heading("#0", text="Execução")
+            for coluna, titulo in zip(colunas, ("Início", "Duração", "Liberado", "Falhas", "Status")):
+                tabela.heading(coluna, text=titulo)
+                tabela.column(coluna, width=110, anchor='center')
+            tabela.pack(fill='both', expand=True)
+            for run_id, inicio, duracao, liberado, falhas, cancelada in ultimas_execucoes:
+                tabela.insert('', END, text=run_id, values=(
+                    datetime.fromtimestamp(inicio).strftime("%d/%m/%Y %H:%M"), f"{duracao or 0:.0f} s",
+                    self.formatar_espaco(liberado or 0), falhas or 0, "Cancelada" if cancelada else "Concluída"))
+
+        # --- Funções da Quarentena ---
+
+        def aplicar_retencao_quarentena(self):
+            """Descarta as execuções antigas da quarentena conforme os limites de tamanho e idade."""
+            try:
+                descartadas, liberado = self.quarentena.aplicar_retencao()
+                if descartadas:
+                    self.log(f"Quarentena: {descartadas} execuções antigas descartadas, liberando {self.formatar_espaco(liberado)}.", "INFO")
+            except Exception as e:
+                self.log(f"Erro ao aplicar a política de retenção da quarentena. Detalhes: {e}", "AVISO")
+
+        def restaurar_ultima_quarentena(self):
+            """Restaura, em segundo plano, todos os itens da execução mais recente em quarentena."""
+            run_id = self.quarentena.ultima_execucao()
+            if not run_id:
+                Messagebox.show_info("Não há nenhuma limpeza em quarentena para restaurar.", "Quarentena")
+                return
+
+            def restaurar():
+                self.log(f"Restaurando os itens da execução '{run_id}' da quarentena...", "INFO")
+                try:
+                    restaurados, conflitos = self.quarentena.restaurar(run_id)
+                except Exception as e:
+                    self.log(f"Erro ao restaurar a execução '{run_id}'. Detalhes: {e}", "ERRO")
+                    return
+                if conflitos:
+                    self.log(f"{restaurados} itens restaurados; {conflitos} não puderam voltar (o caminho original já existe ou está em uso).", "AVISO")
+                else:
+                    self.log(f"{restaurados} itens restaurados com sucesso.", "SUCESSO")
+
+            threading.Thread(target=restaurar, daemon=True).start()
+
+        def esvaziar_quarentena(self):
+            """Apaga definitivamente todo o conteúdo da quarentena, após confirmação."""
+            confirmado = Messagebox.yesno("Apagar definitivamente todos os itens em quarentena?", "Esvaziar Quarentena", alert=True)
+            if not (confirmado and confirmado.lower() in ("yes", "sim")):
+                return
+
+            def esvaziar():
+                descartadas, liberado = self.quarentena.aplicar_retencao(tamanho_maximo=0, idade_maxima_dias=0)
+                self.log(f"Quarentena esvaziada: {descartadas} execuções removidas, liberando {self.formatar_espaco(liberado)}.", "SUCESSO")
+
+            threading.Thread(target=esvaziar, daemon=True).start()
 
         def escolher_local_log(self):
             """Abre uma caixa de diálogo para o usuário escolher onde salvar o log."""
             novo_caminho = filedialog.asksaveasfilename(
-                defaultextension=".txt", 
-                filetypes=[("Arquivos de Texto", "*.txt")], 
-                initialfile="limpeza_log.txt",
+                defaultextension=".jsonl", 
+                filetypes=[("Log Estruturado", "*.jsonl"), ("Arquivos de Texto", "*.txt")], 
+                initialfile="limpeza_log.jsonl",
                 title="Escolha o local para salvar o arquivo de log"
             )
             if novo_caminho:
-                self.log_file_path = novo_caminho
-                self.log(f"O local do arquivo de log foi alterado para: {self.log_file_path}", "INFO")
+                pasta, nome = os.path.split(novo_caminho)
+                nome = os.path.splitext(nome)[0]
+                self.log_estruturado.fechar()
+                self.log_estruturado = LogEstruturado(pasta, nome)
+                self.log_file_path = os.path.join(pasta, f"{nome}.txt")
+                self.consumidor_arquivo.log_estruturado = self.log_estruturado
+                self.consumidor_arquivo.caminho_texto = self.log_file_path
+                self.log(f"O local do arquivo de log foi alterado para: {pasta} ('{nome}.*.jsonl')", "INFO")
+
+        def recarregar_exclusoes(self, extras=None):
+            """Recompila as regras de exclusão salvas (mais as da linha de comando)."""
+            if extras is not None:
+                self.exclusoes_extras = list(extras)
+            self.exclusoes = carregar_exclusoes(self.exclusoes_extras)
+
+        def editar_exclusoes(self):
+            """Abre uma janela para editar as regras de exclusão (uma por linha)."""
+            janela = ttk.Toplevel(self.root)
+            janela.title("Regras de Exclusão")
+            janela.geometry("620x420")
+            ttk.Label(janela, text="Um caminho ou glob por linha. Ex.: %TEMP%\\agente-*, C:\\Builds\\cache, *.lic, node_modules\n"
+                                   "Pastas excluídas (e tudo abaixo delas) não são listadas nem apagadas.",
+                      justify='left').pack(padx=10, pady=(10, 5), anchor='w')
+            texto = ScrolledText(janela, wrap="none", font=("Courier New", 9), height=15)
+            texto.pack(fill='both', expand=True, padx=10)
+            texto.insert(END, "\n".join(ler_exclusoes()))
+
+            def salvar():
+                regras = texto.get("1.0", END).splitlines()
+                try:
+                    salvar_exclusoes(regras)
+                except OSError as e:
+                    Messagebox.show_error(f"Não foi possível salvar as regras. Detalhes: {e}", "Regras de Exclusão")
+                    return
+                self.recarregar_exclusoes()
+                self.log(f"Regras de exclusão atualizadas ({len(self.exclusoes.regras)} regras ativas).", "INFO")
+                janela.destroy()
+
+            ttk.Button(janela, text="Salvar", command=salvar, bootstyle="success").pack(pady=10)
+
+        def consultar_execucao_anterior(self):
+            """Pede o id de uma execução e exibe os seus registros, lidos direto pelo índice do log."""
+            execucoes = self.log_estruturado.execucoes()
+            if not execucoes:
+                Messagebox.show_info("Nenhuma execução registrada no log.", "Consultar Execução")
+                return
+            recentes = ", ".join(reversed(execucoes[-5:]))
+            run_id = Querybox.get_string(f"Id da execução (recentes: {recentes}):", "Consultar Execução", initialvalue=execucoes[-1])
+            if not run_id:
+                return
+
+            registros = list(self.log_estruturado.consultar(run_id.strip()))
+            if not registros:
+                self.log(f"Nenhum registro encontrado para a execução '{run_id}'.", "AVISO")
+                return
+            self.registrar_na_tela(f"--- Registros da execução '{run_id}' ({len(registros)}) ---\n", "INFO")
+            for registro in registros:
+                self.registrar_na_tela(f"[{registro.get('ts')}] [{registro.get('tag')}] {registro.get('msg')}\n", registro.get('tag'), registro.get('cat'))
 
         @staticmethod
         def formatar_espaco(b):
@@ -1026,6 +5699,14 @@ def run_main_app():
             if b < 1024**3: return f"{b/1024**2:.2f} MB"
             return f"{b/1024**3:.2f} GB"
 
+        @staticmethod
+        def formatar_duracao(segundos):
+            """Converte uma duração em segundos para um formato legível (ex.: '1h 05min', '3min 20s')."""
+            segundos = int(segundos)
+            if segundos < 60: return f"{segundos}s"
+            if segundos < 3600: return f"{segundos // 60}min {segundos % 60:02d}s"
+            return f"{segundos // 3600}h {segundos % 3600 // 60:02d}min"
+
         # --- NOVAS FUNÇÕES E FUNÇÕES CORRIGIDAS PARA REINICIALIZAÇÃO --- 
 
         def iniciar_contagem_regressiva(self, segundos):
@@ -1059,7 +5740,7 @@ def run_main_app():
                 resultado = subprocess.run(
                     ["shutdown", "/a"], 
                     check=True, 
-                    creationflags=subprocess.CREATE_NO_WINDOW,
+                    creationflags=PLATAFORMA.flags_sem_janela,
                     capture_output=True,
                     text=True,
                     encoding=CMD_ENCODING,
@@ -1100,7 +5781,7 @@ def run_main_app():
                     resultado = subprocess.run(
                         ["shutdown", "/r", "/t", "60"], 
                         check=True, 
-                        creationflags=subprocess.CREATE_NO_WINDOW,
+                        creationflags=PLATAFORMA.flags_sem_janela,
                         capture_output=True,
                         text=True,
                         encoding=CMD_ENCODING,
@@ -1170,24 +5851,60 @@ def run_main_app():
     # <<< FIM DA CORREÇÃO DO ÍCONE >>> 
     
     app = SystemCleanerApp(root, style) 
+    if argumentos and argumentos.excluir:
+        app.recarregar_exclusoes(argumentos.excluir)
+
+    if argumentos and (argumentos.servico or argumentos.agente) and sys.stdout:
+        # Sem interface: as linhas de log também vão para o terminal (com pythonw não há saída padrão)
+        app.eventos.adicionar_consumidor(ConsumidorTerminal())
+
+    if argumentos and argumentos.servico:
+        # Modo serviço: a janela fica oculta e as funções de limpeza rodam conforme a ociosidade
+        root.withdraw()
+        categorias = [c.strip() for c in argumentos.categorias.split(",") if c.strip()]
+        invalidas = [c for c in categorias if c not in app.categorias_de_limpeza()]
+        if invalidas:
+            print(f"ERRO: Categorias desconhecidas: {', '.join(invalidas)}")
+            sys.exit(2)
+        monitor = MonitorOciosidade(argumentos.cpu_maxima, argumentos.fila_disco_maxima, argumentos.ocioso_minimo)
+        app.iniciar_servico_manutencao(categorias, argumentos.intervalo_horas, monitor)
+
+    if not (argumentos and (argumentos.servico or argumentos.agente)):
+        root.after(500, app.verificar_execucao_interrompida) # Com a janela já desenhada
+
+    if argumentos and argumentos.agente:
+        root.withdraw()
+        if not argumentos.agente_token:
+            print("ERRO: Informe o token do agente com --agente-token ou LIMPEZA_AGENTE_TOKEN.")
+            sys.exit(2)
+        try:
+            app.iniciar_agente_controle(argumentos.agente_token, argumentos.agente_host, argumentos.agente_porta)
+        except OSError as e:
+            print(f"ERRO: Não foi possível iniciar o agente em {argumentos.agente_host}:{argumentos.agente_porta}. Detalhes: {e}")
+            sys.exit(1)
+
     root.mainloop() 
 
 
 # --- Ponto de Entrada Principal do Script --- 
 if __name__ == "__main__": 
+    # Necessário para o pool de processos da compactação de logs no executável do PyInstaller.
+    multiprocessing.freeze_support()
+    argumentos = ler_argumentos()
+    if argumentos.estimativas:
+        # Consulta somente leitura ao histórico: não precisa da interface nem de administrador
+        try:
+            estimativas = estimativas_tarefas(HistoricoExecucoes(somente_leitura=True))
+        except sqlite3.Error:
+            estimativas = [] # Ainda sem histórico (ou banco de uma versão sem as colunas da estimativa)
+        print(json.dumps(estimativas, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    garantir_ttkbootstrap()
+
     # 1. Verifica se o script já tem permissões de administrador. 
     if not verificar_admin(): 
-        # 2. Se não tiver, exibe uma mensagem e tenta se re-executar como administrador. 
-        ctypes.windll.user32.MessageBoxW(0, "Este programa precisa de permissões de administrador para funcionar. Ele será reiniciado para solicitar a elevação.", "Permissões Necessárias", 0x30) # MB_OK | MB_ICONWARNING 
-        try: 
-            # Tenta re-lançar o script com o verbo "runas", que solicita elevação de privilégios (UAC). 
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1) 
-        except Exception as e: 
-            # Caso a elevação falhe. 
-            ctypes.windll.user32.MessageBoxW(0, f"Não foi possível solicitar permissões de administrador automaticamente.\nPor favor, clique com o botão direito no arquivo e selecione 'Executar como administrador'.\n\nErro: {e}", "Erro de Elevação", 0x10) # MB_OK | MB_ICONERROR 
-            sys.exit(1) 
-        # Sai do processo atual, não-elevado. 
-        sys.exit(0) 
+        # 2. Se não tiver, o backend tenta se re-executar como administrador (ou avisa e segue). 
+        PLATAFORMA.solicitar_elevacao()
     
     # 3. Se o script já tem permissão de admin, a aplicação principal é iniciada. 
-    run_main_app()
\ No newline at end of file
+    run_main_app(argumentos)
\ No newline at end of file
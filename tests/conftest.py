@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# O programa é um único script na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def dados_app_temporarios(tmp_path, monkeypatch):
+    """Diário, histórico, exclusões e quarentena vão para uma pasta temporária, nunca para a do usuário."""
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "dados_app"))
+    return tmp_path / "dados_app"
@@ -0,0 +1,104 @@
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import limpezadowindows as lw
+
+TOKEN = "segredo"
+
+
+@pytest.fixture
+def agente():
+    liberar = threading.Event()
+
+    def job_lento(parametros):
+        liberar.wait(5)
+        return {"ok": True}
+
+    def job_falho(parametros):
+        raise RuntimeError("falhou de propósito")
+
+    agente = lw.AgenteControle({"lento": job_lento, "falho": job_falho}, TOKEN, host="127.0.0.1", porta=0, fila_observador=4)
+    agente.iniciar()
+    agente.liberar = liberar
+    yield agente
+    liberar.set()
+    agente.parar()
+
+
+def rpc(agente, metodo, parametros=None, token=TOKEN, corpo=None):
+    conexao = http.client.HTTPConnection("127.0.0.1", agente.porta, timeout=5)
+    if corpo is None:
+        corpo = json.dumps({"jsonrpc": "2.0", "id": 1, "method": metodo, "params": parametros or {}})
+    conexao.request("POST", "/rpc", corpo, {"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    resposta = conexao.getresponse()
+    return resposta.status, json.loads(resposta.read())
+
+
+def esperar(condicao, tempo_limite=5):
+    prazo = time.monotonic() + tempo_limite
+    while not condicao():
+        if time.monotonic() > prazo:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_token_invalido_e_recusado(agente):
+    status, resposta = rpc(agente, "listar_jobs", token="errado")
+    assert status == 401
+    assert resposta == {"erro": "não autorizado"}
+
+
+def test_ciclo_de_um_job_pelo_cliente_local(agente):
+    assert rpc(agente, "listar_jobs")[1]["result"] == ["falho", "lento"]
+    job_id = rpc(agente, "iniciar", {"nome": "lento"})[1]["result"]
+
+    # O mesmo job não é iniciado duas vezes ao mesmo tempo
+    assert "já está em execução" in rpc(agente, "iniciar", {"nome": "lento"})[1]["error"]["message"]
+    assert rpc(agente, "estado", {"id": job_id})[1]["result"]["estado"] == "executando"
+
+    agente.liberar.set()
+    assert esperar(lambda: rpc(agente, "estado", {"id": job_id})[1]["result"]["estado"] == "concluido")
+    assert rpc(agente, "estado", {"id": job_id})[1]["result"]["resultado"] == {"ok": True}
+
+
+def test_falha_do_job_e_relatada(agente):
+    job_id = rpc(agente, "iniciar", {"nome": "falho"})[1]["result"]
+    assert esperar(lambda: rpc(agente, "estado", {"id": job_id})[1]["result"]["estado"] == "falhou")
+    assert rpc(agente, "estado", {"id": job_id})[1]["result"]["erro"] == "falhou de propósito"
+    assert rpc(agente, "inexistente")[1]["error"]["code"] == -32601
+
+
+@pytest.mark.parametrize("corpo", ['[{"jsonrpc": "2.0", "id": 1, "method": "jobs"}]', '5', '"texto"', 'null'])
+def test_requisicao_que_nao_e_objeto_recebe_erro(agente, corpo):
+    status, resposta = rpc(agente, None, corpo=corpo)
+    assert status == 200
+    assert resposta == {"jsonrpc": "2.0", "id": None,
+                        "error": {"code": -32600, "message": "Requisição inválida: esperado um objeto JSON"}}
+    # O agente continua atendendo
+    assert rpc(agente, "listar_jobs")[1]["result"] == ["falho", "lento"]
+    assert rpc(agente, None, corpo="{")[1]["error"]["code"] == -32700
+
+
+def test_parar_com_observador_lento_encerra_o_laco(agente):
+    # Observador que conecta e nunca lê: com o socket cheio, a fila dele (4 lotes) enche
+    observador = socket.create_connection(("127.0.0.1", agente.porta), timeout=5)
+    observador.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    observador.sendall(f"GET /eventos HTTP/1.1\r\nAuthorization: Bearer {TOKEN}\r\n\r\n".encode())
+    assert esperar(lambda: len(agente._observadores) == 1)
+    fila = next(iter(agente._observadores))
+    for _ in range(2000):
+        if fila.full():
+            break
+        agente.publicar({"tipo": "log", "msg": "x" * 65536})
+        time.sleep(0.005)
+    assert fila.full()
+
+    agente.parar()
+    assert esperar(lambda: not agente.loop.is_running())
+    observador.close()
@@ -0,0 +1,28 @@
+import random
+
+import limpezadowindows as lw
+
+
+def test_linhas_fora_de_ordem_ficam_ordenadas_pelo_momento():
+    armazem = lw.ArmazemLog()
+    momentos = list(range(200))
+    aleatorio = random.Random(7)
+    # Cada linha chega com um atraso de até 5 posições, como as de várias threads
+    chegada = sorted(momentos, key=lambda m: m + aleatorio.uniform(0, 5))
+    for momento in chegada:
+        armazem.adicionar(f"linha {momento}", "CMD" if momento % 3 else "INFO",
+                          tarefa="a" if momento % 2 else "b", momento=float(momento))
+
+    assert armazem.momentos == sorted(armazem.momentos)
+    assert armazem.textos == [f"linha {m}" for m in momentos]
+    assert armazem.por_tag["INFO"] == [i for i in momentos if i % 3 == 0]
+    assert armazem.por_tarefa["a"] == [i for i in momentos if i % 2]
+    assert list(armazem.filtrar(desde=150.0)) == list(range(150, 200))
+    assert list(armazem.filtrar(tags={"INFO"}, desde=150.0)) == [i for i in range(150, 200) if i % 3 == 0]
+    assert list(armazem.filtrar(texto="linha 19", tarefa="a")) == [19, 191, 193, 195, 197, 199]
+
+
+def test_deslocar_indices():
+    lista = [0, 2, 5, 9]
+    lw.ArmazemLog.deslocar_indices(lista, 5)
+    assert lista == [0, 2, 6, 10]
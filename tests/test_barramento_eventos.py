@@ -0,0 +1,101 @@
+import threading
+import time
+
+import limpezadowindows as lw
+
+
+class ConsumidorLento:
+    """Consumidor que demora a cada lote (como uma interface ocupada) e anota o tamanho dos lotes."""
+    def __init__(self, atraso):
+        self.atraso = atraso
+        self.lotes = []
+
+    def receber_lote(self, eventos):
+        self.lotes.append(len(eventos))
+        time.sleep(self.atraso)
+
+
+def test_inundacao_por_varias_threads_nao_passa_da_capacidade():
+    capacidade = 100
+    barramento = lw.BarramentoEventos(capacidade=capacidade, espera_maxima=0.05, intervalo=0.01)
+    consumidor = barramento.adicionar_consumidor(ConsumidorLento(0.02))
+    barramento.iniciar()
+    maximo = 0
+    fim = threading.Event()
+
+    def amostrar():
+        nonlocal maximo
+        while not fim.is_set():
+            maximo = max(maximo, len(barramento))
+            time.sleep(0.0005)
+
+    def produzir(numero):
+        for i in range(3000):
+            # Uma linha importante a cada dez linhas de saída de comando
+            barramento.publicar(lw.EVENTO_LOG, linha=f"{numero}:{i}\n", tag="INFO" if i % 10 == 0 else "CMD", tarefa=None)
+
+    amostrador = threading.Thread(target=amostrar)
+    amostrador.start()
+    produtores = [threading.Thread(target=produzir, args=(n,)) for n in range(8)]
+    for produtor in produtores:
+        produtor.start()
+    for produtor in produtores:
+        produtor.join()
+    barramento.parar()
+    fim.set()
+    amostrador.join()
+
+    assert barramento.publicados == 8 * 3000
+    assert barramento.descartadas > 0 # O consumidor não acompanhou: a fila aplicou a política de descarte
+    assert maximo <= capacidade
+    assert len(barramento) == 0
+    assert max(consumidor.lotes) <= capacidade + 1 # + o aviso de linhas omitidas
+
+
+def test_progresso_com_chave_substitui_o_pendente():
+    barramento = lw.BarramentoEventos(intervalo=0.01)
+    for percentual in range(100):
+        barramento.publicar(lw.EVENTO_PROGRESSO, chave=("progresso", "sfc"), tarefa="sfc", percentual=percentual)
+
+    assert len(barramento) == 1
+    assert barramento.mescladas == 99
+
+
+def test_interface_atrasada_nao_acumula_eventos_sem_limite():
+    agendadas = []
+    recebidos = []
+    # Interface travada: as entregas agendadas só rodam no fim do teste
+    interface = lw.ConsumidorInterface(lambda atraso, funcao: agendadas.append(funcao), recebidos.extend,
+                                       capacidade=100, espera_maxima=0.01)
+    for lote in range(50):
+        eventos = [lw.Evento(lw.EVENTO_LOG, lote, {"linha": f"{lote}:{i}\n", "tag": "CMD" if i % 2 else "INFO", "tarefa": None})
+                   for i in range(40)]
+        eventos.append(lw.Evento(lw.EVENTO_PROGRESSO, lote, {"tarefa": "sfc", "percentual": lote}))
+        eventos.append(lw.Evento(lw.EVENTO_ESTADO_TAREFA, lote, {"tarefa": f"t{lote}", "estado": "executando"}))
+        interface.receber_lote(eventos)
+        assert len(interface) <= 100
+
+    assert interface.acordadas == len(agendadas) == 1
+    agendadas.pop()()
+
+    assert len(recebidos) <= 101 # + o aviso de eventos omitidos
+    assert "omitidos" in recebidos[0].dados["linha"]
+    assert interface.descartados == 50 * 42 - (len(recebidos) - 1)
+    estados = [e.dados["tarefa"] for e in recebidos if e.tipo == lw.EVENTO_ESTADO_TAREFA]
+    assert estados == [f"t{lote}" for lote in range(50)] # Mudanças de estado nunca são descartadas
+    progressos = [e.dados["percentual"] for e in recebidos if e.tipo == lw.EVENTO_PROGRESSO]
+    assert progressos[-1] == 49 # O progresso mais recente chega à tela
+
+
+def test_interface_e_acordada_uma_vez_por_lote_e_nao_por_evento():
+    recebidos = []
+    barramento = lw.BarramentoEventos(intervalo=0.01)
+    interface = barramento.adicionar_consumidor(lw.ConsumidorInterface(lambda atraso, funcao: funcao(), recebidos.extend))
+    barramento.iniciar()
+    for i in range(5000):
+        barramento.publicar(lw.EVENTO_LOG, linha=f"{i}\n", tag="INFO", tarefa=None)
+        barramento.publicar(lw.EVENTO_PROGRESSO, chave=("progresso", "sfc"), tarefa="sfc", percentual=i / 50)
+    barramento.parar()
+
+    assert len([e for e in recebidos if e.tipo == lw.EVENTO_LOG]) == 5000
+    assert interface.acordadas <= barramento.lotes < 1000 # Antes: um root.after por linha e por progresso (10000)
@@ -0,0 +1,35 @@
+import gzip
+import os
+
+import limpezadowindows as lw
+
+
+def test_compacta_e_substitui_o_original(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_bytes(b"linha\n" * 1000)
+
+    caminho, antes, depois, erro = lw.comprimir_arquivo_log(str(log), tamanho_bloco=1024)
+
+    assert erro is None and antes == 6000 and depois == os.path.getsize(tmp_path / "app.log.gz")
+    assert os.listdir(tmp_path) == ["app.log.gz"]
+    with gzip.open(tmp_path / "app.log.gz") as compactado:
+        assert compactado.read() == b"linha\n" * 1000
+
+
+def test_original_que_nao_pode_ser_removido_fica_sem_o_gz(tmp_path, monkeypatch):
+    log = tmp_path / "app.log"
+    log.write_bytes(b"em uso\n" * 100)
+    remover = os.remove
+
+    def remover_em_uso(caminho):
+        if caminho == str(log):
+            raise PermissionError(13, "arquivo em uso por outro processo", caminho)
+        remover(caminho)
+
+    monkeypatch.setattr(lw.os, "remove", remover_em_uso)
+
+    caminho, antes, depois, erro = lw.comprimir_arquivo_log(str(log))
+
+    assert (antes, depois) == (0, 0) and "em uso" in erro
+    assert os.listdir(tmp_path) == ["app.log"]
+    assert log.read_bytes() == b"em uso\n" * 100
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import limpezadowindows as lw
+
+
+def test_falha_de_e_s_desativa_o_diario_sem_interromper(tmp_path):
+    falhas = []
+    diario = lw.DiarioLimpeza(str(tmp_path / "diario.jsonl"), ao_falhar=falhas.append)
+    assert diario.iniciar("run1", ["temp_usuarios"])
+
+    diario._arquivo.close()
+    diario._arquivo = open(diario.caminho, encoding='utf-8') # Simula o disco que deixa de aceitar gravações
+    diario.planejar_diretorio("/tmp/x", ["a", "b"])
+    diario.concluir_itens("/tmp/x", ["a"])
+    diario.concluir_categoria("temp_usuarios", 10)
+
+    assert len(falhas) == 1 # Só a primeira falha: depois disso o diário fica desativado
+    assert diario.encerrar("run1", bytes=10)
+
+
+def test_diario_em_pasta_inacessivel_nao_lanca_excecao(tmp_path):
+    falhas = []
+    diario = lw.DiarioLimpeza(str(tmp_path / "nao_existe" / "diario.jsonl"), ao_falhar=falhas.append)
+
+    assert diario.iniciar("run1", ["lixeira"]) is False
+    diario.concluir_diretorio("/tmp/x")
+    assert diario.encerrar("run1") is False
+    assert len(falhas) == 2
+
+
+def test_execucao_em_andamento_em_outro_processo_nao_e_retomada_nem_descartada(tmp_path):
+    caminho = str(tmp_path / "diario.jsonl")
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Outro processo (ex.: o modo serviço) começa uma execução e fica escrevendo o diário
+    servico = subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {raiz!r})
+        import limpezadowindows as lw
+        diario = lw.DiarioLimpeza({caminho!r})
+        diario.iniciar("servico", ["temp_usuarios"])
+        print("iniciado", flush=True)
+        sys.stdin.readline()
+    """)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, LOCALAPPDATA=str(tmp_path)))
+    try:
+        assert servico.stdout.readline().strip() == "iniciado"
+        falhas = []
+        diario = lw.DiarioLimpeza(caminho, ao_falhar=falhas.append)
+
+        assert diario.pendente()["run"] == "servico"
+        assert diario.em_andamento()
+        assert diario.encerrar("servico", descartada=True) is False # Não descarta o diário de quem está executando
+        assert diario.iniciar("janela", ["lixeira"]) is False # Nem o sobrescreve
+        assert isinstance(falhas[0], BlockingIOError)
+        assert diario.pendente()["run"] == "servico"
+    finally:
+        servico.stdin.close()
+        servico.wait(10)
+
+    # O processo terminou sem encerrar o diário: agora é uma execução interrompida de verdade
+    diario = lw.DiarioLimpeza(caminho)
+    assert not diario.em_andamento()
+    assert diario.pendente()["run"] == "servico"
+    assert diario.encerrar("servico", descartada=True)
+    assert diario.pendente() is None
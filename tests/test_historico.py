@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pytest
+
+import limpezadowindows as lw
+
+
+def test_somente_leitura_nao_cria_o_banco_nem_a_thread_de_gravacao(tmp_path):
+    caminho = tmp_path / "historico.sqlite3"
+    threads = threading.active_count()
+
+    historico = lw.HistoricoExecucoes(str(caminho), somente_leitura=True)
+
+    assert threading.active_count() == threads
+    with pytest.raises(lw.sqlite3.Error):
+        historico.tarefas_registradas()
+    assert not caminho.exists()
+
+
+def test_somente_leitura_consulta_o_que_foi_gravado(tmp_path):
+    caminho = str(tmp_path / "historico.sqlite3")
+    gravador = lw.HistoricoExecucoes(caminho)
+    agora = time.time()
+    for duracao in (100, 120, 110):
+        gravador.registrar_tarefa("executar_sfc", agora, agora + duracao, 0, "C:", 1000, 400)
+    gravador.descarregar()
+
+    leitor = lw.HistoricoExecucoes(caminho, somente_leitura=True)
+
+    assert leitor.tarefas_registradas() == ["executar_sfc"]
+    assert [e["tarefa"] for e in lw.estimativas_tarefas(leitor, "C:")] == ["executar_sfc"]
+    with pytest.raises(lw.sqlite3.Error):
+        leitor.registrar_tarefa("executar_sfc", agora, agora + 1, 0)
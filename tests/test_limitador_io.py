@@ -0,0 +1,41 @@
+import time
+
+import limpezadowindows as lw
+
+
+def test_balde_permite_rajada_de_um_segundo_e_cobra_a_divida():
+    balde = lw.BaldeTokens(10)
+    assert balde.retirar(10) == 0.0
+    assert 0.45 < balde.retirar(5) <= 0.5
+    assert lw.BaldeTokens(0).retirar(10**9) == 0.0 # 0 = sem limite
+
+
+def test_limite_de_todos_mantem_os_volumes_configurados():
+    limitador = lw.LimitadorIO(100, 0)
+    limitador.configurar("D:", 10, 1024)
+    limitador.aguardar("C:", operacoes=50)
+    limitador.aguardar("D:", operacoes=5)
+
+    limitador.configurar(None, 20, 0)
+
+    assert limitador.limites("D:") == (10, 1024)
+    assert limitador.limites("C:") == (20, 0)
+    assert limitador.limites(None) == (20, 0)
+    # Só o balde do volume que segue o padrão é recriado; o do volume configurado continua com o que já gastou
+    assert "C:" not in limitador._baldes
+    assert limitador._baldes["D:"][0].tokens < 10
+
+
+def test_espera_registrada_e_a_dormida():
+    limitador = lw.LimitadorIO(10, 0)
+    limitador.aguardar("C:", operacoes=10)
+    inicio = time.monotonic()
+    limitador.aguardar("C:", operacoes=2)
+    assert time.monotonic() - inicio >= 0.19
+    assert 0.19 <= limitador.consumir_metricas()["C:"]["espera"] < 0.5
+
+    # Cancelada, a espera de ~1s termina logo e só o que foi dormido entra nas métricas
+    limitador.aguardar("C:", operacoes=10, cancelado=lambda: True)
+    metricas = limitador.consumir_metricas()["C:"]
+    assert metricas["espera"] < 0.1
+    assert metricas["operacoes"] == 10
@@ -0,0 +1,141 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+import limpezadowindows as lw
+
+
+def criar_arvore(raiz, profundidade=6, largura=2, arquivos=3):
+    """Árvore profunda com arquivos de tamanhos variados. Retorna (bytes, arquivos)."""
+    os.makedirs(raiz)
+    atual, total, quantidade = raiz, 0, 0
+    for nivel in range(profundidade):
+        for ramo in range(largura):
+            pasta = os.path.join(atual, f"ramo{ramo}")
+            os.makedirs(pasta)
+            for numero in range(arquivos):
+                conteudo = b'x' * (nivel * 10 + numero + 1)
+                with open(os.path.join(pasta, f"f{numero}.tmp"), 'wb') as arquivo:
+                    arquivo.write(conteudo)
+                total += len(conteudo)
+                quantidade += 1
+        atual = os.path.join(atual, f"nivel{nivel}")
+        os.makedirs(atual)
+    return total, quantidade
+
+
+@pytest.fixture(params=[True, False], ids=["dir_fd", "caminhos"])
+def modo(request, monkeypatch):
+    if request.param and not lw.MotorRemocao.USA_DIR_FD:
+        pytest.skip("Sistema sem suporte a dir_fd")
+    monkeypatch.setattr(lw.MotorRemocao, "USA_DIR_FD", request.param)
+    return request.param
+
+
+def test_motor_remove_o_mesmo_que_rmtree(tmp_path, modo):
+    referencia = tmp_path / "referencia"
+    alvo = tmp_path / "alvo"
+    criar_arvore(str(referencia))
+    total, quantidade = criar_arvore(str(alvo))
+    pastas = sum(1 for _ in os.walk(alvo))
+
+    shutil.rmtree(referencia)
+    estatisticas = lw.MotorRemocao().remover(str(alvo))
+
+    assert not alvo.exists() and not referencia.exists()
+    assert sorted(os.listdir(tmp_path)) == []
+    assert estatisticas == {"bytes": total, "arquivos": quantidade, "diretorios": pastas, "falhas": 0, "preservados": 0}
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink") or os.name == "nt", reason="Links simbólicos exigem privilégio no Windows")
+def test_motor_remove_links_sem_seguir(tmp_path, modo):
+    fora = tmp_path / "fora"
+    fora.mkdir()
+    (fora / "manter.txt").write_bytes(b"importante")
+    alvo = tmp_path / "alvo"
+    total, _ = criar_arvore(str(alvo), profundidade=2)
+    os.symlink(fora, alvo / "link_para_fora")
+    total += os.lstat(alvo / "link_para_fora").st_size # O próprio link é removido e contado
+
+    estatisticas = lw.MotorRemocao().remover(str(alvo))
+
+    assert not alvo.exists()
+    assert (fora / "manter.txt").read_bytes() == b"importante"
+    assert estatisticas["bytes"] == total
+
+
+def test_mesmo_motor_atende_itens_de_dispositivos_diferentes(tmp_path):
+    if not os.path.isdir("/dev/shm") or os.stat("/dev/shm").st_dev == os.stat(tmp_path).st_dev:
+        pytest.skip("Exige /dev/shm em um sistema de arquivos diferente do de tmp_path")
+    outro = tempfile.mkdtemp(dir="/dev/shm")
+    try:
+        criar_arvore(os.path.join(outro, "x"), profundidade=2)
+        criar_arvore(str(tmp_path / "y"), profundidade=2)
+        motor = lw.MotorRemocao() # Reaproveitado entre itens, como em limpar_diretorio
+
+        primeiro = motor.remover(os.path.join(outro, "x"))
+        segundo = motor.remover(str(tmp_path / "y"))
+
+        assert primeiro["preservados"] == segundo["preservados"] == 0
+        assert not os.path.exists(os.path.join(outro, "x")) and not (tmp_path / "y").exists()
+    finally:
+        shutil.rmtree(outro, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Links simbólicos exigem privilégio no Windows")
+def test_link_em_laco_nao_repete_nem_escapa(tmp_path, modo):
+    raiz = tmp_path / "cache"
+    (raiz / "a" / "b" / "c").mkdir(parents=True)
+    (raiz / "a" / "b" / "c" / "dados.bin").write_bytes(b"x" * 10)
+    os.symlink(raiz / "a", raiz / "a" / "b" / "c" / "volta") # Aponta para um ancestral
+
+    percurso = lw.PercursoSeguro(lw.LINKS_SEGUIR)
+    pastas = [pasta for pasta, _, _ in percurso.percorrer(str(raiz))]
+    assert len(pastas) == len(set(os.path.realpath(p) for p in pastas)) == 4
+    assert percurso.diretorios_repetidos == 1
+
+    estatisticas = lw.MotorRemocao().remover(str(raiz))
+    assert not raiz.exists()
+    assert estatisticas["falhas"] == 0
+    assert estatisticas["bytes"] == 10 + len(str(raiz / "a")) # O arquivo e o próprio link (tamanho do destino)
+
+
+@pytest.fixture
+def montagem_bind(tmp_path):
+    """Monta tmp_path/cache/dados também em tmp_path/cache/espelho (a mesma árvore por dois caminhos)."""
+    if os.name == "nt" or not hasattr(os, "geteuid") or os.geteuid() != 0:
+        pytest.skip("Montagens 'bind' exigem root no Linux")
+    dados, espelho = tmp_path / "cache" / "dados", tmp_path / "cache" / "espelho"
+    total, quantidade = criar_arvore(str(dados), profundidade=3)
+    espelho.mkdir()
+    if subprocess.run(["mount", "--bind", str(dados), str(espelho)], capture_output=True).returncode != 0:
+        pytest.skip("mount --bind indisponível neste ambiente")
+    try:
+        yield tmp_path / "cache", total, quantidade
+    finally:
+        subprocess.run(["umount", str(espelho)], capture_output=True)
+
+
+def test_montagem_bind_e_percorrida_uma_vez(montagem_bind):
+    raiz, total, quantidade = montagem_bind
+    percurso = lw.PercursoSeguro(lw.LINKS_NAO_SEGUIR)
+
+    arquivos = [entrada for _, _, entradas in percurso.percorrer(str(raiz)) for entrada in entradas]
+
+    assert len(arquivos) == quantidade
+    assert percurso.diretorios_repetidos == 1
+
+
+def test_motor_conta_uma_vez_a_arvore_montada_em_dois_caminhos(montagem_bind, modo):
+    raiz, total, quantidade = montagem_bind
+
+    estatisticas = lw.MotorRemocao().remover(str(raiz))
+
+    assert estatisticas["bytes"] == total and estatisticas["arquivos"] == quantidade
+    assert estatisticas["preservados"] == 1 # A segunda visita à mesma pasta é barrada
+    assert estatisticas["falhas"] == 0
+    restantes = [nome for _, _, nomes in os.walk(raiz) for nome in nomes]
+    assert restantes == []
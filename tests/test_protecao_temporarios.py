@@ -0,0 +1,114 @@
+import os
+import socket
+import time
+
+import pytest
+
+import limpezadowindows as lw
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="Proteção usada nas pastas temporárias compartilhadas do Linux")
+
+HORA = 3600
+
+
+@pytest.fixture
+def protecao():
+    # Relógio duas horas à frente: o que foi criado agora já passou da idade mínima de uma hora
+    return lw.ProtecaoTemporarios(idade_minima=HORA, agora=time.time() + 2 * HORA)
+
+
+def criar(caminho, conteudo=b"x", recente=False):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+    if recente:
+        futuro = time.time() + 1.5 * HORA
+        os.utime(caminho, (futuro, futuro))
+
+
+def limpar(raiz, protecao):
+    motor = lw.MotorRemocao(preservar=protecao)
+    return [motor.remover(os.path.join(raiz, nome)) for nome in sorted(os.listdir(raiz))]
+
+
+def test_preserva_recentes_sockets_fifos_e_arquivos_abertos(tmp_path):
+    raiz = tmp_path / "tmp"
+    criar(raiz / "antigo.tmp")
+    criar(raiz / "recente.tmp", recente=True)
+    criar(raiz / "build" / "antigo.o")
+    criar(raiz / "build" / "em_andamento.o", recente=True)
+    criar(raiz / "trava.lock")
+    os.mkfifo(raiz / "fila")
+    servidor = socket.socket(socket.AF_UNIX)
+    servidor.bind(str(raiz / "agente.sock"))
+    try:
+        with open(raiz / "trava.lock", "rb"):
+            # Protecao criada com a trava aberta, como um serviço em execução
+            protecao = lw.ProtecaoTemporarios(idade_minima=HORA, agora=time.time() + 2 * HORA)
+        limpar(str(raiz), protecao)
+    finally:
+        servidor.close()
+
+    restantes = sorted(os.path.relpath(os.path.join(pasta, nome), raiz)
+                       for pasta, pastas, arquivos in os.walk(raiz) for nome in pastas + arquivos)
+    assert restantes == ["agente.sock", "build", os.path.join("build", "em_andamento.o"), "fila", "recente.tmp", "trava.lock"]
+
+
+def test_pasta_recente_nao_e_percorrida(tmp_path, protecao):
+    raiz = tmp_path / "tmp"
+    criar(raiz / "rascunho" / "antigo.tmp")
+    futuro = time.time() + 1.5 * HORA
+    os.utime(raiz / "rascunho", (futuro, futuro))
+
+    estatisticas, = limpar(str(raiz), protecao)
+
+    assert (raiz / "rascunho" / "antigo.tmp").exists()
+    assert estatisticas["preservados"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="Exige root para criar itens de outro usuário")
+def test_nao_entra_em_pastas_de_outros_usuarios(tmp_path, protecao):
+    raiz = tmp_path / "tmp"
+    criar(raiz / "de_outro" / "dados.tmp")
+    criar(raiz / "meu.tmp")
+    os.chown(raiz / "de_outro", 65534, 65534)
+    # A mudança de dono altera o ctime: a proteção é criada depois, com o relógio à frente
+    protecao = lw.ProtecaoTemporarios(idade_minima=HORA, agora=time.time() + 2 * HORA)
+
+    limpar(str(raiz), protecao)
+
+    assert (raiz / "de_outro" / "dados.tmp").exists()
+    assert not (raiz / "meu.tmp").exists()
+
+
+def test_deposito_da_quarentena_na_pasta_limpa_e_mantido(tmp_path, monkeypatch, protecao):
+    # /tmp numa montagem tmpfs: a raiz do volume é a própria pasta limpa, e o depósito fica dentro dela
+    raiz = tmp_path / "tmp"
+    monkeypatch.setattr(lw, "raiz_do_volume", lambda caminho: str(raiz))
+    quarentena = lw.Quarentena(arquivo_registro=str(tmp_path / "volumes.txt"))
+    criar(raiz / "antigo.tmp")
+    quarentena.mover(str(raiz / "antigo.tmp"), "exec1")
+    criar(raiz / "outro.tmp")
+    deposito = raiz / lw.QUARENTENA_NOME_PASTA
+
+    # Execução com quarentena: o depósito não é movido para dentro de si mesmo
+    for nome in sorted(os.listdir(raiz)):
+        quarentena.mover_arvore(str(raiz / nome), "exec2", preservar=protecao)
+    assert os.listdir(raiz) == [lw.QUARENTENA_NOME_PASTA]
+    assert sorted(os.listdir(deposito)) == ["exec1", "exec2"]
+
+    # Execução sem quarentena: o depósito, já mais antigo que a idade mínima, continua lá
+    criar(raiz / "mais_um.tmp")
+    estatisticas = limpar(str(raiz), protecao)
+    assert os.listdir(raiz) == [lw.QUARENTENA_NOME_PASTA]
+    assert sum(item["preservados"] for item in estatisticas) == 1
+    assert quarentena.restaurar("exec1") == (1, 0)
+
+    # As varreduras também não o percorrem
+    assert [pasta for pasta, _, _ in lw.PercursoSeguro().percorrer(str(raiz))] == [str(raiz)]
+
+
+def test_backend_exige_os_metodos_abstratos():
+    with pytest.raises(TypeError):
+        lw.BackendPlataforma()
+    assert isinstance(lw.BackendLinux().protecao_temporarios(), lw.ProtecaoTemporarios)
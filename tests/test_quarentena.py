@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import limpezadowindows as lw
+
+
+@pytest.fixture
+def quarentena(tmp_path, monkeypatch):
+    monkeypatch.setattr(lw, "raiz_do_volume", lambda caminho: str(tmp_path))
+    return lw.Quarentena(arquivo_registro=str(tmp_path / "volumes.txt"))
+
+
+def escrever(caminho, conteudo=b"x"):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+
+
+def test_exclusao_aninhada_nao_vai_para_a_quarentena(tmp_path, quarentena):
+    cache = tmp_path / "cache"
+    escrever(cache / "app" / "dados" / "licenca.lic", b"chave")
+    escrever(cache / "app" / "dados" / "lixo.tmp", b"12345")
+    escrever(cache / "app" / "outro" / "lixo.tmp", b"123")
+    escrever(cache / "app" / "solto.tmp", b"1")
+    exclusoes = lw.RegrasExclusao([str(cache / "app" / "dados" / "licenca.lic")])
+    pasta = str(cache / "app")
+    estado = exclusoes.avancar(exclusoes.estado_de(str(cache)), "app")
+
+    estatisticas = quarentena.mover_arvore(pasta, "exec1", exclusoes, estado)
+
+    assert (cache / "app" / "dados" / "licenca.lic").read_bytes() == b"chave"
+    assert sorted(os.listdir(cache / "app")) == ["dados"]
+    assert os.listdir(cache / "app" / "dados") == ["licenca.lic"]
+    assert estatisticas == {"bytes": 9, "itens": 3, "falhas": 0, "preservados": 1}
+
+    assert quarentena.restaurar("exec1") == (3, 0)
+    assert (cache / "app" / "outro" / "lixo.tmp").read_bytes() == b"123"
+    assert (cache / "app" / "dados" / "lixo.tmp").read_bytes() == b"12345"
+
+
+def test_sem_regras_abaixo_move_a_pasta_inteira(tmp_path, quarentena):
+    escrever(tmp_path / "cache" / "a" / "b" / "c.tmp", b"abc")
+    escrever(tmp_path / "cache" / "a" / "d.tmp", b"de")
+    exclusoes = lw.RegrasExclusao([str(tmp_path / "outro_lugar")])
+    estado = exclusoes.avancar(exclusoes.estado_de(str(tmp_path / "cache")), "a")
+    assert estado == ()
+
+    estatisticas = quarentena.mover_arvore(str(tmp_path / "cache" / "a"), "exec1", exclusoes, estado)
+
+    assert not (tmp_path / "cache" / "a").exists()
+    assert estatisticas == {"bytes": 5, "itens": 1, "falhas": 0, "preservados": 0}
+
+
+def test_filtro_preservar_percorre_a_pasta(tmp_path, quarentena):
+    escrever(tmp_path / "tmp" / "build" / "antigo.o", b"velho")
+    escrever(tmp_path / "tmp" / "build" / "em_uso.o", b"novo")
+    em_uso = os.lstat(tmp_path / "tmp" / "build" / "em_uso.o")
+    preservar = lambda info: (info.st_dev, info.st_ino) == (em_uso.st_dev, em_uso.st_ino)
+
+    estatisticas = quarentena.mover_arvore(str(tmp_path / "tmp" / "build"), "exec1", preservar=preservar)
+
+    assert os.listdir(tmp_path / "tmp" / "build") == ["em_uso.o"]
+    assert estatisticas == {"bytes": 5, "itens": 1, "falhas": 0, "preservados": 1}
+
+
+def test_restaurar_remove_a_pasta_de_cada_volume_restaurado(tmp_path, monkeypatch):
+    volumes = {nome: tmp_path / nome for nome in ("vol_a", "vol_b")}
+    monkeypatch.setattr(lw, "raiz_do_volume", lambda caminho: str(tmp_path / os.path.relpath(caminho, tmp_path).split(os.sep)[0]))
+    quarentena = lw.Quarentena(arquivo_registro=str(tmp_path / "volumes.txt"))
+    for nome, raiz in volumes.items():
+        escrever(raiz / "dados" / "lixo.tmp", nome.encode())
+        quarentena.mover(str(raiz / "dados" / "lixo.tmp"), "exec1")
+    # Conflito no volume processado primeiro (pasta mais antiga)
+    escrever(volumes["vol_a"] / "dados" / "lixo.tmp", b"novo")
+    pastas = {nome: raiz / lw.QUARENTENA_NOME_PASTA / "exec1" for nome, raiz in volumes.items()}
+    os.utime(pastas["vol_a"], (1, 1))
+
+    assert quarentena.restaurar("exec1") == (1, 1)
+
+    assert (volumes["vol_b"] / "dados" / "lixo.tmp").read_bytes() == b"vol_b"
+    assert not pastas["vol_b"].exists()
+    assert (volumes["vol_a"] / "dados" / "lixo.tmp").read_bytes() == b"novo"
+    assert pastas["vol_a"].exists()